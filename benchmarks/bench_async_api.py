@@ -0,0 +1,117 @@
+"""
+异步API适配器的冒烟测试与并发对比
+启动bench_batch_api中的本地测试服务，用OpenAI、Azure OpenAI和通用三种异步适配器
+分别以流式和非流式方式请求同一组论文，检查返回的内容与测试服务的回答一致，
+并与同步通用适配器逐篇请求的耗时对比。
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_async_api
+    python -m benchmarks.bench_async_api --papers 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from benchmarks.bench_batch_api import (
+    build_prompts,
+    run_streaming,
+    start_stub_server,
+    stub_answer,
+)
+from utils.async_api_utils import (
+    AsyncAzureOpenAIAdapter,
+    AsyncGenericAPIAdapter,
+    AsyncOpenAIAdapter,
+    gather_completions,
+)
+
+PAPERS = 50
+CONCURRENCY = 16
+
+
+def build_adapters(api_url):
+    return [
+        ("openai", AsyncOpenAIAdapter("test-key", "stub-model", f"{api_url}/v1")),
+        ("azure", AsyncAzureOpenAIAdapter("test-key", "stub-model", api_url)),
+        ("generic", AsyncGenericAPIAdapter("test-key", "stub-model", api_url)),
+    ]
+
+
+async def run_adapter(adapter, prompts, concurrency):
+    """
+    流式并发请求全部提示词，再发送一次非流式请求
+    :return: (流式耗时, 流式结果列表, 非流式结果)
+    """
+    try:
+        start = time.perf_counter()
+        results = await gather_completions(
+            adapter, prompts, max_concurrency=concurrency
+        )
+        elapsed = time.perf_counter() - start
+        try:
+            single = await adapter.create_completion(prompt=prompts[0], stream=False)
+        except Exception as e:
+            single = e
+    finally:
+        await adapter.aclose()
+    return elapsed, results, single
+
+
+def describe_failure(results, expected):
+    for result, answer in zip(results, expected):
+        if isinstance(result, Exception):
+            return f"{type(result).__name__}: {result}"
+        if result != answer:
+            return f"返回内容不一致: {result[:40]!r}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步API适配器冒烟测试")
+    parser.add_argument("--papers", type=int, default=PAPERS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    server, _ = start_stub_server()
+    api_url = f"http://127.0.0.1:{server.server_port}"
+    prompts = build_prompts(args.papers)
+    expected = [stub_answer([{"content": prompt}]) for prompt in prompts]
+
+    failed = False
+    try:
+        # 适配器会逐个请求打印日志，测试期间不输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run_streaming(api_url, prompts)
+            sync_time = time.perf_counter() - start
+        print(f"论文数: {args.papers}, 异步并发数: {args.concurrency}")
+        print(f"{'同步逐篇':<10} {sync_time:>7.2f} s")
+
+        for name, adapter in build_adapters(api_url):
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, results, single = asyncio.run(
+                    run_adapter(adapter, prompts, args.concurrency)
+                )
+            error = describe_failure(results + [single], expected + expected[:1])
+            status = "通过" if error is None else f"失败（{error}）"
+            failed = failed or error is not None
+            print(f"{name:<10} {elapsed:>7.2f} s  {status}")
+    finally:
+        server.shutdown()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+批处理API与逐篇流式请求的对比
+启动一个本地的兼容OpenAI接口的测试服务（/v1/chat/completions、/v1/files、/v1/batches），
+分别用逐篇流式请求和一次批处理任务分析同一组论文，对比耗时和HTTP请求数。
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_batch_api
+
+只启动测试服务（在界面中把API URL或batch_api_url设为 http://127.0.0.1:8765 即可离线测试批处理模式）:
+    python -m benchmarks.bench_batch_api --serve 8765
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from configs.excel_header_config import get_default_columns
+from utils.api_utils import GenericAPIAdapter
+from utils.batch_api import BatchClient, build_batch_request, write_batch_file
+
+PAPERS = 200
+# 测试服务处理每个请求的模拟耗时（秒）
+RESPONSE_DELAY = 0.01
+
+_FIELD_PATTERN = re.compile(r"^(.+?)\|\[[^\]]*\]$", re.MULTILINE)
+
+
+def stub_answer(messages):
+    """按提示词中要求的字段生成“字段|内容”格式的回答"""
+    prompt = messages[-1]["content"] if messages else ""
+    fields = _FIELD_PATTERN.findall(prompt) or ["论文年份"]
+    return "\n".join(
+        f"{field}|2020" if field == "论文年份" else f"{field}|测试内容"
+        for field in fields
+    )
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.batches = {}
+        self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """兼容OpenAI接口的本地测试服务"""
+
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        with self.state.lock:
+            self.state.requests += 1
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+            batch = self.state.batches.get(parts[2])
+            if batch is None:
+                return self._send_json({"error": {"message": "not found"}}, 404)
+            return self._send_json(batch)
+        if parts[:2] == ["v1", "files"] and parts[-1] == "content":
+            body = self.state.files.get(parts[2], b"")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json({"error": {"message": "not found"}}, 404)
+
+    def do_POST(self):
+        with self.state.lock:
+            self.state.requests += 1
+        body = self._read_body()
+        # Azure的请求路径带有api-version查询参数
+        if urlsplit(self.path).path.endswith("/chat/completions"):
+            return self._chat(json.loads(body))
+        if self.path == "/v1/files":
+            return self._upload(body)
+        if self.path == "/v1/batches":
+            return self._create_batch(json.loads(body))
+        if self.path.endswith("/cancel"):
+            batch = self.state.batches.get(self.path.split("/")[3])
+            if batch is not None and batch["status"] != "completed":
+                batch["status"] = "cancelled"
+            return self._send_json(batch or {})
+        self._send_json({"error": {"message": "not found"}}, 404)
+
+    def _chat(self, payload):
+        time.sleep(RESPONSE_DELAY)
+        content = stub_answer(payload["messages"])
+        if not payload.get("stream"):
+            return self._send_json(
+                {"choices": [{"message": {"role": "assistant", "content": content}}]}
+            )
+        chunk = {"choices": [{"delta": {"content": content}}]}
+        body = (
+            f"data: {json.dumps(chunk, ensure_ascii=False)}\n\ndata: [DONE]\n\n"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upload(self, body):
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        message = BytesParser(policy=default_policy).parsebytes(header + body)
+        content = b""
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                content = part.get_payload(decode=True)
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.state.files[file_id] = content
+        self._send_json({"id": file_id, "object": "file", "purpose": "batch"})
+
+    def _create_batch(self, payload):
+        lines = self.state.files[payload["input_file_id"]].decode("utf-8").splitlines()
+        output = []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            time.sleep(RESPONSE_DELAY / 10)  # 服务端批量处理比单独请求更快
+            answer = stub_answer(request["body"]["messages"])
+            output.append(
+                {
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {"choices": [{"message": {"content": answer}}]},
+                    },
+                    "error": None,
+                }
+            )
+        output_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.state.files[output_id] = "\n".join(
+            json.dumps(record, ensure_ascii=False) for record in output
+        ).encode("utf-8")
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:12]}",
+            "object": "batch",
+            "status": "completed",
+            "input_file_id": payload["input_file_id"],
+            "output_file_id": output_id,
+            "error_file_id": None,
+            "request_counts": {
+                "total": len(output),
+                "completed": len(output),
+                "failed": 0,
+            },
+        }
+        self.state.batches[batch["id"]] = batch
+        self._send_json(batch)
+
+
+def start_stub_server(port=0):
+    """在后台线程中启动测试服务，返回(服务对象, 服务状态)"""
+    state = StubState()
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def build_prompts(count):
+    format_str = "".join(f"{column}|[内容]\n" for column in get_default_columns())
+    return [f"请按以下格式总结论文 {i}：\n{format_str}" for i in range(count)]
+
+
+def run_streaming(api_url, prompts):
+    adapter = GenericAPIAdapter("test-key", "stub-model", api_url)
+    results = []
+    try:
+        for prompt in prompts:
+            parts = []
+            adapter.set_chunk_callback(parts.append)
+            for _ in adapter.create_completion(prompt=prompt, stream=True):
+                pass
+            results.append("".join(parts))
+    finally:
+        adapter.close()
+    return results
+
+
+def run_batch(api_url, prompts, batch_path):
+    requests = [
+        build_batch_request(f"paper-{i}", "stub-model", None, prompt)
+        for i, prompt in enumerate(prompts)
+    ]
+    client = BatchClient(api_url, "test-key", "stub-model")
+    try:
+        batch = client.submit(write_batch_file(requests, batch_path))
+        batch = client.wait(batch["id"], poll_interval=0.1)
+        contents, _ = client.fetch_results(batch)
+    finally:
+        client.close()
+    return [contents.get(f"paper-{i}") for i in range(len(prompts))]
+
+
+def timed(func, *args):
+    # 适配器会逐个请求打印日志，计时期间不输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批处理API性能对比")
+    parser.add_argument("--serve", type=int, help="只启动测试服务并监听指定端口")
+    args = parser.parse_args()
+
+    if args.serve:
+        server, _ = start_stub_server(args.serve)
+        print(f"测试服务已启动: http://127.0.0.1:{server.server_port}（Ctrl+C退出）")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    server, state = start_stub_server()
+    api_url = f"http://127.0.0.1:{server.server_port}"
+    prompts = build_prompts(PAPERS)
+    batch_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "_bench_batch.jsonl"
+    )
+
+    try:
+        stream_time, stream_results = timed(run_streaming, api_url, prompts)
+        stream_requests, state.requests = state.requests, 0
+        batch_time, batch_results = timed(run_batch, api_url, prompts, batch_path)
+        batch_requests = state.requests
+    finally:
+        server.shutdown()
+        if os.path.exists(batch_path):
+            os.remove(batch_path)
+
+    print(f"论文数: {PAPERS}")
+    print(f"逐篇流式请求: {stream_time:.2f} s, HTTP请求 {stream_requests} 次")
+    print(f"批处理任务:   {batch_time:.2f} s, HTTP请求 {batch_requests} 次")
+    print(f"结果一致: {'是' if stream_results == batch_results else '否'}")
+
+
+if __name__ == "__main__":
+    main()
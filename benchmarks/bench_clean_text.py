@@ -0,0 +1,80 @@
+"""
+clean_text_for_api的性能对比
+对比逐字符拼接字符串、再逐字符生成一遍的旧实现与只用预编译正则替换的clean_text_for_api，
+并检查两者在包含代理对字符、表情符号和控制字符的文本上输出完全一致
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_clean_text
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from utils.api_utils import clean_text_for_api
+
+TEXT_LENGTH = 60000
+REPEAT = 5
+
+
+def legacy_clean(text):
+    """旧实现：逐字符拼接字符串，再逐字符生成一遍，最后用正则移除控制字符"""
+    if not text:
+        return ""
+    cleaned_text = ""
+    for char in text:
+        if not (0xD800 <= ord(char) <= 0xDFFF):
+            cleaned_text += char
+        else:
+            cleaned_text += " "
+    cleaned_text = "".join(char if ord(char) < 65536 else " " for char in cleaned_text)
+    return re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", cleaned_text)
+
+
+def build_text(length, seed=0):
+    """生成中英文混排的论文文本，夹杂代理对字符、表情符号和控制字符"""
+    rng = random.Random(seed)
+    words = ["the", "model", "results", "研究", "方法", "数据", "实验", "结论"]
+    specials = ["\ud83d", "\udca1", "\U0001f600", "\x00", "\x0b", "\x1f", "\x7f"]
+    specials += ["\t", "\n", "\r", "�", "é"]
+    parts = []
+    size = 0
+    while size < length:
+        part = rng.choice(specials) if rng.random() < 0.02 else rng.choice(words)
+        parts.append(part + " ")
+        size += len(part) + 1
+    return "".join(parts)[:length]
+
+
+def timed(func, text):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func(text)
+    return (time.perf_counter() - start) / REPEAT, result
+
+
+def main():
+    samples = [build_text(TEXT_LENGTH, seed) for seed in range(5)]
+    samples += ["", "plain ascii", "\U000103ff\U0010ffff\x00\t\n\r"]
+    same = all(legacy_clean(text) == clean_text_for_api(text) for text in samples)
+
+    text = samples[0]
+    legacy_time, _ = timed(legacy_clean, text)
+    new_time, _ = timed(clean_text_for_api, text)
+
+    print(f"文本长度: {len(text)} 字符")
+    print(f"逐字符拼接: {legacy_time * 1000:.2f} ms")
+    print(f"正则替换:   {new_time * 1000:.2f} ms")
+    print(f"加速比: {legacy_time / new_time:.1f}x")
+    print(f"输出一致: {'是' if same else '否'}")
+
+
+if __name__ == "__main__":
+    main()
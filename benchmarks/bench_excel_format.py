@@ -0,0 +1,154 @@
+"""
+Excel格式化的性能对比
+对比旧实现（pandas写出后重新加载工作簿，分三遍逐单元格设置样式）
+与只写模式下一次写出带格式表格的write_excel_with_format，
+并输出是否达到10000行在1秒内完成的目标，以及不带格式的to_excel耗时作为参照
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_excel_format
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from benchmarks.bench_excel_normalize import build_frame
+from utils.excel_utils import (
+    LONG_TEXT_COLUMNS,
+    normalize_missing_values,
+    write_excel_with_format,
+)
+
+ROWS = 10000
+COLUMNS = 10
+
+# 格式化ROWS行表格的目标耗时（秒）
+TARGET_SECONDS = 1.0
+
+
+def legacy_format(df, excel_path):
+    """旧实现：写出后重新加载，逐列、逐行、逐单元格三遍处理，每个单元格新建样式对象"""
+    df.to_excel(excel_path, index=False)
+    wb = openpyxl.load_workbook(excel_path)
+    ws = wb.active
+
+    for cell in ws[1]:
+        cell.font = openpyxl.styles.Font(bold=True)
+        cell.alignment = openpyxl.styles.Alignment(
+            horizontal="center", vertical="center", wrap_text=True
+        )
+        cell.fill = openpyxl.styles.PatternFill(
+            start_color="DDEBF7", end_color="DDEBF7", fill_type="solid"
+        )
+    ws.row_dimensions[1].height = 30
+
+    for column in ws.iter_cols(min_row=1):
+        column_name = column[0].value
+        if column_name in LONG_TEXT_COLUMNS:
+            width = 50
+        else:
+            max_length = 0
+            for cell in column:
+                if cell.value:
+                    text = str(cell.value)
+                    length = max(len(line) for line in text.split("\n"))
+                    max_length = max(max_length, length)
+            min_width = 15 if column_name != "论文年份" else 10
+            width = min(max(max_length + 2, min_width), 30)
+        ws.column_dimensions[get_column_letter(column[0].column)].width = width
+
+    for i, row in enumerate(ws.iter_rows(min_row=2), 2):
+        max_lines = 1
+        has_long_content = False
+        for cell in row:
+            if cell.value and isinstance(cell.value, str):
+                content = str(cell.value)
+                newlines = content.count("\n")
+                if "\n" in content:
+                    for line in content.split("\n"):
+                        estimated_lines = max(1, len(line) / 50)
+                        max_lines = max(max_lines, newlines + 1, estimated_lines)
+                else:
+                    estimated_lines = len(content) / 50
+                max_lines = max(max_lines, int(estimated_lines) + 1)
+                if len(content) > 200:
+                    has_long_content = True
+        min_height = 60 if has_long_content else 30
+        ws.row_dimensions[i].height = min(max(min_height, 25 * max_lines), 200)
+
+    for row in ws.iter_rows(min_row=2):
+        for cell in row:
+            cell.alignment = openpyxl.styles.Alignment(
+                wrap_text=True, vertical="top", horizontal="left"
+            )
+            if cell.value and isinstance(cell.value, str) and len(cell.value) > 100:
+                cell.fill = openpyxl.styles.PatternFill(
+                    start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
+                )
+
+    wb.save(excel_path)
+
+
+def read_layout(excel_path):
+    """读取列宽、行高、取值和填充色，用于比较两种实现的输出"""
+    ws = openpyxl.load_workbook(excel_path).active
+    widths = [
+        ws.column_dimensions[get_column_letter(i)].width
+        for i in range(1, ws.max_column + 1)
+    ]
+    heights = [ws.row_dimensions[i].height for i in range(1, ws.max_row + 1)]
+    cells = [
+        (cell.value, cell.fill.fgColor.rgb, cell.alignment.vertical)
+        for row in ws.iter_rows()
+        for cell in row
+    ]
+    return widths, heights, cells
+
+
+def timed(func, df, excel_path):
+    start = time.perf_counter()
+    func(df, excel_path)
+    return time.perf_counter() - start
+
+
+def main():
+    df = normalize_missing_values(build_frame(ROWS, COLUMNS))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, "legacy.xlsx")
+        stream_path = os.path.join(tmp_dir, "stream.xlsx")
+
+        plain_path = os.path.join(tmp_dir, "plain.xlsx")
+
+        legacy_time = timed(legacy_format, df.copy(), legacy_path)
+        stream_time = timed(write_excel_with_format, df.copy(), stream_path)
+        plain_time = timed(
+            lambda frame, path: frame.to_excel(path, index=False), df.copy(), plain_path
+        )
+        same = read_layout(legacy_path) == read_layout(stream_path)
+
+    print(f"数据规模: {ROWS} 行 × {COLUMNS} 列")
+    print(f"写出后逐单元格格式化: {legacy_time:.2f} s")
+    print(f"只写模式流式写出:     {stream_time:.2f} s")
+    print(f"不带格式的to_excel:   {plain_time:.2f} s（参照）")
+    print(f"加速比: {legacy_time / stream_time:.1f}x")
+    print(f"格式一致: {'是' if same else '否'}")
+    status = "已达到" if stream_time < TARGET_SECONDS else "未达到"
+    print(
+        f"目标: {ROWS} 行在 {TARGET_SECONDS:.1f} s 内完成 —— {status}"
+        f"（实际 {stream_time:.2f} s，其中格式化开销约 "
+        f"{max(0.0, stream_time - plain_time):.2f} s）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+PDF解析引擎的性能对比
+用每个已安装的解析引擎提取同一组PDF，对比解析速度（页/秒）和提取的文本。
+未指定PDF目录时生成一组双栏排版的测试论文，并检查每个句子是否按栏的顺序完整提取；
+指定目录时与PyPDF2的提取结果对比词语的重合度。
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_pdf_backends
+    python -m benchmarks.bench_pdf_backends --dir 论文目录 --max-pages 30
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from utils.pdf_backends import FALLBACK_BACKEND, PDF_EXTRACTORS, get_available_backends
+from utils.pdf_extract import MAX_PDF_PAGES, extract_text_from_pdf
+
+SAMPLE_PAPERS = 10
+SAMPLE_PAGES = 12
+REPEAT = 3
+
+# 双栏排版：每栏的起始横坐标、每行最多字符数、行距
+COLUMN_X = (50, 310)
+COLUMN_CHARS = 45
+LINE_HEIGHT = 12
+LINES_PER_COLUMN = 60
+
+WORDS = (
+    "model data method result analysis sample effect study experiment "
+    "significant learning network performance baseline dataset feature "
+    "evaluation accuracy training variable regression survey participant"
+).split()
+
+
+def build_sentences(rng, count):
+    sentences = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(10, 16))]
+        sentences.append(f"S{i} " + " ".join(words) + ".")
+    return sentences
+
+
+def wrap_column_lines(sentences):
+    """把句子按栏宽折行，一个句子通常跨越两到三行"""
+    text = " ".join(sentences)
+    lines, current = [], ""
+    for word in text.split(" "):
+        if current and len(current) + 1 + len(word) > COLUMN_CHARS:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def build_page_stream(lines):
+    """先写左栏再写右栏，与LaTeX等排版软件的输出顺序一致"""
+    commands = []
+    for index, line in enumerate(lines):
+        column, row = divmod(index, LINES_PER_COLUMN)
+        x = COLUMN_X[column]
+        y = 800 - row * LINE_HEIGHT
+        commands.append(f"BT /F1 9 Tf {x} {y} Td ({line}) Tj ET")
+    return "\n".join(commands).encode("latin-1")
+
+
+def write_pdf(path, page_streams):
+    """写入只包含文本的最简PDF文件"""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    pages_id = 2 + 2 * len(page_streams)
+    page_ids = []
+    for stream in page_streams:
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Contents %d 0 R /Resources << /Font << /F1 1 0 R >> >> >>"
+            % (pages_id, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        len(objects),
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def build_sample_corpus(directory, seed=0):
+    """
+    生成双栏排版的测试论文
+    :return: (PDF路径列表, 每个PDF中按阅读顺序排列的句子列表)
+    """
+    rng = random.Random(seed)
+    paths, expected = [], []
+    for paper in range(SAMPLE_PAPERS):
+        streams, sentences = [], []
+        for _ in range(SAMPLE_PAGES):
+            lines, page_sentences = [], []
+            while len(lines) < LINES_PER_COLUMN * 2:
+                page_sentences = build_sentences(rng, len(page_sentences) + 8)
+                lines = wrap_column_lines(page_sentences)
+            # 去掉放不下的句子，保证每页以完整的句子结束
+            while len(lines) > LINES_PER_COLUMN * 2:
+                page_sentences.pop()
+                lines = wrap_column_lines(page_sentences)
+            sentences.extend(page_sentences)
+            streams.append(build_page_stream(lines))
+        path = os.path.join(directory, f"sample_{paper}.pdf")
+        write_pdf(path, streams)
+        paths.append(path)
+        expected.append(sentences)
+    return paths, expected
+
+
+def run_backend(backend, paths, max_pages):
+    """用指定引擎提取全部PDF，返回(页数, 耗时, 提取结果列表)"""
+    results = []
+    pages = 0
+    start = time.perf_counter()
+    for path in paths:
+        result = extract_text_from_pdf(path, max_pages, backend=backend)
+        pages += result["extracted_pages"]
+        results.append(result)
+    return pages, time.perf_counter() - start, results
+
+
+def sentence_recall(text, sentences):
+    """按阅读顺序完整提取的句子比例，双栏被逐行交错读取时句子会被打断"""
+    text = re.sub(r"\s+", " ", text)
+    found = sum(1 for sentence in sentences if sentence in text)
+    return found / len(sentences) if sentences else 0.0
+
+
+def word_overlap(text, reference):
+    words, reference_words = set(text.split()), set(reference.split())
+    if not words and not reference_words:
+        return 1.0
+    return len(words & reference_words) / len(words | reference_words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF解析引擎性能对比")
+    parser.add_argument("--dir", help="包含PDF文件的目录，不指定时生成测试论文")
+    parser.add_argument("--max-pages", type=int, default=MAX_PDF_PAGES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    temp_dir = None
+    expected = None
+    if args.dir:
+        paths = sorted(glob.glob(os.path.join(args.dir, "*.pdf")))
+        if not paths:
+            print(f"目录中没有PDF文件: {args.dir}")
+            return
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="bench_pdf_")
+        paths, expected = build_sample_corpus(temp_dir)
+
+    backends = get_available_backends()
+    missing = [name for name in PDF_EXTRACTORS if name not in backends]
+    try:
+        rows = []
+        reference = None
+        for backend in backends:
+            best = None
+            for _ in range(args.repeat):
+                pages, seconds, results = run_backend(backend, paths, args.max_pages)
+                if best is None or seconds < best[1]:
+                    best = (pages, seconds, results)
+            pages, seconds, results = best
+            errors = sum(1 for result in results if result["error"])
+            texts = [result["text"] for result in results]
+            if backend == FALLBACK_BACKEND:
+                reference = texts
+            rows.append((backend, pages, seconds, texts, errors))
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print(
+        f"PDF文件: {len(paths)} 个, 每个最多 {args.max_pages} 页, 取 {args.repeat} 次中最快的一次"
+    )
+    quality = "句子完整率" if expected else "与PyPDF2词语重合度"
+    print(
+        f"{'引擎':<10} {'页数':>6} {'耗时(s)':>9} {'页/秒':>9} {'字符数':>10} {quality:>10}"
+    )
+    for backend, pages, seconds, texts, errors in rows:
+        if expected:
+            score = sum(map(sentence_recall, texts, expected)) / len(texts)
+        else:
+            score = sum(map(word_overlap, texts, reference)) / len(texts)
+        speed = pages / seconds if seconds else 0
+        chars = sum(len(text) for text in texts)
+        line = f"{backend:<10} {pages:>6} {seconds:>9.3f} {speed:>9.1f} {chars:>10} {score:>10.1%}"
+        if errors:
+            line += f"  （{errors} 个文件解析失败）"
+        print(line)
+    if missing:
+        print(f"未安装的引擎: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+解析大型扫描版PDF时的内存占用
+生成一个每页都有一张大图片的PDF（默认100页、约300 MB），对比旧实现（PyPDF2缓存所有已解析对象）
+与extract_text_from_pdf在各解析引擎下解析全部页面时进程常驻内存的峰值增长。
+
+运行方式（在项目根目录下）:
+    python -m benchmarks.bench_pdf_memory
+    python -m benchmarks.bench_pdf_memory --pages 200 --image-mb 3
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# 添加项目根目录到系统路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir not in sys.path:
+    sys.path.append(project_dir)
+
+from utils.memory_utils import MB, get_rss_bytes
+from utils.pdf_backends import get_available_backends
+from utils.pdf_extract import extract_text_from_pdf
+
+IMAGE_WIDTH = 1500
+
+
+def write_scanned_pdf(path, pages, image_bytes):
+    """写入每页一张灰度图片加一行文字的PDF，图片数据不压缩，文件大小约为页数乘以图片大小"""
+    height = image_bytes // IMAGE_WIDTH
+    image = os.urandom(IMAGE_WIDTH * height)
+    offsets = []
+
+    with open(path, "wb") as f:
+
+        def write_object(body):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (len(offsets), body))
+            return len(offsets)
+
+        f.write(b"%PDF-1.4\n")
+        font_id = write_object(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+        )
+        pages_id = 2 + 3 * pages
+        page_ids = []
+        for page in range(pages):
+            image_id = write_object(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length %d >>\n"
+                b"stream\n%s\nendstream" % (IMAGE_WIDTH, height, len(image), image)
+            )
+            content = (
+                b"q 595 0 0 842 0 0 cm /Im1 Do Q "
+                b"BT /F1 10 Tf 40 800 Td (Scanned page %d) Tj ET" % page
+            )
+            content_id = write_object(
+                b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+            )
+            page_ids.append(
+                write_object(
+                    b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                    b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> "
+                    b"/XObject << /Im1 %d 0 R >> >> >>"
+                    % (pages_id, content_id, font_id, image_id)
+                )
+            )
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+        write_object(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages))
+        catalog_id = write_object(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        f.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        f.write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(offsets) + 1, catalog_id, xref)
+        )
+
+
+def legacy_extract(path, max_pages):
+    """旧实现：PyPDF2缓存所有已解析的对象，直到解析结束"""
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        page_count = min(max_pages, len(pdf_reader.pages))
+        return [pdf_reader.pages[i].extract_text() for i in range(page_count)]
+
+
+def measure_peak(func, *args, **kwargs):
+    """在后台线程中采样常驻内存，返回(峰值增长MB, 耗时秒)"""
+    # 关闭PyPDF2对图片对象的警告输出
+    logging.getLogger("PyPDF2").setLevel(logging.ERROR)
+    base = get_rss_bytes()
+    peak = [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], get_rss_bytes() - base)
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+    return peak[0] / MB, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大型PDF解析的内存占用对比")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--image-mb", type=float, default=3)
+    args = parser.parse_args()
+
+    if get_rss_bytes() is None:
+        print("无法获取进程内存占用，请安装psutil后重试")
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_pdf_memory_")
+    path = os.path.join(temp_dir, "scanned.pdf")
+    try:
+        write_scanned_pdf(path, args.pages, int(args.image_mb * MB))
+        print(f"PDF大小: {os.path.getsize(path) / MB:.0f} MB, {args.pages} 页")
+
+        runs = [("旧实现", legacy_extract, {})]
+        runs += [
+            (backend, extract_text_from_pdf, {"backend": backend})
+            for backend in get_available_backends()
+        ]
+        for name, func, kwargs in runs:
+            # 每次在新的进程中测量，避免前一次释放后留在进程中的内存影响结果
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                peak, elapsed = pool.submit(
+                    measure_peak, func, path, args.pages, **kwargs
+                ).result()
+            print(f"{name:<10} 内存峰值增长 {peak:>7.0f} MB, 耗时 {elapsed:.2f} s")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import json
+
+
+def get_default_analysis_settings():
+    """获取默认分析设置"""
+    return {
+        "max_workers": 1,  # 同时分析的论文数，1表示逐篇顺序分析
+        "extract_processes": 0,  # PDF解析进程数，0表示根据CPU核心数自动选择
+        "text_cache_enabled": True,  # 是否缓存PDF提取文本
+        "text_cache_max_mb": 500,  # PDF文本缓存的容量上限（MB）
+        "response_cache_enabled": True,  # 是否缓存API响应，关闭时每次都重新调用API
+        "response_cache_max_mb": 200,  # API响应缓存的容量上限（MB）
+        "response_cache_ttl_hours": 168,  # API响应缓存的有效期（小时）
+        "excel_incremental_save": True,  # 只追加新行，不重写和重新排序已有数据
+        "http_pool_size": 10,  # 通用API连接池的最大连接数
+        "http_connect_retries": 3,  # 建立连接失败时的重试次数
+        "rate_limit_rpm": 0,  # 每个API端点每分钟最多请求数，0表示不限制
+        "rate_limit_tpm": 0,  # 每个API端点每分钟最多token数，0表示不限制
+        "retry_max_attempts": 5,  # API调用最多尝试次数
+        "retry_base_delay": 2.0,  # 重试退避的基准时间（秒），每次失败后翻倍并随机抖动
+        "retry_max_delay": 60.0,  # 单次重试等待的上限（秒）
+        "retry_deadline": 600.0,  # 单篇论文API调用的总时长上限（秒）
+        "retry_overrides": {},  # 按后端类型（openai、azure、generic）覆盖以上重试设置
+        "batch_mode": False,  # 使用批处理API一次性提交全部论文，不流式输出
+        "batch_api_url": "",  # 批处理接口的地址，为空时使用API设置中的URL
+        "batch_poll_interval": 30,  # 查询批处理任务状态的间隔（秒）
+        "model_context_limits": {},  # 按模型名覆盖上下文窗口（token），如{"my-model": 32768}
+        "response_token_reserve": 4096,  # 为模型输出预留的token数
+        "max_prompt_tokens": 0,  # 单次请求提示词的token上限，0表示只受模型上下文窗口限制
+        "smart_text_selection": True,  # 论文超出预算时按章节选择文本，而不是只保留开头
+        "smart_selection_max_pages": 100,  # 按章节选择时，读满30页仍未遇到参考文献的长论文最多提取的页数
+        "pdf_extract_backend": "auto",  # PDF解析引擎：auto、pypdf2、pymupdf、pypdfium2、pdfminer
+        "extract_memory_limit_mb": 1024,  # 解析单个PDF时内存增长的上限（MB），0表示不限制
+        "max_pdf_size_mb": 2048,  # 超过此大小（MB）的PDF不解析，0表示不限制
+        "early_stop_extraction": True,  # 读到参考文献或已提取的文本足够时停止解析后续页面
+        "extract_file_timeout": 300,  # 单个PDF的解析时间上限（秒），超时终止解析进程，0表示不限制
+        "extract_page_timeout": 60,  # 打开PDF或解析单页的时间上限（秒），0表示不限制
+        "deduplicate_papers": True,  # 分析前合并内容相同的PDF，每组只分析一篇
+        "near_duplicate_detection": False,  # 按开头几页的文本识别同一论文的不同版本（需额外解析前几页）
+        "near_duplicate_threshold": 0.8,  # 开头文本的相似度不低于此值时视为同一论文
+        "only_new_papers": False,  # 跳过目标Excel中已有的论文（按文件哈希或引用信息中的标题匹配）
+        "chunked_analysis": False,  # 论文超出预算时分块并行分析再合并，而不是截断
+        "max_analysis_chunks": 8,  # 每篇论文最多分成的块数，超出的部分按章节选择或截断
+        "chunk_overlap_tokens": 200,  # 相邻两块重叠的token数，避免在块边界处丢失上下文
+        "chunk_workers": 4,  # 每篇论文同时分析的块数
+    }
+
+
+def get_config_path():
+    """获取分析设置文件路径"""
+    user_docs = os.path.join(os.path.expanduser("~"), "Documents", "论文分析工具")
+    os.makedirs(user_docs, exist_ok=True)
+    return os.path.join(user_docs, "analysis_config.json")
+
+
+def load_analysis_settings():
+    """加载分析设置，缺失的项使用默认值"""
+    settings = get_default_analysis_settings()
+    config_path = get_config_path()
+
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                for key in settings:
+                    if key in data:
+                        settings[key] = data[key]
+    except Exception as e:
+        print(f"读取分析设置出错: {e}")
+
+    return settings
+
+
+def save_analysis_settings(settings):
+    """保存分析设置"""
+    config_path = get_config_path()
+
+    # 只保存已知的设置项，避免写入无效字段
+    data = load_analysis_settings()
+    for key in get_default_analysis_settings():
+        if key in settings:
+            data[key] = settings[key]
+
+    try:
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        print(f"保存分析设置出错: {e}")
+        return False
@@ -7,6 +7,7 @@ import sys
 # 导入配置
 from configs.api_config import load_api_configs, save_api_configs
 from configs.excel_header_config import get_default_columns, save_custom_columns
+from configs.analysis_config import load_analysis_settings, save_analysis_settings
 
 # 导入GUI组件 - 修改为从正确模块导入
 from gui.ui_setup import setup_ui
@@ -32,11 +33,14 @@ from utils.pdf_manager import (
     analyze_papers,
     regenerate,
     process_papers_async,
+    process_papers_batch,
     perform_regenerate,
     select_pdfs,
     add_pdf,
     remove_pdf,
     display_pdf_info,
+    clear_text_cache,
+    clear_response_cache,
 )
 
 from gui.ui_utils import (
@@ -121,6 +125,29 @@ class PaperAnalyzer:
             # 加载API配置
             self.load_api_configs()
 
+            # 分析设置
+            self.analysis_workers_var = tk.IntVar(value=1)
+            self.extract_processes_var = tk.IntVar(value=0)
+            self.text_cache_enabled_var = tk.BooleanVar(value=True)
+            self.text_cache_max_mb_var = tk.IntVar(value=500)
+            self.response_cache_enabled_var = tk.BooleanVar(value=True)
+            self.excel_incremental_save_var = tk.BooleanVar(value=True)
+            self.batch_mode_var = tk.BooleanVar(value=False)
+            self.chunked_analysis_var = tk.BooleanVar(value=False)
+            self.only_new_papers_var = tk.BooleanVar(value=False)
+            self.analysis_setting_vars = {
+                "max_workers": self.analysis_workers_var,
+                "extract_processes": self.extract_processes_var,
+                "text_cache_enabled": self.text_cache_enabled_var,
+                "text_cache_max_mb": self.text_cache_max_mb_var,
+                "response_cache_enabled": self.response_cache_enabled_var,
+                "excel_incremental_save": self.excel_incremental_save_var,
+                "batch_mode": self.batch_mode_var,
+                "chunked_analysis": self.chunked_analysis_var,
+                "only_new_papers": self.only_new_papers_var,
+            }
+            self.load_analysis_settings()
+
             # 加载自定义表头
             try:
                 from configs.excel_header_config import load_custom_columns
@@ -167,8 +194,13 @@ class PaperAnalyzer:
             self.regenerate = lambda: regenerate(self)
             self.cancel_analysis = lambda: cancel_analysis(self)
             self.process_papers_async = (
-                lambda df, url, key, total: process_papers_async(
-                    self, df, url, key, total
+                lambda df, url, key, total, resume=False, regenerate=False: (
+                    process_papers_async(self, df, url, key, total, resume, regenerate)
+                )
+            )
+            self.process_papers_batch = (
+                lambda df, url, key, total, resume=False: process_papers_batch(
+                    self, df, url, key, total, resume
                 )
             )
             self.perform_regenerate = lambda: perform_regenerate(self)
@@ -189,6 +221,8 @@ class PaperAnalyzer:
             self.display_pdf_info = lambda paths: display_pdf_info(self, paths)
             self.add_pdf = lambda: add_pdf(self)
             self.remove_pdf = lambda: remove_pdf(self)
+            self.clear_text_cache = lambda: clear_text_cache(self)
+            self.clear_response_cache = lambda: clear_response_cache(self)
 
             # 绑定翻译和提取功能
             self.extract_content = lambda: extract_content(self)
@@ -320,6 +354,7 @@ class PaperAnalyzer:
         try:
             # 先保存API配置
             self.save_api_configs()
+            self.save_analysis_settings()
             # 再清理应用服务
             cleanup_app_services()
         finally:
@@ -466,6 +501,23 @@ class PaperAnalyzer:
             self.remember_key_var.get(),
         )
 
+    def load_analysis_settings(self):
+        """加载分析设置"""
+        settings = load_analysis_settings()
+        for key, var in self.analysis_setting_vars.items():
+            if key in settings:
+                var.set(settings[key])
+
+    def save_analysis_settings(self):
+        """保存分析设置到文件，无效的输入不保存"""
+        settings = {}
+        for key, var in self.analysis_setting_vars.items():
+            try:
+                settings[key] = var.get()
+            except (tk.TclError, ValueError):
+                print(f"分析设置 {key} 的值无效，未保存")
+        save_analysis_settings(settings)
+
     def _manage_excel_configs(self):
         """管理Excel表头配置"""
         from gui.excel_header_editor import show_header_editor
@@ -137,6 +137,111 @@ def setup_ui(self):
     )
     self.remember_key_check.pack(anchor=tk.W, pady=(5, 0))
 
+    # 分析设置
+    analysis_frame = ttk_module.LabelFrame(left_frame, text=" 分析设置 ", padding=12)
+    analysis_frame.pack(fill="x", pady=(0, 15), padx=5)
+
+    # 增量保存只追加新行，取消勾选时合并全部数据并按年份重新排序
+    self.excel_incremental_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="增量保存Excel（不重新排序已有数据）",
+        variable=self.excel_incremental_save_var,
+        style="TCheckbutton",
+    )
+    self.excel_incremental_check.pack(anchor=tk.W, pady=(0, 10))
+
+    # 批处理模式一次性提交全部论文，结果在服务端处理完成后统一返回
+    self.batch_mode_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="批处理模式（离线批量分析，不流式输出）",
+        variable=self.batch_mode_var,
+        style="TCheckbutton",
+    )
+    self.batch_mode_check.pack(anchor=tk.W, pady=(0, 10))
+
+    # 分块分析把超长论文切成多块并行分析后合并，而不是截断
+    self.chunked_analysis_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="超长论文分块分析（多次调用API后合并）",
+        variable=self.chunked_analysis_var,
+        style="TCheckbutton",
+    )
+    self.chunked_analysis_check.pack(anchor=tk.W, pady=(0, 10))
+
+    # 只分析新论文时跳过目标Excel中已有的论文，追加少量论文时不再重新分析整个文献库
+    self.only_new_papers_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="只分析新论文（跳过Excel中已有的论文）",
+        variable=self.only_new_papers_var,
+        style="TCheckbutton",
+    )
+    self.only_new_papers_check.pack(anchor=tk.W, pady=(0, 10))
+
+    workers_label = ttk_module.Label(analysis_frame, text="同时分析论文数:")
+    workers_label.pack(anchor=tk.W, pady=(0, 5))
+    self.analysis_workers_spinbox = ttk_module.Spinbox(
+        analysis_frame,
+        from_=1,
+        to=16,
+        textvariable=self.analysis_workers_var,
+        font=self.fonts["text"],
+        width=6,
+    )
+    self.analysis_workers_spinbox.pack(anchor=tk.W, pady=(0, 10))
+
+    processes_label = ttk_module.Label(analysis_frame, text="PDF解析进程数 (0为自动):")
+    processes_label.pack(anchor=tk.W, pady=(0, 5))
+    self.extract_processes_spinbox = ttk_module.Spinbox(
+        analysis_frame,
+        from_=0,
+        to=32,
+        textvariable=self.extract_processes_var,
+        font=self.fonts["text"],
+        width=6,
+    )
+    self.extract_processes_spinbox.pack(anchor=tk.W, pady=(0, 10))
+
+    # PDF文本缓存
+    self.text_cache_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="缓存PDF提取文本",
+        variable=self.text_cache_enabled_var,
+        style="TCheckbutton",
+    )
+    self.text_cache_check.pack(anchor=tk.W, pady=(0, 5))
+
+    cache_size_label = ttk_module.Label(analysis_frame, text="文本缓存上限 (MB):")
+    cache_size_label.pack(anchor=tk.W, pady=(0, 5))
+    self.text_cache_size_spinbox = ttk_module.Spinbox(
+        analysis_frame,
+        from_=50,
+        to=10000,
+        increment=50,
+        textvariable=self.text_cache_max_mb_var,
+        font=self.fonts["text"],
+        width=6,
+    )
+    self.text_cache_size_spinbox.pack(anchor=tk.W, pady=(0, 10))
+
+    clear_cache_btn = ttk_module.Button(
+        analysis_frame, text="清空文本缓存", command=self.clear_text_cache
+    )
+    clear_cache_btn.pack(fill="x", pady=(0, 10))
+
+    # API响应缓存，取消勾选时每次都重新调用API
+    self.response_cache_check = ttk_module.Checkbutton(
+        analysis_frame,
+        text="缓存API响应",
+        variable=self.response_cache_enabled_var,
+        style="TCheckbutton",
+    )
+    self.response_cache_check.pack(anchor=tk.W, pady=(0, 5))
+
+    clear_response_cache_btn = ttk_module.Button(
+        analysis_frame, text="清空响应缓存", command=self.clear_response_cache
+    )
+    clear_response_cache_btn.pack(fill="x")
+
     # 添加操作按钮区域
     actions_frame = self.create_actions_frame(left_frame)
     actions_frame.pack(fill="x", pady=(0, 15), padx=5)
@@ -31,6 +31,7 @@ BUTTON_TEXT_MAPPING = {
     " Excel文件管理 ": " Excel File Management ",
     " PDF文件处理 ": " PDF File Processing ",
     " API设置 ": " API Settings ",
+    " 分析设置 ": " Analysis Settings ",
     " 论文分析操作 ": " Paper Analysis Operations ",
     " 辅助工具 ": " Auxiliary Tools ",
     # 标签和提示
@@ -40,6 +41,17 @@ BUTTON_TEXT_MAPPING = {
     "API URL:": "API URL:",
     "API Key:": "API Key:",
     "记住API设置": "Remember API Settings",
+    "同时分析论文数:": "Concurrent Papers:",
+    "增量保存Excel（不重新排序已有数据）": "Incremental Excel Save (keep existing order)",
+    "PDF解析进程数 (0为自动):": "PDF Parser Processes (0 = auto):",
+    "缓存PDF提取文本": "Cache Extracted PDF Text",
+    "文本缓存上限 (MB):": "Text Cache Limit (MB):",
+    "清空文本缓存": "Clear Text Cache",
+    "缓存API响应": "Cache API Responses",
+    "清空响应缓存": "Clear Response Cache",
+    "批处理模式（离线批量分析，不流式输出）": "Batch Mode (offline bulk analysis, no streaming)",
+    "超长论文分块分析（多次调用API后合并）": "Chunked Analysis for Long Papers (multiple API calls, merged)",
+    "只分析新论文（跳过Excel中已有的论文）": "Only New Papers (skip papers already in the Excel)",
     # 语言切换按钮
     "Switch to English": "切换为中文",
     "切换为中文": "Switch to English",
@@ -224,7 +236,7 @@ def save_excel_result(self, df):
             if current_dir not in sys.path:
                 sys.path.append(current_dir)
             from configs.excel_header_config import load_custom_columns
-            from utils.excel_utils import save_to_excel_with_format, format_excel_file
+            from utils.excel_utils import save_to_excel_with_format
 
             # 确保包含所有所需列
             try:
@@ -237,8 +249,13 @@ def save_excel_result(self, df):
             except Exception as e:
                 print(f"加载表头配置时出错: {e}")
 
-            # 读取并合并数据
             excel_path = self.excel_path.get()
+
+            # 增量模式：本批结果按年份排序后直接追加到表格末尾，只写入和格式化新行
+            if _use_incremental_save(self) and os.path.exists(excel_path):
+                return _append_excel_result(self, df, excel_path)
+
+            # 读取并合并数据
             if os.path.exists(excel_path):
                 try:
                     existing_df = pd.read_excel(excel_path)
@@ -274,53 +291,24 @@ def save_excel_result(self, df):
                 combined_df, excel_path, append_mode=False
             )
 
-            # 无论保存模式如何，都尝试格式化Excel
-            if save_success:
-                self.output_text.insert(tk.END, "\n正在应用Excel格式美化...\n")
-                self.output_text.see(tk.END)
-                self.output_text.update()
+            # 结果已写入Excel，不再需要断点日志
+            if save_success and getattr(self, "analysis_journal", None) is not None:
+                self.analysis_journal.clear()
+                self.analysis_journal = None
 
-                try:
-                    # 确保Excel文件存在
-                    if os.path.exists(excel_path):
-                        # 强制执行格式化
-                        format_result = format_excel_file(excel_path)
-                        if format_result:
-                            self.output_text.insert(
-                                tk.END,
-                                "\n✓ 已保存分析结果到Excel并完成格式美化\n",
-                                "success",
-                            )
-                        else:
-                            self.output_text.insert(
-                                tk.END,
-                                "\n✓ 已保存分析结果到Excel，但格式美化可能不完整\n",
-                                "warning",
-                            )
-
-                        self.output_text.tag_configure(
-                            "success",
-                            foreground="#4caf50",
-                            font=("微软雅黑", 10, "bold"),
-                        )
-                        self.analysis_completed = True
-                    else:
-                        self.output_text.insert(
-                            tk.END,
-                            f"\n保存成功，但无法找到Excel文件进行格式化：{excel_path}\n",
-                            "warning",
-                        )
-                except Exception as format_error:
-                    print(f"Excel格式化出错: {str(format_error)}")
-                    import traceback
-
-                    print(traceback.format_exc())
-                    self.output_text.insert(
-                        tk.END,
-                        f"\n保存成功，但格式化失败：{str(format_error)}\n",
-                        "warning",
-                    )
-                    self.output_text.tag_configure("warning", foreground="#e69138")
+            # 保存时已经以流式写入完成了格式化，无需再次加载工作簿
+            if save_success:
+                self.output_text.insert(
+                    tk.END,
+                    "\n✓ 已保存分析结果到Excel并完成格式美化\n",
+                    "success",
+                )
+                self.output_text.tag_configure(
+                    "success",
+                    foreground="#4caf50",
+                    font=("微软雅黑", 10, "bold"),
+                )
+                self.analysis_completed = True
             else:
                 self.output_text.insert(
                     tk.END,
@@ -343,6 +331,55 @@ def save_excel_result(self, df):
         _excel_save_in_progress = False
 
 
+def _use_incremental_save(self):
+    """是否启用增量追加保存"""
+    try:
+        return bool(self.excel_incremental_save_var.get())
+    except Exception:
+        return False
+
+
+def _append_excel_result(self, df, excel_path):
+    """增量追加本批结果到已有Excel"""
+    from utils.excel_utils import append_rows_to_excel
+
+    # 只对本批新结果按年份降序排序，已有行保持原顺序
+    if "论文年份" in df.columns:
+        df = df.sort_values(
+            by="论文年份",
+            ascending=False,
+            key=lambda s: pd.to_numeric(s, errors="coerce"),
+        ).reset_index(drop=True)
+
+    save_success = append_rows_to_excel(df, excel_path)
+
+    if save_success:
+        # 结果已写入Excel，不再需要断点日志
+        if getattr(self, "analysis_journal", None) is not None:
+            self.analysis_journal.clear()
+            self.analysis_journal = None
+
+        self.output_text.insert(
+            tk.END,
+            f"\n✓ 已将 {len(df)} 条新结果追加到Excel并完成格式美化\n",
+            "success",
+        )
+        self.output_text.tag_configure(
+            "success", foreground="#4caf50", font=("微软雅黑", 10, "bold")
+        )
+        self.analysis_completed = True
+    else:
+        self.output_text.insert(
+            tk.END,
+            "\n增量追加Excel失败，请检查文件是否被其他程序占用。\n",
+            "warning",
+        )
+        self.output_text.tag_configure("warning", foreground="#e69138")
+
+    self.output_text.see(tk.END)
+    return save_success
+
+
 def on_analysis_complete(self):
     """分析完成后的处理"""
     enable_analysis_buttons(self)
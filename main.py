@@ -1,5 +1,6 @@
 import os
 import sys
+import multiprocessing
 import tkinter as tk
 import ttkbootstrap as ttk_bootstrap
 
@@ -11,6 +12,8 @@ if current_dir not in sys.path:
 from gui.app import PaperAnalyzer
 
 if __name__ == "__main__":
+    # 打包后的程序使用进程池解析PDF时需要此调用
+    multiprocessing.freeze_support()
     try:
         app = PaperAnalyzer()
         app.run()
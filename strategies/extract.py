@@ -8,8 +8,9 @@ from docx.enum.text import WD_LINE_SPACING, WD_PARAGRAPH_ALIGNMENT
 import re
 import threading
 from docx.shared import Pt, Inches, RGBColor
-from utils.api_utils import get_api_adapter, construct_prompt
+from utils.api_utils import get_shared_api_adapter, construct_prompt
 from utils.app_manager import get_thread_safe_gui
+from utils.excel_utils import get_visible_columns
 from utils.thread_utils import ThreadSafeText
 
 
@@ -122,8 +123,8 @@ def extract_all_excel_data(df):
     """从DataFrame提取所有列的数据"""
     all_data = {}
 
-    # 提取每一列的数据
-    for column in df.columns:
+    # 提取每一列的数据，隐藏的来源哈希列不参与分析
+    for column in get_visible_columns(df.columns):
         # 去除NaN值并转换为字符串
         values = df[column].dropna().astype(str).tolist()
         # 过滤掉"未提供相关信息"和空字符串
@@ -160,7 +161,7 @@ def process_content_extraction(self, api_url, api_key):
         try:
             print(f"创建API适配器，模型: {model_name}, URL: {api_url}")
             # 修复API参数顺序, 确保URL和API Key正确传递
-            adapter = get_api_adapter(api_url, api_key, model_name)
+            adapter = get_shared_api_adapter(api_url, api_key, model_name)
         except Exception as e:
             print(f"API适配器创建失败: {e}")  # 添加调试信息
             raise ValueError(f"API适配器初始化失败: {str(e)}")
@@ -8,8 +8,9 @@ from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_LINE_SPACING, WD_PARAGRAPH_ALIGNMENT
 import re
 
-from utils.api_utils import get_api_adapter, construct_prompt
+from utils.api_utils import get_shared_api_adapter, construct_prompt
 from utils.app_manager import get_thread_safe_gui
+from utils.excel_utils import get_visible_columns
 from utils.thread_utils import ThreadSafeText
 
 
@@ -136,7 +137,7 @@ def extract_all_excel_data(df):
     all_data = {}
 
     # 提取每一列的数据
-    for column in df.columns:
+    for column in get_visible_columns(df.columns):
         # 去除NaN值并转换为字符串
         values = df[column].dropna().astype(str).tolist()
         # 过滤掉"未提供相关信息"和空字符串
@@ -421,7 +422,7 @@ def process_review_generation(self, api_url, api_key):
 
         print(f"创建API适配器，模型: {model_name}, URL: {api_url}")
         # 修复API参数顺序, 确保URL和API Key正确传递
-        adapter = get_api_adapter(api_url, api_key, model_name)
+        adapter = get_shared_api_adapter(api_url, api_key, model_name)
 
         # 读取Excel文件
         excel_path = self.excel_path.get()
@@ -442,7 +443,7 @@ def process_review_generation(self, api_url, api_key):
 
         out.insert(
             tk.END,
-            f"找到 {row_count} 行有效数据，包含 {len(df.columns)} 个字段\n\n",
+            f"找到 {row_count} 行有效数据，包含 {len(get_visible_columns(df.columns))} 个字段\n\n",
             "info",
         )
         # 使用更安全的方法设置标签
@@ -0,0 +1,94 @@
+"""
+论文分析断点日志
+每篇论文分析完成后立即追加一行记录，程序崩溃或任务取消后可以从日志恢复，
+只分析尚未完成的论文。
+"""
+
+import os
+import json
+import time
+import threading
+
+from utils.hash_utils import compute_text_hash
+
+
+def get_journal_path(excel_path):
+    """每个目标Excel文件对应一个日志文件"""
+    journal_dir = os.path.join(
+        os.path.expanduser("~"), "Documents", "论文分析工具", "journals"
+    )
+    os.makedirs(journal_dir, exist_ok=True)
+    key = compute_text_hash(os.path.abspath(excel_path))[:16]
+    return os.path.join(journal_dir, f"{key}.jsonl")
+
+
+class AnalysisJournal:
+    """追加写入的分析日志，按PDF内容哈希记录每篇论文的分析结果"""
+
+    def __init__(self, path, columns=None):
+        """
+        :param path: 日志文件路径
+        :param columns: 当前表头，读取时忽略表头不同的旧记录
+        """
+        self.path = path
+        self.columns = columns
+        self.lock = threading.Lock()
+
+    def append(self, file_hash, pdf_path, data):
+        """记录一篇已完成的论文，写入后立即落盘"""
+        record = {
+            "file_hash": file_hash,
+            "pdf_path": pdf_path,
+            "columns": self.columns,
+            "data": data,
+            "time": time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self):
+        """
+        读取已完成的论文
+        :return: {file_hash: data}
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+
+        with self.lock:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时最后一行可能只写了一半
+                        print("断点日志中存在不完整的记录，已忽略")
+                        continue
+                    if self.columns is not None and record.get("columns") not in (
+                        None,
+                        self.columns,
+                    ):
+                        continue
+                    completed[record["file_hash"]] = record["data"]
+
+        return completed
+
+    def clear(self):
+        """结果已保存到Excel后删除日志"""
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def get_analysis_journal(excel_path, columns=None):
+    """获取目标Excel文件对应的分析日志"""
+    return AnalysisJournal(get_journal_path(excel_path), columns)
@@ -1,20 +1,52 @@
 import json
 import requests
 import openai
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse
 import re
+import threading
 import time
 
+from configs.analysis_config import load_analysis_settings
+from utils.disk_cache import get_cache_dir, get_shared_cache
+from utils.rate_limiter import (
+    estimate_tokens,
+    get_error_headers,
+    get_rate_limiter,
+    is_rate_limit_error,
+)
+from utils.retry_policy import RetryPolicy
+
+# 通用API连接池默认设置
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_HTTP_CONNECT_RETRIES = 3
+
+# 进程内复用的API适配器最多保留的数量
+MAX_SHARED_ADAPTERS = 8
+
 
 class ApiAdapter:
     """API适配器基类"""
 
     def __init__(self):
-        self.chunk_callback = None
+        # 回调按线程保存，同一个适配器可以被多个分析线程同时使用
+        self._local = threading.local()
+        # 端点共享的限速器，为None时不限速
+        self.rate_limiter = None
+        # 调用方按此策略决定是否重试以及等待多久
+        self.retry_policy = RetryPolicy()
+
+    @property
+    def chunk_callback(self):
+        return getattr(self._local, "chunk_callback", None)
 
     def set_chunk_callback(self, callback):
-        """设置接收内容块的回调函数"""
-        self.chunk_callback = callback
+        """设置当前线程接收内容块的回调函数"""
+        self._local.chunk_callback = callback
+
+    def close(self):
+        """释放适配器持有的连接，由子类按需实现"""
 
     def create_completion(
         self,
@@ -55,8 +87,26 @@ class ApiAdapter:
             f"API请求: 消息数量={len(messages)}, 总字符数={total_length}, 流式模式={stream}"
         )
 
+        self._wait_for_rate_limit(messages, terminate_check_fn)
         return self._perform_completion(messages, stream, timeout, terminate_check_fn)
 
+    def _wait_for_rate_limit(self, messages, terminate_check_fn=None):
+        """发送请求前等待限速器放行"""
+        if self.rate_limiter is None:
+            return
+        if not self.rate_limiter.acquire(estimate_tokens(messages), terminate_check_fn):
+            raise InterruptedError("等待API限速时任务被取消")
+
+    def _record_response_headers(self, headers):
+        """把响应头中的限速信息反馈给限速器"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_response(headers)
+
+    def _record_error(self, error):
+        """遇到429时让该端点的所有请求一起退避"""
+        if self.rate_limiter is not None and is_rate_limit_error(error):
+            self.rate_limiter.on_rate_limited(get_error_headers(error))
+
     def _perform_completion(
         self, messages, stream=False, timeout=None, terminate_check_fn=None
     ):
@@ -75,15 +125,22 @@ class OpenAIAdapter(ApiAdapter):
             f"初始化OpenAIAdapter - 模型: {model}, API基础URL: {api_base or 'default'}"
         )
         try:
-            # 设置更长的默认超时
+            # 设置更长的默认超时，重试统一由retry_policy控制
             self.client = openai.OpenAI(
-                api_key=api_key, base_url=api_base, timeout=120.0  # 默认120秒超时
+                api_key=api_key,
+                base_url=api_base,
+                timeout=120.0,  # 默认120秒超时
+                max_retries=0,
             )
             print("OpenAI客户端初始化成功")
         except Exception as e:
             print(f"OpenAI客户端初始化失败: {type(e).__name__}: {str(e)}")
             raise
 
+    def close(self):
+        """关闭客户端的连接池"""
+        self.client.close()
+
     def _perform_completion(
         self, messages, stream=False, timeout=None, terminate_check_fn=None
     ):
@@ -99,12 +156,14 @@ class OpenAIAdapter(ApiAdapter):
                 # 增加超时时间
                 actual_timeout = timeout if timeout else 120
 
-                stream = self.client.chat.completions.create(
+                raw_response = self.client.chat.completions.with_raw_response.create(
                     model=self.model,
                     messages=messages,
                     stream=True,
                     timeout=actual_timeout,
                 )
+                self._record_response_headers(raw_response.headers)
+                stream = raw_response.parse()
 
                 chunk_count = 0
                 for chunk in stream:
@@ -138,14 +197,16 @@ class OpenAIAdapter(ApiAdapter):
                 print(f"开始OpenAI非流式请求 - 模型: {self.model}")
                 actual_timeout = timeout if timeout else 120
 
-                response = self.client.chat.completions.create(
+                raw_response = self.client.chat.completions.with_raw_response.create(
                     model=self.model, messages=messages, timeout=actual_timeout
                 )
-                result = response.choices[0].message.content
+                self._record_response_headers(raw_response.headers)
+                result = raw_response.parse().choices[0].message.content
                 print(f"非流式响应完成 - 内容长度: {len(result)}")
                 return result
         except Exception as e:
             print(f"OpenAI API调用失败: {type(e).__name__}: {str(e)}")
+            self._record_error(e)
             raise
 
 
@@ -159,12 +220,19 @@ class AzureOpenAIAdapter(ApiAdapter):
         self.api_base = api_base
         try:
             self.client = openai.AzureOpenAI(
-                api_key=api_key, api_version="2023-05-15", azure_endpoint=api_base
+                api_key=api_key,
+                api_version="2023-05-15",
+                azure_endpoint=api_base,
+                max_retries=0,
             )
         except Exception as e:
             print(f"初始化Azure OpenAI客户端失败: {str(e)}")
             raise
 
+    def close(self):
+        """关闭客户端的连接池"""
+        self.client.close()
+
     def _perform_completion(
         self, messages, stream=False, timeout=None, terminate_check_fn=None
     ):
@@ -172,12 +240,14 @@ class AzureOpenAIAdapter(ApiAdapter):
             # 使用流式响应
             if stream:
                 full_content = ""
-                stream = self.client.chat.completions.create(
+                raw_response = self.client.chat.completions.with_raw_response.create(
                     model=self.model,
                     messages=messages,
                     stream=True,
                     timeout=timeout if timeout else 60,
                 )
+                self._record_response_headers(raw_response.headers)
+                stream = raw_response.parse()
                 for chunk in stream:
                     # 检查是否应该终止处理
                     if terminate_check_fn and terminate_check_fn():
@@ -199,25 +269,65 @@ class AzureOpenAIAdapter(ApiAdapter):
                 return full_content
             else:
                 # 使用普通响应
-                response = self.client.chat.completions.create(
+                raw_response = self.client.chat.completions.with_raw_response.create(
                     model=self.model,
                     messages=messages,
                     timeout=timeout if timeout else 60,
                 )
-                return response.choices[0].message.content
+                self._record_response_headers(raw_response.headers)
+                return raw_response.parse().choices[0].message.content
         except Exception as e:
             print(f"Azure OpenAI API调用失败: {str(e)}")
+            self._record_error(e)
             raise
 
 
+def create_pooled_session(
+    pool_size=DEFAULT_HTTP_POOL_SIZE, connect_retries=DEFAULT_HTTP_CONNECT_RETRIES
+):
+    """
+    创建带连接池的HTTP会话
+    连接保持长连接并在请求之间复用，可在多个分析线程之间共享；
+    只在建立连接失败时重试，此时请求尚未发出，重试POST是安全的
+    """
+    retry = Retry(
+        total=connect_retries,
+        connect=connect_retries,
+        read=False,  # 读取超时或中断时不重试，交给上层的重试逻辑处理
+        status=0,
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class GenericAPIAdapter(ApiAdapter):
     """通用API适配器，支持兼容OpenAI API的其他服务"""
 
-    def __init__(self, api_key, model, api_base):
+    def __init__(
+        self,
+        api_key,
+        model,
+        api_base,
+        pool_size=DEFAULT_HTTP_POOL_SIZE,
+        connect_retries=DEFAULT_HTTP_CONNECT_RETRIES,
+    ):
         super().__init__()
         self.model = model
         self.api_key = api_key
         self.api_base = api_base
+        # 所有请求共用一个连接池，避免每篇论文、每次重试都重新握手
+        self.session = create_pooled_session(pool_size, connect_retries)
+
+    def close(self):
+        """关闭连接池中的所有连接"""
+        self.session.close()
 
     def _perform_completion(
         self, messages, stream=False, timeout=None, terminate_check_fn=None
@@ -229,11 +339,7 @@ class GenericAPIAdapter(ApiAdapter):
             }
 
             # 构建endpoint，确保以/v1/chat/completions结尾
-            endpoint = self.api_base
-            if not endpoint.endswith("/v1/chat/completions"):
-                if not endpoint.endswith("/"):
-                    endpoint += "/"
-                endpoint += "v1/chat/completions"
+            endpoint = build_chat_endpoint(self.api_base)
 
             # 如果需要流式响应
             if stream:
@@ -250,45 +356,49 @@ class GenericAPIAdapter(ApiAdapter):
                     f"发起GenericAPI流式请求 - 端点: {endpoint}, 超时: {actual_timeout}秒"
                 )
 
-                response = requests.post(
+                # 流式响应读完或提前终止后关闭响应，把连接归还连接池
+                with self.session.post(
                     endpoint,
                     headers=headers,
                     json=payload,
                     stream=True,
                     timeout=actual_timeout,
-                )
-                response.raise_for_status()
-
-                full_content = ""
-                # 处理SSE流
-                for line in response.iter_lines():
-                    # 检查是否应该终止处理
-                    if terminate_check_fn and terminate_check_fn():
-                        return full_content
-
-                    if line:
-                        line = line.decode("utf-8")
-                        if line.startswith("data: "):
-                            if line.strip() == "data: [DONE]":
-                                break
-                            try:
-                                data = json.loads(line[6:])
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    if (
-                                        "delta" in data["choices"][0]
-                                        and "content" in data["choices"][0]["delta"]
-                                    ):
-                                        content = data["choices"][0]["delta"]["content"]
-                                        if content:
-                                            full_content += content
-                                            # 正确调用回调函数
-                                            if self.chunk_callback:
-                                                self.chunk_callback(content)
-                                            # 构造类似openai格式的chunk对象用于生成器
-                                            yield data
-                            except Exception as e:
-                                print(f"处理流数据时出错: {str(e)}")
-                return full_content
+                ) as response:
+                    response.raise_for_status()
+                    self._record_response_headers(response.headers)
+
+                    full_content = ""
+                    # 处理SSE流
+                    for line in response.iter_lines():
+                        # 检查是否应该终止处理
+                        if terminate_check_fn and terminate_check_fn():
+                            return full_content
+
+                        if line:
+                            line = line.decode("utf-8")
+                            if line.startswith("data: "):
+                                if line.strip() == "data: [DONE]":
+                                    break
+                                try:
+                                    data = json.loads(line[6:])
+                                    if "choices" in data and len(data["choices"]) > 0:
+                                        if (
+                                            "delta" in data["choices"][0]
+                                            and "content" in data["choices"][0]["delta"]
+                                        ):
+                                            content = data["choices"][0]["delta"][
+                                                "content"
+                                            ]
+                                            if content:
+                                                full_content += content
+                                                # 正确调用回调函数
+                                                if self.chunk_callback:
+                                                    self.chunk_callback(content)
+                                                # 构造类似openai格式的chunk对象用于生成器
+                                                yield data
+                                except Exception as e:
+                                    print(f"处理流数据时出错: {str(e)}")
+                    return full_content
 
             else:
                 # 普通响应
@@ -303,23 +413,26 @@ class GenericAPIAdapter(ApiAdapter):
                     f"发起GenericAPI非流式请求 - 端点: {endpoint}, 超时: {actual_timeout}秒"
                 )
 
-                response = requests.post(
+                response = self.session.post(
                     endpoint, headers=headers, json=payload, timeout=actual_timeout
                 )
                 response.raise_for_status()
+                self._record_response_headers(response.headers)
 
                 response_data = response.json()
                 return response_data["choices"][0]["message"]["content"]
 
         except Exception as e:
             print(f"通用API调用失败: {type(e).__name__}: {str(e)}")
+            self._record_error(e)
             raise
 
 
-def get_api_adapter(api_url=None, api_key=None, model=None):
+def get_api_adapter(api_url=None, api_key=None, model=None, concurrency=None):
     """
     根据URL和模型名称选择合适的API适配器
     支持旧版调用方式(model, api_url, api_key)和新版调用方式(api_url, api_key, model)
+    :param concurrency: 同时进行的API请求数，决定通用API连接池的大小
     """
     # 检测调用方式，兼容旧版接口
     if api_url is not None and api_key is None and model is None:
@@ -341,43 +454,27 @@ def get_api_adapter(api_url=None, api_key=None, model=None):
         return None
 
     try:
-        model = model or "gpt-3.5-turbo"
-
-        # 修正URL中的常见问题
-        # 1. 移除可能的前后空格
-        api_url = api_url.strip()
-
-        # 2. 确保URL以http或https开头
-        if not api_url.startswith(("http://", "https://")):
-            api_url = "https://" + api_url
-            print(f"URL修正: 添加https:// 前缀 -> {api_url}")
-
-        # 3. 修复特定模型的URL问题
-        if "deepseek" in model.lower() and "api.deepseek.com" not in api_url.lower():
-            # 如果模型包含deepseek但URL不是官方API，使用正确的URL
-            api_url = "https://api.deepseek.com"
-            print(f"URL修正: 将URL更改为Deepseek官方API -> {api_url}")
+        backend, api_url, model = resolve_api_backend(api_url, model)
 
-        # 解析URL以确定适配器类型
-        url_parts = urlparse(api_url)
-
-        # 判断是否是Azure OpenAI
-        if "azure.com" in url_parts.netloc:
+        if backend == "azure":
             print(f"使用Azure OpenAI适配器, 模型: {model}")
-            return AzureOpenAIAdapter(api_key, model, api_url)
-        # 判断是否是官方OpenAI
-        elif "openai.com" in url_parts.netloc or not url_parts.netloc:
-            # 官方API或默认
+            adapter = AzureOpenAIAdapter(api_key, model, api_url)
+        elif backend == "openai":
             print(f"使用OpenAI适配器, 模型: {model}")
-            return OpenAIAdapter(api_key, model, api_url if url_parts.netloc else None)
-        # 判断是否是Deepseek
-        elif "deepseek.com" in url_parts.netloc:
-            print(f"使用Deepseek适配器, 模型: {model}")
-            return OpenAIAdapter(api_key, model, api_url)
+            adapter = OpenAIAdapter(api_key, model, api_url)
         else:
-            # 第三方API
+            # 第三方API，连接池至少能容纳所有并发分析线程
             print(f"使用通用API适配器, 模型: {model}, URL: {api_url}")
-            return GenericAPIAdapter(api_key, model, api_url)
+            pool_size, connect_retries = get_http_pool_settings(concurrency)
+            adapter = GenericAPIAdapter(
+                api_key, model, api_url, pool_size, connect_retries
+            )
+
+        adapter.rate_limiter = get_endpoint_rate_limiter(api_url, model)
+        adapter.retry_policy = RetryPolicy.from_settings(
+            load_analysis_settings(), backend
+        )
+        return adapter
     except Exception as e:
         print(f"创建API适配器失败: {type(e).__name__}: {str(e)}")
         import traceback
@@ -386,6 +483,179 @@ def get_api_adapter(api_url=None, api_key=None, model=None):
         return None
 
 
+def resolve_api_backend(api_url, model):
+    """
+    修正URL中的常见问题，并根据URL判断应使用的API后端
+    :return: (后端类型, 修正后的URL, 模型名称)，后端类型为"azure"、"openai"或"generic"，
+             使用OpenAI默认地址时URL为None
+    """
+    model = model or "gpt-3.5-turbo"
+
+    # 修正URL中的常见问题
+    # 1. 移除可能的前后空格
+    api_url = api_url.strip()
+
+    # 2. 确保URL以http或https开头
+    if not api_url.startswith(("http://", "https://")):
+        api_url = "https://" + api_url
+        print(f"URL修正: 添加https:// 前缀 -> {api_url}")
+
+    # 3. 修复特定模型的URL问题
+    if "deepseek" in model.lower() and "api.deepseek.com" not in api_url.lower():
+        # 如果模型包含deepseek但URL不是官方API，使用正确的URL
+        api_url = "https://api.deepseek.com"
+        print(f"URL修正: 将URL更改为Deepseek官方API -> {api_url}")
+
+    # 解析URL以确定适配器类型
+    url_parts = urlparse(api_url)
+
+    # 判断是否是Azure OpenAI
+    if "azure.com" in url_parts.netloc:
+        return "azure", api_url, model
+    # 判断是否是官方OpenAI，官方API或默认
+    if "openai.com" in url_parts.netloc or not url_parts.netloc:
+        return "openai", api_url if url_parts.netloc else None, model
+    # Deepseek使用OpenAI兼容接口
+    if "deepseek.com" in url_parts.netloc:
+        return "openai", api_url, model
+    return "generic", api_url, model
+
+
+def build_chat_endpoint(api_base):
+    """构建通用API的endpoint，确保以/v1/chat/completions结尾"""
+    endpoint = api_base
+    if not endpoint.endswith("/v1/chat/completions"):
+        if not endpoint.endswith("/"):
+            endpoint += "/"
+        endpoint += "v1/chat/completions"
+    return endpoint
+
+
+def get_http_pool_settings(concurrency=None):
+    """
+    读取通用API连接池设置
+    :param concurrency: 同时进行的API请求数，为None时使用配置文件中的分析线程数
+    :return: (连接池大小, 建立连接失败时的重试次数)，连接池至少能容纳所有并发请求
+    """
+    settings = load_analysis_settings()
+    if concurrency is None:
+        concurrency = settings.get("max_workers", 1)
+    pool_size = max(
+        int(settings.get("http_pool_size", DEFAULT_HTTP_POOL_SIZE)),
+        int(concurrency),
+    )
+    connect_retries = int(
+        settings.get("http_connect_retries", DEFAULT_HTTP_CONNECT_RETRIES)
+    )
+    return pool_size, connect_retries
+
+
+def get_rate_limit_settings():
+    """
+    读取客户端限速设置
+    :return: (每分钟请求数, 每分钟token数)，0表示不限制
+    """
+    settings = load_analysis_settings()
+    return (
+        int(settings.get("rate_limit_rpm", 0) or 0),
+        int(settings.get("rate_limit_tpm", 0) or 0),
+    )
+
+
+def get_retry_settings():
+    """读取重试设置，用于判断复用的适配器是否需要按新设置重建"""
+    settings = load_analysis_settings()
+    keys = (
+        "retry_max_attempts",
+        "retry_base_delay",
+        "retry_max_delay",
+        "retry_deadline",
+        "retry_overrides",
+    )
+    return (json.dumps([settings.get(key) for key in keys], sort_keys=True),)
+
+
+def get_endpoint_rate_limiter(api_url, model):
+    """获取端点共享的限速器，未设置RPM/TPM时仍会根据429和限速响应头退避"""
+    rpm, tpm = get_rate_limit_settings()
+    return get_rate_limiter(api_url or "https://api.openai.com", model, rpm, tpm)
+
+
+_shared_adapters = {}
+_shared_adapters_lock = threading.Lock()
+
+# 被新设置替换或超出数量上限的适配器，其他线程可能仍在用它们发送请求，程序退出时才关闭
+_retired_adapters = []
+
+
+def get_shared_api_adapter(api_url=None, api_key=None, model=None, concurrency=None):
+    """
+    获取进程内复用的API适配器
+    相同的(URL, API Key, 模型)返回同一个适配器及其连接池，只有设置变化时才新建，
+    避免每篇论文、每次重试都重新创建客户端和整理URL
+    :param concurrency: 同时进行的API请求数，变化后按新的连接池大小重建适配器；
+                        为None时沿用已有适配器的连接池
+    """
+    key = (api_url, api_key, model)
+    adapter_settings = get_rate_limit_settings() + get_retry_settings()
+    with _shared_adapters_lock:
+        entry = _shared_adapters.get(key)
+        if entry is not None:
+            pool_settings, settings, adapter = entry
+            if settings == adapter_settings and (
+                concurrency is None
+                or pool_settings == get_http_pool_settings(concurrency)
+            ):
+                return adapter
+            # 连接池、限速或重试设置已修改，按新设置重新创建；
+            # 旧适配器上可能还有进行中的请求，不在这里关闭
+            _retired_adapters.append(_shared_adapters.pop(key)[2])
+
+        adapter = get_api_adapter(api_url, api_key, model, concurrency)
+        if adapter is None:
+            return None
+
+        # 超出数量上限时不再复用最早创建的适配器
+        while len(_shared_adapters) >= MAX_SHARED_ADAPTERS:
+            oldest_key = next(iter(_shared_adapters))
+            _retired_adapters.append(_shared_adapters.pop(oldest_key)[2])
+        _shared_adapters[key] = (
+            get_http_pool_settings(concurrency),
+            adapter_settings,
+            adapter,
+        )
+        return adapter
+
+
+def clear_shared_api_adapters():
+    """关闭并移除所有复用的API适配器，包括已被替换的适配器，在程序退出时调用"""
+    with _shared_adapters_lock:
+        for _, _, adapter in _shared_adapters.values():
+            _close_adapter(adapter)
+        _shared_adapters.clear()
+        for adapter in _retired_adapters:
+            _close_adapter(adapter)
+        _retired_adapters.clear()
+
+
+def _close_adapter(adapter):
+    try:
+        adapter.close()
+    except Exception as e:
+        print(f"关闭API适配器失败: {str(e)}")
+
+
+def get_response_cache(max_mb=None, ttl_hours=None):
+    """
+    获取API响应的磁盘缓存，相同的容量上限和有效期复用同一个对象
+    :param max_mb: 容量上限（MB），None表示不限制
+    :param ttl_hours: 条目有效期（小时），None表示永不过期
+    """
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+    ttl = ttl_hours * 3600 if ttl_hours is not None else None
+    return get_shared_cache(get_cache_dir("api_response"), max_bytes=max_bytes, ttl=ttl)
+
+
 def construct_prompt(system_prompt, user_prompt):
     """构建API请求的消息格式"""
     return [
@@ -394,34 +664,24 @@ def construct_prompt(system_prompt, user_prompt):
     ]
 
 
+# 代理对字符（0xD800-0xDFFF）和超出基本多文种平面的字符，替换为空格
+_UNSUPPORTED_CHAR_PATTERN = re.compile("[\ud800-\udfff\U00010000-\U0010ffff]")
+
+# ASCII范围内除制表符、换行符和回车符以外的控制字符，直接删除
+_CONTROL_CHAR_PATTERN = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+
+
 def clean_text_for_api(text):
-    """清理文本使其适合API处理"""
+    """
+    清理文本使其适合API处理
+    代理对字符和Unicode范围超过65536的字符替换为空格，并移除不可打印的控制字符，
+    两次预编译的正则替换都在C层完成，耗时与文本长度成正比
+    """
     if not text:
         return ""
     try:
-        # 初始化一个空字符串，用于存储清理后的文本
-        cleaned_text = ""
-        # 遍历输入文本中的每个字符
-        for char in text:
-            # 检查字符是否是代理对字符（surrogate pairs），范围为 0xD800 到 0xDFFF
-            if not (0xD800 <= ord(char) <= 0xDFFF):
-                # 如果不是代理对字符，将其添加到清理后的文本中
-                cleaned_text += char
-            else:
-                # 如果是代理对字符，用空格替换
-                cleaned_text += " "
-
-        # 再次清理文本，移除 Unicode 范围超过 65536 的字符
-        cleaned_text = "".join(
-            char if ord(char) < 65536 else " " for char in cleaned_text
-        )
-
-        # 使用正则表达式移除控制字符（ASCII 范围内的不可打印字符）
-        cleaned_text = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", cleaned_text)
-
-        # 返回清理后的文本
-        return cleaned_text
-
+        cleaned_text = _UNSUPPORTED_CHAR_PATTERN.sub(" ", text)
+        return _CONTROL_CHAR_PATTERN.sub("", cleaned_text)
     except Exception:
         # 如果在清理过程中发生异常，返回原始文本的 ASCII 编码版本，忽略非 ASCII 字符
         return text.encode("ascii", "ignore").decode("ascii")
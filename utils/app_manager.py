@@ -32,6 +32,11 @@ def cleanup_app_services():
         _analysis_cancelled = False
         _terminate_all_tasks = False
 
+    # 关闭复用的API适配器及其连接池
+    from utils.api_utils import clear_shared_api_adapters
+
+    clear_shared_api_adapters()
+
 
 def terminate_specific_threads():
     """终止特定线程"""
@@ -0,0 +1,305 @@
+"""
+异步API适配器
+与api_utils中的同步适配器使用相同的create_completion接口：
+stream=True时返回异步迭代器，用async for逐块读取；stream=False时返回协程，await得到完整文本。
+所有请求可以在同一个事件循环中并发执行，不需要为每篇论文占用一个线程。
+这是供脚本调用的库层，图形界面的分析流程仍使用api_utils中的同步适配器和线程池，
+目前只有benchmarks/bench_async_api.py使用这些适配器。
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+
+import httpx
+import openai
+
+from utils.api_utils import (
+    ApiAdapter,
+    build_chat_endpoint,
+    get_endpoint_rate_limiter,
+    get_http_pool_settings,
+    resolve_api_backend,
+)
+from configs.analysis_config import load_analysis_settings
+from utils.rate_limiter import estimate_tokens
+from utils.retry_policy import RetryPolicy
+
+# 异步适配器的默认超时（秒）
+DEFAULT_ASYNC_TIMEOUT = 120
+
+
+class AsyncApiAdapter(ApiAdapter):
+    """异步API适配器基类"""
+
+    def __init__(self):
+        super().__init__()
+        # 回调按任务保存，同一事件循环中的并发请求互不干扰
+        self._callback_var = contextvars.ContextVar("chunk_callback", default=None)
+
+    @property
+    def chunk_callback(self):
+        return self._callback_var.get()
+
+    def set_chunk_callback(self, callback):
+        """设置当前任务接收内容块的回调函数"""
+        self._callback_var.set(callback)
+
+    def _wait_for_rate_limit(self, messages, terminate_check_fn=None):
+        # 异步适配器在请求协程中等待限速，避免阻塞事件循环
+        pass
+
+    def _perform_completion(
+        self, messages, stream=False, timeout=None, terminate_check_fn=None
+    ):
+        if stream:
+            return self._limited_stream(messages, timeout, terminate_check_fn)
+        return self._limited_complete(messages, timeout)
+
+    async def _limited_stream(self, messages, timeout, terminate_check_fn):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(estimate_tokens(messages))
+        try:
+            async for chunk in self._stream_completion(
+                messages, timeout, terminate_check_fn
+            ):
+                yield chunk
+        except Exception as e:
+            self._record_error(e)
+            raise
+
+    async def _limited_complete(self, messages, timeout):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(estimate_tokens(messages))
+        try:
+            return await self._complete(messages, timeout)
+        except Exception as e:
+            self._record_error(e)
+            raise
+
+    def _stream_completion(self, messages, timeout, terminate_check_fn):
+        """流式请求，返回逐块产出响应的异步迭代器，由子类实现"""
+        raise NotImplementedError("请在子类中实现_stream_completion方法")
+
+    async def _complete(self, messages, timeout):
+        """非流式请求，返回完整文本，由子类实现"""
+        raise NotImplementedError("请在子类中实现_complete方法")
+
+    async def aclose(self):
+        """关闭客户端的连接池"""
+
+
+class _AsyncOpenAICompatibleAdapter(AsyncApiAdapter):
+    """基于openai异步客户端的适配器，OpenAI和Azure OpenAI共用请求逻辑"""
+
+    def __init__(self, api_key, model):
+        super().__init__()
+        self.model = model
+        self.api_key = api_key
+        self.client = None
+
+    async def _stream_completion(self, messages, timeout, terminate_check_fn):
+        start_time = time.time()
+        chunk_count = 0
+        content_length = 0
+
+        raw_response = await self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            timeout=timeout or DEFAULT_ASYNC_TIMEOUT,
+        )
+        self._record_response_headers(raw_response.headers)
+        # with_raw_response返回的响应对象的parse()是同步方法
+        stream = raw_response.parse()
+        try:
+            async for chunk in stream:
+                # 检查是否应该终止处理
+                if terminate_check_fn and terminate_check_fn():
+                    print("API流被用户终止")
+                    return
+
+                if (
+                    chunk.choices
+                    and hasattr(chunk.choices[0], "delta")
+                    and hasattr(chunk.choices[0].delta, "content")
+                ):
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        content_length += len(content)
+                        chunk_count += 1
+                        if self.chunk_callback:
+                            self.chunk_callback(content)
+                        yield chunk
+        finally:
+            await stream.close()
+
+        duration = time.time() - start_time
+        print(
+            f"异步流式响应完成 - 用时: {duration:.2f}秒, 接收块数: {chunk_count}, 内容长度: {content_length}"
+        )
+
+    async def _complete(self, messages, timeout):
+        raw_response = await self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=messages,
+            timeout=timeout or DEFAULT_ASYNC_TIMEOUT,
+        )
+        self._record_response_headers(raw_response.headers)
+        response = raw_response.parse()
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class AsyncOpenAIAdapter(_AsyncOpenAICompatibleAdapter):
+    """OpenAI API异步适配器"""
+
+    def __init__(self, api_key, model="gpt-3.5-turbo", api_base=None):
+        super().__init__(api_key, model)
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=api_base,
+            timeout=DEFAULT_ASYNC_TIMEOUT,
+            max_retries=0,
+        )
+
+
+class AsyncAzureOpenAIAdapter(_AsyncOpenAICompatibleAdapter):
+    """Azure OpenAI API异步适配器"""
+
+    def __init__(self, api_key, model, api_base):
+        super().__init__(api_key, model)
+        self.api_base = api_base
+        self.client = openai.AsyncAzureOpenAI(
+            api_key=api_key,
+            api_version="2023-05-15",
+            azure_endpoint=api_base,
+            max_retries=0,
+        )
+
+
+class AsyncGenericAPIAdapter(AsyncApiAdapter):
+    """通用API异步适配器，支持兼容OpenAI API的其他服务"""
+
+    def __init__(self, api_key, model, api_base, pool_size=10, connect_retries=3):
+        super().__init__()
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base
+        self.endpoint = build_chat_endpoint(api_base)
+        # 传输层只在建立连接失败时重试，与同步适配器的连接池行为一致
+        self.client = httpx.AsyncClient(
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=connect_retries),
+            timeout=DEFAULT_ASYNC_TIMEOUT,
+        )
+
+    async def _stream_completion(self, messages, timeout, terminate_check_fn):
+        payload = {"model": self.model, "messages": messages, "stream": True}
+
+        async with self.client.stream(
+            "POST",
+            self.endpoint,
+            json=payload,
+            timeout=timeout or DEFAULT_ASYNC_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            self._record_response_headers(response.headers)
+
+            # 处理SSE流
+            async for line in response.aiter_lines():
+                # 检查是否应该终止处理
+                if terminate_check_fn and terminate_check_fn():
+                    return
+
+                # 收到[DONE]后继续读到响应结束，连接才能归还连接池
+                if not line.startswith("data: ") or line.strip() == "data: [DONE]":
+                    continue
+                try:
+                    data = json.loads(line[6:])
+                except json.JSONDecodeError as e:
+                    print(f"处理流数据时出错: {str(e)}")
+                    continue
+
+                choices = data.get("choices") or []
+                content = (
+                    choices[0].get("delta", {}).get("content") if choices else None
+                )
+                if content:
+                    if self.chunk_callback:
+                        self.chunk_callback(content)
+                    yield data
+
+    async def _complete(self, messages, timeout):
+        payload = {"model": self.model, "messages": messages}
+        response = await self.client.post(
+            self.endpoint, json=payload, timeout=timeout or DEFAULT_ASYNC_TIMEOUT
+        )
+        response.raise_for_status()
+        self._record_response_headers(response.headers)
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def get_async_api_adapter(api_url, api_key, model=None):
+    """根据URL和模型名称选择合适的异步API适配器，选择规则与get_api_adapter相同"""
+    if not api_url or not api_key:
+        print("错误: API URL或API Key为空")
+        return None
+
+    backend, api_url, model = resolve_api_backend(api_url, model)
+    if backend == "azure":
+        adapter = AsyncAzureOpenAIAdapter(api_key, model, api_url)
+    elif backend == "openai":
+        adapter = AsyncOpenAIAdapter(api_key, model, api_url)
+    else:
+        pool_size, connect_retries = get_http_pool_settings()
+        adapter = AsyncGenericAPIAdapter(
+            api_key, model, api_url, pool_size, connect_retries
+        )
+
+    # 与同步适配器共享同一端点的限速器
+    adapter.rate_limiter = get_endpoint_rate_limiter(api_url, model)
+    adapter.retry_policy = RetryPolicy.from_settings(load_analysis_settings(), backend)
+    return adapter
+
+
+async def stream_completion_text(adapter, prompt, system=None, timeout=None):
+    """流式调用异步适配器并拼接完整响应文本"""
+    parts = []
+    adapter.set_chunk_callback(parts.append)
+    async for _ in adapter.create_completion(
+        prompt=prompt, system=system, stream=True, timeout=timeout
+    ):
+        pass
+    return "".join(parts)
+
+
+async def gather_completions(adapter, prompts, system=None, max_concurrency=16):
+    """
+    在同一个事件循环中并发分析多篇论文
+    :param prompts: 用户提示词列表
+    :param max_concurrency: 同时进行的最大请求数
+    :return: 与prompts顺序一致的结果列表，失败的请求对应位置为异常对象
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(prompt):
+        async with semaphore:
+            return await stream_completion_text(adapter, prompt, system)
+
+    # 每个请求在独立任务中运行，回调互不干扰
+    return await asyncio.gather(
+        *(run(prompt) for prompt in prompts), return_exceptions=True
+    )
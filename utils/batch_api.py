@@ -0,0 +1,251 @@
+"""
+批处理API
+把多篇论文的分析请求写成一个JSONL文件一次性提交，服务端离线处理完成后统一下载结果。
+接口与OpenAI Batch API一致（/v1/files、/v1/batches），兼容该接口的第三方服务和本地测试服务同样可用。
+"""
+
+import datetime
+import json
+import os
+import time
+
+from configs.analysis_config import load_analysis_settings
+from utils.api_utils import (
+    create_pooled_session,
+    get_http_pool_settings,
+    resolve_api_backend,
+)
+from utils.retry_policy import RetryPolicy
+
+# 批处理请求调用的接口
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# 批处理任务的终止状态
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# 查询任务状态时单次请求的超时（秒）
+BATCH_REQUEST_TIMEOUT = 120
+
+
+class BatchJobError(Exception):
+    """批处理任务创建失败或以非正常状态结束"""
+
+
+def get_batch_dir():
+    """获取保存批处理请求文件的目录"""
+    batch_dir = os.path.join(
+        os.path.expanduser("~"), "Documents", "论文分析工具", "batch_jobs"
+    )
+    os.makedirs(batch_dir, exist_ok=True)
+    return batch_dir
+
+
+def build_batch_request(custom_id, model, system_prompt, user_prompt):
+    """构造批处理文件中的一行请求"""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": user_prompt})
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": model, "messages": messages},
+    }
+
+
+def write_batch_file(batch_requests, path=None):
+    """
+    把请求写入JSONL文件
+    :param path: 文件路径，为None时在批处理目录下按时间生成文件名
+    :return: 文件路径
+    """
+    if path is None:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(get_batch_dir(), f"batch_{timestamp}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for request in batch_requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(text):
+    """
+    解析批处理结果文件
+    :return: (custom_id到响应文本的字典, custom_id到错误信息的字典)
+    """
+    contents = {}
+    errors = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"批处理结果行解析失败: {str(e)}")
+            continue
+
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        error = record.get("error")
+        body = response.get("body") or {}
+        status_code = response.get("status_code", 200)
+
+        if error or status_code >= 400:
+            error = error or body.get("error") or f"HTTP {status_code}"
+            if isinstance(error, dict):
+                error = error.get("message") or json.dumps(error, ensure_ascii=False)
+            errors[custom_id] = str(error)
+            continue
+
+        try:
+            contents[custom_id] = body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            errors[custom_id] = "响应格式不正确"
+    return contents, errors
+
+
+def build_batch_base_url(api_url):
+    """由API URL得到批处理接口的根地址（以/v1结尾）"""
+    base = api_url.rstrip("/")
+    for suffix in ("/v1/chat/completions", "/chat/completions", "/v1"):
+        if base.endswith(suffix):
+            base = base[: -len(suffix)]
+            break
+    return base + "/v1"
+
+
+class BatchClient:
+    """批处理API客户端"""
+
+    def __init__(self, api_url, api_key, model=None):
+        backend, api_url, _ = resolve_api_backend(api_url, model)
+        if backend == "azure":
+            raise BatchJobError("暂不支持Azure OpenAI的批处理接口，请关闭批处理模式")
+
+        self.base_url = build_batch_base_url(api_url or "https://api.openai.com")
+        pool_size, connect_retries = get_http_pool_settings()
+        self.session = create_pooled_session(pool_size, connect_retries)
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self.retry_policy = RetryPolicy.from_settings(load_analysis_settings())
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(
+            method, self.base_url + path, timeout=BATCH_REQUEST_TIMEOUT, **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    def upload_file(self, path):
+        """上传请求文件，返回文件ID"""
+        with open(path, "rb") as f:
+            response = self._request(
+                "POST",
+                "/files",
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(path), f, "application/jsonl")},
+            )
+        return response.json()["id"]
+
+    def create_batch(self, input_file_id):
+        """创建批处理任务，返回任务信息"""
+        response = self._request(
+            "POST",
+            "/batches",
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": BATCH_ENDPOINT,
+                "completion_window": BATCH_COMPLETION_WINDOW,
+            },
+        )
+        return response.json()
+
+    def submit(self, path):
+        """上传请求文件并创建批处理任务"""
+        return self.create_batch(self.upload_file(path))
+
+    def get_batch(self, batch_id):
+        return self._request("GET", f"/batches/{batch_id}").json()
+
+    def cancel_batch(self, batch_id):
+        try:
+            self._request("POST", f"/batches/{batch_id}/cancel")
+        except Exception as e:
+            print(f"取消批处理任务失败: {str(e)}")
+
+    def download_file(self, file_id):
+        return self._request("GET", f"/files/{file_id}/content").text
+
+    def wait(self, batch_id, poll_interval=30, cancel_check=None, on_status=None):
+        """
+        轮询直到任务结束
+        :param cancel_check: 返回True时取消服务端的任务并抛出InterruptedError
+        :param on_status: 每次查询到任务信息后调用
+        :return: 结束时的任务信息
+        :raises BatchJobError: 连续查询失败的次数达到重试策略的最多尝试次数，
+                               或连续失败的时长超过重试策略的总时长上限
+        """
+        failures = 0
+        first_failure = None
+        while True:
+            try:
+                batch = self.get_batch(batch_id)
+                failures = 0
+                first_failure = None
+            except Exception as e:
+                # 查询状态失败不影响服务端的任务，可重试的错误继续轮询
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                failures += 1
+                if first_failure is None:
+                    first_failure = time.time()
+                print(f"查询批处理任务状态失败 ({failures}): {str(e)}")
+                if (
+                    failures >= self.retry_policy.max_attempts
+                    or time.time() - first_failure > self.retry_policy.deadline
+                ):
+                    raise BatchJobError(
+                        f"查询批处理任务状态连续失败 {failures} 次，已停止等待，"
+                        f"服务端的任务不受影响（任务ID: {batch_id}）: {str(e)}"
+                    ) from e
+                batch = None
+
+            if batch is not None:
+                if on_status:
+                    on_status(batch)
+                if batch.get("status") in TERMINAL_STATUSES:
+                    return batch
+
+            wait_until = time.time() + poll_interval
+            while time.time() < wait_until:
+                if cancel_check and cancel_check():
+                    self.cancel_batch(batch_id)
+                    raise InterruptedError("批处理任务已取消")
+                time.sleep(min(1.0, max(0.0, wait_until - time.time())))
+
+    def fetch_results(self, batch):
+        """
+        下载已结束任务的结果
+        :return: (custom_id到响应文本的字典, custom_id到错误信息的字典)
+        """
+        status = batch.get("status")
+        if status in ("failed", "expired") and not batch.get("output_file_id"):
+            errors = (batch.get("errors") or {}).get("data") or []
+            message = "; ".join(e.get("message", "") for e in errors) or status
+            raise BatchJobError(f"批处理任务失败: {message}")
+
+        contents, errors = {}, {}
+        if batch.get("output_file_id"):
+            contents, errors = parse_batch_output(
+                self.download_file(batch["output_file_id"])
+            )
+        if batch.get("error_file_id"):
+            _, file_errors = parse_batch_output(
+                self.download_file(batch["error_file_id"])
+            )
+            errors.update(file_errors)
+        return contents, errors
@@ -0,0 +1,119 @@
+"""
+超长论文的分块分析
+论文超出模型的token预算时，把全文切成相互重叠的若干块，每块单独按表头字段提取信息（map），
+再把各块的结果交给模型合并为一份完整的分析（reduce），避免截断丢失论文后半部分的内容。
+"""
+
+from utils.token_budget import count_tokens, truncate_to_tokens
+
+# 切分时在块末尾的这一比例范围内寻找句子或段落边界
+BOUNDARY_SEARCH_RATIO = 0.1
+
+# 优先在这些位置切分，靠前的优先
+CHUNK_BOUNDARIES = ["\n\n", "\n", "。", ". ", "；", "; ", " "]
+
+# 某一块中没有相关信息的字段填写此值，合并时忽略
+EMPTY_FIELD_VALUE = "无"
+
+CHUNK_PROMPT_TEMPLATE = """
+\"Background\": \"用户需要对一篇较长的学术论文进行详细的总结。论文被分为 {total} 个部分，这是第 {index} 部分，各部分之间有少量重叠。\",
+\"Goals\": \"只根据这部分内容，按以下格式提取各字段的信息（确保使用|分隔符，并且只输出下面指定的字段）：
+{format_str}\",
+\"Constrains\": \"只提取这部分中出现的信息，不要猜测其他部分的内容。这部分中没有相关信息的字段填写“{empty}”。必须严格按照指定格式返回结果。\",
+\"论文内容（第 {index}/{total} 部分）\": \"{{chunk_text}}\"
+"""
+
+REDUCE_PROMPT_TEMPLATE = """
+\"Background\": \"用户需要对学术论文进行详细的总结，用于文献综述或研究整理。论文较长，已分为 {total} 个部分分别提取了信息。\",
+\"Goals\": \"把下面各部分的提取结果合并为对整篇论文的完整总结，并严格按照以下格式提供分析结果（确保使用|分隔符，并且只输出下面指定的字段）：
+{format_str}\",
+\"Constrains\": \"综合所有部分的信息，去除重复内容，各部分之间有矛盾时以更具体、更完整的信息为准。填写“{empty}”的部分表示该部分没有相关信息，不要写入结果。内容应符合学术规范，信息准确、完整，且具有一定的逻辑性和可读性。必须严格按照指定格式返回结果。只返回指定字段，不要添加额外字段。如果需要回复研究意义，确保只回复一段话且可以直接运用于综述。\",
+\"各部分的提取结果\": \"{{partial_results}}\"
+"""
+
+
+def _find_boundary(text, start, end):
+    """在[start, end)的末尾附近寻找切分位置，返回切分后的结束位置"""
+    search_from = end - int((end - start) * BOUNDARY_SEARCH_RATIO)
+    for boundary in CHUNK_BOUNDARIES:
+        position = text.rfind(boundary, search_from, end)
+        if position > start:
+            return position + len(boundary)
+    return end
+
+
+def split_text_into_chunks(text, chunk_tokens, overlap_tokens=0, model=None):
+    """
+    把文本切分为每块不超过chunk_tokens个token的若干块，相邻块重叠约overlap_tokens个token
+    尽量在段落或句子边界处切分
+    :return: 文本块列表
+    """
+    if not text:
+        return []
+    if chunk_tokens <= 0:
+        raise ValueError("chunk_tokens必须大于0")
+    overlap_tokens = max(0, min(overlap_tokens, chunk_tokens // 2))
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        # 先按字符数取一个足够大的窗口，避免对剩余全文反复计数
+        window = text[start : start + chunk_tokens * 8]
+        piece = truncate_to_tokens(window, chunk_tokens, model)
+        end = start + len(piece)
+        if end < len(text):
+            end = _find_boundary(text, start, end)
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+
+        # 按字符比例换算重叠长度，保证每块至少前进一半
+        overlap_chars = int((end - start) * overlap_tokens / chunk_tokens)
+        start = max(end - overlap_chars, start + (end - start) // 2, start + 1)
+    return chunks
+
+
+def build_chunk_prompt(format_str, chunk_text, index, total):
+    """构造第index块（从1开始）的提取提示词"""
+    template = CHUNK_PROMPT_TEMPLATE.format(
+        format_str=format_str, index=index, total=total, empty=EMPTY_FIELD_VALUE
+    )
+    return template.replace("{chunk_text}", chunk_text)
+
+
+def get_chunk_prompt_overhead(format_str, total):
+    """提示词中除文本块以外的固定部分，用于计算每块可用的token数"""
+    return build_chunk_prompt(format_str, "", total, total)
+
+
+def build_reduce_prompt(format_str, partial_results, budget=None, model=None):
+    """
+    构造合并各块结果的提示词
+    :param partial_results: 按块顺序排列的(块序号, 提取结果)列表
+    :param budget: 各块结果合计可用的token数，超出时每块结果按比例截断
+    """
+    total = len(partial_results)
+    template = REDUCE_PROMPT_TEMPLATE.format(
+        format_str=format_str, total=total, empty=EMPTY_FIELD_VALUE
+    )
+
+    per_chunk = None
+    if budget is not None and total:
+        sizes = [count_tokens(result, model) for _, result in partial_results]
+        if sum(sizes) > budget:
+            per_chunk = max(1, budget // total)
+
+    sections = []
+    for index, result in partial_results:
+        result = result.strip()
+        if per_chunk is not None:
+            result = truncate_to_tokens(result, per_chunk, model)
+        sections.append(f"【第 {index} 部分】\n{result}")
+    return template.replace("{partial_results}", "\n\n".join(sections))
+
+
+def get_reduce_prompt_overhead(format_str, total):
+    """合并提示词中除各块结果以外的固定部分"""
+    return REDUCE_PROMPT_TEMPLATE.format(
+        format_str=format_str, total=total, empty=EMPTY_FIELD_VALUE
+    ).replace("{partial_results}", "【第 1 部分】\n" * total)
@@ -0,0 +1,219 @@
+"""
+持久化磁盘缓存
+每个条目保存为一个JSON文件，超过容量上限时淘汰最久未使用的条目。
+写入使用临时文件加替换，可在多个进程间共享同一缓存目录。
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+
+def get_cache_dir(name):
+    """获取指定缓存的目录路径"""
+    cache_dir = os.path.join(
+        os.path.expanduser("~"), "Documents", "论文分析工具", "cache", name
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_cache(cache_dir, max_bytes=None, ttl=None):
+    """
+    获取进程内复用的缓存对象
+    相同的(目录, 容量上限, 有效期)返回同一个对象，缓存总大小只在第一次写入时扫描一次目录
+    """
+    key = (cache_dir, max_bytes, ttl)
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = DiskCache(cache_dir, max_bytes, ttl)
+        return cache
+
+
+class DiskCache:
+    """基于目录的键值缓存，支持容量上限和过期时间"""
+
+    def __init__(self, cache_dir, max_bytes=None, ttl=None):
+        """
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存总大小上限（字节），None表示不限制
+        :param ttl: 条目有效期（秒），None表示永不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 缓存总大小的估计值，第一次写入时扫描一次目录得到，之后每次写入累加，
+        # 超过上限时才重新扫描并淘汰；其他进程写入的条目由record_entry计入
+        self._total_bytes = None
+        self._track_size = True
+        self._size_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # 缓存对象会传给PDF解析进程，锁不能跨进程传递
+        state = self.__dict__.copy()
+        del state["_size_lock"]
+        return state
+
+    def __setstate__(self, state):
+        # 解析进程中的副本只读写条目，总大小由主进程中的对象统计和淘汰
+        self.__dict__.update(state)
+        self._track_size = False
+        self._size_lock = threading.Lock()
+
+    def _entry_path(self, key):
+        """按键的前两位分目录，避免单个目录文件过多"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """读取缓存条目，不存在、已过期或已损坏时返回None"""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except Exception as e:
+            print(f"缓存条目损坏，已删除: {os.path.basename(path)} ({str(e)})")
+            self._remove(path)
+            return None
+
+        if self.ttl is not None and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        # 更新访问时间，供淘汰时判断最近使用情况
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return entry.get("value")
+
+    def set(self, key, value):
+        """写入缓存条目"""
+        path = self._entry_path(key)
+        entry_dir = os.path.dirname(path)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        entry = {"created": time.time(), "value": value}
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            new_size = os.path.getsize(tmp_path)
+            old_size = self._file_size(path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        if self._track_size:
+            self._add_size(new_size - old_size)
+
+    def record_entry(self, key):
+        """把其他进程中的副本写入的条目计入缓存总大小，超过上限时淘汰"""
+        self._add_size(self._file_size(self._entry_path(key)))
+
+    def _add_size(self, delta):
+        if self.max_bytes is None:
+            return
+        with self._size_lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._iter_entries())
+            else:
+                self._total_bytes += delta
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.prune()
+
+    def delete(self, key):
+        """删除指定条目"""
+        path = self._entry_path(key)
+        size = self._file_size(path)
+        if self._remove(path):
+            with self._size_lock:
+                if self._total_bytes is not None:
+                    self._total_bytes -= size
+
+    def _iter_entries(self):
+        """遍历所有缓存文件，返回(路径, 大小, 修改时间)"""
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # 可能已被其他进程删除
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def prune(self):
+        """超过容量上限时，按最久未使用优先淘汰，直到降到上限的90%"""
+        if self.max_bytes is None:
+            return 0
+
+        entries = list(self._iter_entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            with self._size_lock:
+                self._total_bytes = total
+            return 0
+
+        target = self.max_bytes * 0.9
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        with self._size_lock:
+            self._total_bytes = total
+
+        print(f"缓存超出容量上限，已淘汰 {removed} 个条目: {self.cache_dir}")
+        return removed
+
+    def clear(self):
+        """清空缓存，返回删除的条目数"""
+        removed = 0
+        for path, _, _ in list(self._iter_entries()):
+            if self._remove(path):
+                removed += 1
+        with self._size_lock:
+            self._total_bytes = None
+        return removed
+
+    def stats(self):
+        """返回(条目数, 总字节数)"""
+        count = 0
+        total = 0
+        for _, size, _ in self._iter_entries():
+            count += 1
+            total += size
+        return count, total
+
+    @staticmethod
+    def _file_size(path):
+        """文件大小，不存在时为0"""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
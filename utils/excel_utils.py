@@ -1,11 +1,57 @@
 import os
 import time
+import numpy as np
 import pandas as pd
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+from utils.paper_dedup import extract_citation_title
+
+# 缺失信息的统一占位文本
+MISSING_VALUE_TEXT = "未提供相关信息"
+
+# 通常包含长文本、使用固定列宽的列
+LONG_TEXT_COLUMNS = [
+    "论文摘要（中文）",
+    "研究问题及创新点",
+    "研究意义",
+    "研究对象及特点",
+    "实验设置",
+    "重要结论",
+    "未来研究展望",
+]
+
+# 视为缺失信息的占位值（不区分大小写）
+PLACEHOLDER_VALUES = ("nan", "none", "null", "na", "")
+
+# 隐藏列：记录每行结果来源PDF的内容哈希，重新生成时据此精确定位要删除的行
+SOURCE_HASH_COLUMN = "来源文件哈希"
+
+# ===== 共享的样式对象，避免为每个单元格创建新对象 =====
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+# 表头背景为浅蓝色
+HEADER_FILL = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
+# 数据单元格自动换行、顶部左对齐
+CELL_ALIGNMENT = Alignment(wrap_text=True, vertical="top", horizontal="left")
+# 长文本单元格使用淡色背景以增强可读性
+LONG_TEXT_FILL = PatternFill(
+    start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
+)
+
+# 注册到工作簿的命名样式，单元格按名称引用，避免逐个单元格比较样式对象
+HEADER_STYLE_NAME = "论文表头"
+CELL_STYLE_NAME = "论文数据"
+LONG_TEXT_STYLE_NAME = "论文长文本"
+
+HEADER_ROW_HEIGHT = 30
+# 超过该长度的文本单元格使用淡色背景
+LONG_TEXT_FILL_LENGTH = 100
+
 
 def select_excel(self):
     path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
@@ -26,7 +72,7 @@ def check_excel_columns(self, path):
 
         # 读取Excel中的实际列
         df = pd.read_excel(path)
-        actual_columns = list(df.columns)
+        actual_columns = get_visible_columns(df.columns)
 
         # 检查是否与默认列不同
         if sorted(actual_columns) != sorted(default_columns):
@@ -72,12 +118,13 @@ def display_excel_info(self, path):
         try:
             df = pd.read_excel(path)
 
+            visible_columns = get_visible_columns(df.columns)
             self.output_text.insert(tk.END, "=== 表格结构 ===\n", "header")
             self.output_text.insert(tk.END, f"行数: {len(df)}\n", "info")
-            self.output_text.insert(tk.END, f"列数: {len(df.columns)}\n", "info")
+            self.output_text.insert(tk.END, f"列数: {len(visible_columns)}\n", "info")
 
             self.output_text.insert(tk.END, "=== 列名列表 ===\n", "header")
-            for i, col in enumerate(df.columns, 1):
+            for i, col in enumerate(visible_columns, 1):
                 self.output_text.insert(tk.END, f"{i}. {col}\n", "column")
 
             required_columns = [
@@ -182,22 +229,32 @@ def save_to_excel_with_format(df, excel_path, append_mode=True):
             expected_columns = ["论文年份"]
 
         # 如果Excel文件存在且有内容，优先使用Excel中的实际表头
+        # 读取结果在追加模式下复用，避免重复读取整个工作簿
+        existing_df = None
         if os.path.exists(excel_path):
             try:
                 existing_df = pd.read_excel(excel_path)
                 if not existing_df.empty:
                     expected_columns = list(existing_df.columns)
             except Exception:
-                pass
+                existing_df = None
+
+        # 来源哈希列不属于自定义表头，只要新数据或已有数据中存在就保留在最后一列
+        has_source_column = SOURCE_HASH_COLUMN in df.columns or (
+            existing_df is not None and SOURCE_HASH_COLUMN in existing_df.columns
+        )
+        expected_columns = get_visible_columns(expected_columns)
+        if has_source_column:
+            expected_columns.append(SOURCE_HASH_COLUMN)
 
         # 确保DF中有所有预期的列
         for col in expected_columns:
             if col not in df.columns:
-                df[col] = "未提供相关信息"
+                df[col] = MISSING_VALUE_TEXT
             else:
-                df[col] = df[col].fillna("未提供相关信息")
-                df[col] = df[col].apply(
-                    lambda x: "未提供相关信息" if str(x).strip() == "" else x
+                df[col] = df[col].fillna(MISSING_VALUE_TEXT)
+                df[col] = df[col].mask(
+                    df[col].astype(str).str.strip() == "", MISSING_VALUE_TEXT
                 )
 
         # 只保留自定义表头中的列，以确保顺序一致
@@ -211,7 +268,7 @@ def save_to_excel_with_format(df, excel_path, append_mode=True):
                 columns_to_keep = [df.columns[0]]  # 保留第一列
             else:
                 # 创建一个最小列
-                df["论文年份"] = "未提供相关信息"
+                df["论文年份"] = MISSING_VALUE_TEXT
                 columns_to_keep = ["论文年份"]
 
         # 重新排列列顺序
@@ -220,33 +277,20 @@ def save_to_excel_with_format(df, excel_path, append_mode=True):
         # 当append_mode为False时，直接保存df而不进行合并
         if not append_mode:
             # 清理数据
-            for col in df.columns:
-                df[col] = df[col].fillna("未提供相关信息")
-                df[col] = df[col].apply(
-                    lambda x: (
-                        "未提供相关信息"
-                        if (
-                            str(x).lower() in ("nan", "none", "null", "na", "")
-                            or str(x).strip() == ""
-                        )
-                        else str(x)
-                    )
-                )
+            df = normalize_missing_values(df)
 
-            # 保存数据
-            df.to_excel(excel_path, index=False)
+            # 保存数据，写入时同时完成格式化
+            write_excel_with_format(df, excel_path)
             print("数据已保存到Excel（覆盖模式）")
             return True  # 保存成功
 
         # 下面是原有的append模式逻辑
         final_df = None
-        if os.path.exists(excel_path):
+        if existing_df is not None:
             try:
-                existing_df = pd.read_excel(excel_path)
-
                 for col in expected_columns:
                     if col not in existing_df.columns:
-                        existing_df[col] = "未提供相关信息"
+                        existing_df[col] = MISSING_VALUE_TEXT
 
                 existing_df = existing_df.reindex(columns=expected_columns)
 
@@ -262,28 +306,18 @@ def save_to_excel_with_format(df, excel_path, append_mode=True):
         if final_df is None:
             final_df = df.copy()
 
-        for col in final_df.columns:
-            final_df[col] = final_df[col].fillna("未提供相关信息")
-            final_df[col] = final_df[col].apply(
-                lambda x: (
-                    "未提供相关信息"
-                    if (
-                        str(x).lower() in ("nan", "none", "null", "na", "")
-                        or str(x).strip() == ""
-                    )
-                    else str(x)
-                )
-            )
+        # 合并后统一清理一次
+        final_df = normalize_missing_values(final_df)
 
-        # 保存数据
-        final_df.to_excel(excel_path, index=False)
+        # 保存数据，写入时同时完成格式化
+        write_excel_with_format(final_df, excel_path)
         print("数据已保存到Excel（追加模式）")
         return True
 
     except Exception as e:
         print(f"保存Excel出错: {str(e)}")
         try:
-            df = df.fillna("未提供相关信息")
+            df = df.fillna(MISSING_VALUE_TEXT)
             df.to_excel(excel_path, index=False)
             print("尝试简单保存Excel成功")
             return True
@@ -292,155 +326,283 @@ def save_to_excel_with_format(df, excel_path, append_mode=True):
             return False
 
 
-def format_excel_file(excel_path):
-    """单独的Excel格式化函数，与数据保存分离"""
-    print("正在应用Excel格式...")
-    import openpyxl
-    from openpyxl.utils import get_column_letter
+def normalize_missing_values(df):
+    """
+    将空值、空白和nan/none等占位值统一替换为“未提供相关信息”，其余值转为字符串
+    使用pandas向量化字符串操作逐列处理。占位值最长4个字符，
+    因此只对去掉首尾空白后不超过4个字符的值做小写比较，避免复制长文本。
+    """
+    max_placeholder_length = max(len(value) for value in PLACEHOLDER_VALUES)
+    for col in df.columns:
+        values = df[col].fillna(MISSING_VALUE_TEXT).astype(str)
+        candidates = (values.str.strip().str.len() <= max_placeholder_length).to_numpy()
+        is_missing = np.zeros(len(values), dtype=bool)
+        if candidates.any():
+            short_values = values[candidates]
+            is_missing[candidates] = (
+                short_values.str.lower().isin(PLACEHOLDER_VALUES)
+                | (short_values.str.strip() == "")
+            ).to_numpy()
+        df[col] = values.mask(is_missing, MISSING_VALUE_TEXT)
+    return df
+
+
+def get_visible_columns(columns):
+    """去掉隐藏的来源哈希列，得到用户可见的表头"""
+    return [col for col in columns if col != SOURCE_HASH_COLUMN]
+
+
+def build_source_index(df):
+    """
+    根据来源哈希列建立索引
+    :return: {PDF内容哈希: [行标签, ...]}，没有来源记录的旧行不在索引中
+    """
+    source_index = {}
+    if SOURCE_HASH_COLUMN not in df.columns:
+        return source_index
+
+    for label, value in df[SOURCE_HASH_COLUMN].items():
+        if isinstance(value, str) and value and value != MISSING_VALUE_TEXT:
+            source_index.setdefault(value, []).append(label)
+    return source_index
+
+
+def build_title_index(df):
+    """
+    根据引用信息列中的论文标题建立索引，用于匹配没有来源哈希的旧行
+    :return: {规范化标题: [行标签, ...]}
+    """
+    title_index = {}
+    citation_columns = [col for col in df.columns if "引用" in str(col)]
+    for col in citation_columns:
+        for label, value in df[col].items():
+            title = extract_citation_title(value)
+            if title:
+                title_index.setdefault(title, []).append(label)
+    return title_index
+
+
+def append_rows_to_excel(df, excel_path):
+    """
+    增量追加：只写入新行，并只格式化新写入的行
+    不读取和重写已有数据，也不重新格式化已有单元格
+    :return: 是否保存成功
+    """
+    try:
+        wb = openpyxl.load_workbook(excel_path)
+        ws = wb.active
+
+        header = [cell.value for cell in ws[1]]
+        if not any(header):
+            print("Excel没有表头，无法增量追加")
+            return False
+
+        # 旧表格没有来源哈希列时在末尾补上，已有行的该列留空
+        if SOURCE_HASH_COLUMN in df.columns and SOURCE_HASH_COLUMN not in header:
+            ws.cell(row=1, column=len(header) + 1, value=SOURCE_HASH_COLUMN).style = (
+                HEADER_STYLE_NAME
+            )
+            header.append(SOURCE_HASH_COLUMN)
+
+        # 按现有表头对齐列，缺失的列填充占位文本
+        df = df.reindex(columns=header)
+        df = normalize_missing_values(df)
+
+        _register_named_styles(wb)
+        start_row = ws.max_row + 1
+        for row in df.itertuples(index=False):
+            ws.append(list(row))
+        end_row = ws.max_row
+
+        # 增量追加时只加宽列，不因新行较短而缩窄已有列
+        max_lengths = _format_data_rows(ws, start_row)
+        _set_column_widths(ws, header, max_lengths, widen_only=True)
+
+        wb.save(excel_path)
+        print(f"已增量追加 {end_row - start_row + 1} 行到Excel: {excel_path}")
+        return True
+
+    except Exception as e:
+        print(f"增量追加Excel出错: {str(e)}")
+        return False
+
+
+def write_excel_with_format(df, excel_path):
+    """
+    以只写模式流式写出带格式的Excel
+    列宽和行高直接根据字符串长度计算，样式对象全部共享，
+    写入完成即格式化完成，无需再加载工作簿逐单元格调整
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    _register_named_styles(wb)
 
+    header = list(df.columns)
+    columns = [df[col].tolist() for col in header]
+
+    # 只写模式下列宽必须在写入第一行之前设置
+    max_lengths = [
+        max(_text_length(name), max(map(_text_length, values), default=0))
+        for name, values in zip(header, columns)
+    ]
+    _set_column_widths(ws, header, max_lengths)
+
+    ws.row_dimensions[1].height = HEADER_ROW_HEIGHT
+    ws.append([_header_cell(ws, name) for name in header])
+
+    for row_index, values in enumerate(zip(*columns), 2):
+        ws.row_dimensions[row_index].height = _row_height(values)
+        ws.append([_data_cell(ws, value) for value in values])
+
+    wb.save(excel_path)
+
+
+def format_excel_file(excel_path):
+    """
+    单独的Excel格式化函数，与数据保存分离
+    对已有文件只遍历一次单元格，同时设置样式、行高并统计列宽
+    """
     wb = openpyxl.load_workbook(excel_path)
     ws = wb.active
+    _register_named_styles(wb)
 
-    # 查看数据是否实际写入了工作簿
-    print(f"Excel工作表行数: {ws.max_row}")
-    print(f"Excel工作表列数: {ws.max_column}")
-
-    # 设置首行样式
-    print("设置表头样式...")
+    header = []
     for cell in ws[1]:
-        cell.font = openpyxl.styles.Font(bold=True)
-        cell.alignment = openpyxl.styles.Alignment(
-            horizontal="center", vertical="center", wrap_text=True
-        )
-        # 设置背景色为浅蓝色
-        cell.fill = openpyxl.styles.PatternFill(
-            start_color="DDEBF7", end_color="DDEBF7", fill_type="solid"
-        )
+        cell.style = HEADER_STYLE_NAME
+        header.append(cell.value)
+    ws.row_dimensions[1].height = HEADER_ROW_HEIGHT
 
-    # ===== 增强的自动调整列宽逻辑 =====
-    print("智能调整列宽...")
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        column_name = column[0].value
-
-        # 根据不同的列类型设置不同的宽度策略
-        if column_name in [
-            "论文摘要（中文）",
-            "研究问题及创新点",
-            "研究意义",
-            "研究对象及特点",
-            "实验设置",
-            "重要结论",
-            "未来研究展望",
-        ]:
-            # 这些列通常包含长文本，设置较宽的固定宽度
-            print(f"为长文本列 {column_name} 设置宽度")
-            adjusted_width = 50  # 较宽的固定宽度
-        else:
-            # 其他列根据内容长度动态调整
-            for cell in column:
-                if cell.value:
-                    try:
-                        cell_length = len(str(cell.value))
-                        # 对于多行内容，考虑行数和单行最大长度
-                        if "\n" in str(cell.value):
-                            lines = str(cell.value).split("\n")
-                            cell_length = max(len(line) for line in lines)
-
-                        if cell_length > max_length:
-                            max_length = cell_length
-                    except:
-                        pass
-
-            # 设置列宽，但确保合理范围
-            min_width = 15 if column_name != "论文年份" else 10  # 年份列可以窄一些
-            max_width = 30  # 其他列的最大宽度
-            adjusted_width = min(max(max_length + 2, min_width), max_width)
-
-        print(f"设置列 {column_letter} ({column_name}) 宽度为 {adjusted_width}")
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    # ===== 改进的行高调整逻辑 =====
-    print("智能调整行高...")
-    for i, row in enumerate(ws.rows, 1):
-        # 跳过表头行，表头已设置
-        if i == 1:
-            ws.row_dimensions[i].height = 30
+    max_lengths = _format_data_rows(ws, 2)
+    max_lengths = [
+        max(_text_length(name), length) for name, length in zip(header, max_lengths)
+    ]
+    _set_column_widths(ws, header, max_lengths)
+
+    wb.save(excel_path)
+    print(f"Excel已完成格式化: {excel_path}")
+    return True
+
+
+def _register_named_styles(wb):
+    """将表头、数据和长文本样式注册到工作簿，已存在时跳过"""
+    styles = [
+        NamedStyle(
+            HEADER_STYLE_NAME,
+            font=HEADER_FONT,
+            alignment=HEADER_ALIGNMENT,
+            fill=HEADER_FILL,
+        ),
+        NamedStyle(CELL_STYLE_NAME, alignment=CELL_ALIGNMENT),
+        NamedStyle(LONG_TEXT_STYLE_NAME, alignment=CELL_ALIGNMENT, fill=LONG_TEXT_FILL),
+    ]
+    for style in styles:
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+
+
+def _data_style_name(value):
+    """长文本单元格使用带背景的样式"""
+    if isinstance(value, str) and len(value) > LONG_TEXT_FILL_LENGTH:
+        return LONG_TEXT_STYLE_NAME
+    return CELL_STYLE_NAME
+
+
+def _header_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = HEADER_STYLE_NAME
+    return cell
+
+
+def _data_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = _data_style_name(value)
+    return cell
+
+
+def _format_data_rows(ws, min_row):
+    """
+    一次遍历min_row及之后的数据行：设置单元格样式和行高，
+    并返回各列内容的最大单行长度，用于计算列宽
+    """
+    max_lengths = [0] * ws.max_column
+    for row_index, row in enumerate(ws.iter_rows(min_row=min_row), min_row):
+        values = []
+        for col_index, cell in enumerate(row):
+            value = cell.value
+            values.append(value)
+            cell.style = _data_style_name(value)
+            length = _text_length(value)
+            if length > max_lengths[col_index]:
+                max_lengths[col_index] = length
+        ws.row_dimensions[row_index].height = _row_height(values)
+    return max_lengths
+
+
+def _text_length(value):
+    """单元格内容的长度，多行内容取最长一行"""
+    if not value:
+        return 0
+    text = str(value)
+    if "\n" in text:
+        return max(len(line) for line in text.split("\n"))
+    return len(text)
+
+
+def _column_width(column_name, max_length):
+    """根据列类型和内容长度计算列宽"""
+    if column_name in LONG_TEXT_COLUMNS:
+        # 这些列通常包含长文本，设置较宽的固定宽度
+        return 50
+    # 其他列根据内容长度动态调整，但确保合理范围
+    min_width = 15 if column_name != "论文年份" else 10  # 年份列可以窄一些
+    max_width = 30  # 其他列的最大宽度
+    return min(max(max_length + 2, min_width), max_width)
+
+
+def _set_column_widths(ws, header, max_lengths, widen_only=False):
+    """设置各列宽度，widen_only为True时不缩窄已有列"""
+    for col_index, (column_name, max_length) in enumerate(zip(header, max_lengths), 1):
+        column_letter = get_column_letter(col_index)
+        if column_name == SOURCE_HASH_COLUMN:
+            ws.column_dimensions[column_letter].hidden = True
             continue
+        width = _column_width(column_name, max_length)
+        if widen_only and column_name not in LONG_TEXT_COLUMNS:
+            current_width = ws.column_dimensions[column_letter].width
+            if current_width and current_width > width:
+                continue
+        ws.column_dimensions[column_letter].width = width
 
-        # 分析该行所有单元格的内容长度和换行数
-        max_lines = 1
-        has_long_content = False
-
-        for cell in row:
-            if cell.value and isinstance(cell.value, str):
-                content = str(cell.value)
-
-                # 计算换行符数量
-                newlines = content.count("\n")
-
-                # 估算文本所需行数
-                if "\n" in content:
-                    lines = content.split("\n")
-                    # 考虑每行长度超过单元格宽度导致的自动换行
-                    for line in lines:
-                        # 假设每个字符宽度约为10像素，单元格宽度约为50个字符
-                        char_width = 50
-                        line_length = len(line)
-                        estimated_lines = max(1, line_length / char_width)
-                        max_lines = max(max_lines, newlines + 1, estimated_lines)
-                else:
-                    # 估计可能的自动换行
-                    estimated_lines = len(content) / 50
 
-                max_lines = max(max_lines, int(estimated_lines) + 1)  # +1给予额外空间
+def _row_height(values):
+    """根据一行中文本的长度和换行数估算行高"""
+    max_lines = 1
+    has_long_content = False
 
-                # 检查是否包含长内容
-                if len(content) > 200:
-                    has_long_content = True
+    for value in values:
+        if not value or not isinstance(value, str):
+            continue
 
-        # 基于内容计算适合的行高
-        line_height = 25  # 每行估算高度
-        if has_long_content:
-            # 对特别长的内容，确保至少有足够空间显示
-            min_height = 60
+        # 假设单元格宽度约为50个字符，估算自动换行后的行数
+        char_width = 50
+        if "\n" in value:
+            lines = value.split("\n")
+            newlines = len(lines) - 1
+            for line in lines:
+                estimated_lines = max(1, len(line) / char_width)
+                max_lines = max(max_lines, newlines + 1, estimated_lines)
         else:
-            min_height = 30
-
-        # 计算最终行高，确保至少达到最小高度，且足够显示所有文本
-        row_height = max(min_height, line_height * max_lines)
-        # 限制最大行高，避免过高
-        row_height = min(row_height, 200)
-
-        print(f"设置行 {i} 高度为 {row_height} ({max_lines}行文本)")
-        ws.row_dimensions[i].height = row_height
-
-    # ===== 为所有数据单元格设置自动换行和对齐方式 =====
-    print("设置单元格文本格式...")
-    for row in ws.iter_rows(min_row=2):  # 从第二行开始（跳过表题行）
-        for cell in row:
-            # 强制设置自动换行和垂直对齐
-            cell.alignment = openpyxl.styles.Alignment(
-                wrap_text=True,  # 启用自动换行
-                vertical="top",  # 顶部对齐
-                horizontal="left",  # 左对齐
-            )
+            estimated_lines = len(value) / char_width
 
-            # 为长文本添加适当的填充
-            if (
-                cell.value
-                and isinstance(cell.value, str)
-                and len(str(cell.value)) > 100
-            ):
-                # 为长文本单元格设置淡色背景以增强可读性
-                cell.fill = openpyxl.styles.PatternFill(
-                    start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
-                )
+        max_lines = max(max_lines, int(estimated_lines) + 1)  # +1给予额外空间
 
-    # 保存格式化后的文件
-    wb.save(
-        excel_path
-    )  # 这行代码导致了重复保存，但我们需要保留它，因为格式化后需要保存
-    print(f"Excel已完成格式化: {excel_path}")
-    return True
+        # 检查是否包含长内容
+        if len(value) > 200:
+            has_long_content = True
+
+    # 每行估算高度25，特别长的内容至少保留60的高度
+    line_height = 25
+    min_height = 60 if has_long_content else 30
+
+    # 计算最终行高，并限制最大行高，避免过高
+    return min(max(min_height, line_height * max_lines), 200)
@@ -0,0 +1,223 @@
+"""
+隔离的PDF解析进程
+每个解析进程一次处理一个PDF，每解析完一页向主进程报告进度。单页解析超时、整个文件解析超时
+或进程崩溃时，主进程终止该进程，把这个PDF标记为失败，并启动新的进程继续处理其余文件，
+一个异常的PDF不会拖住整批分析。
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from utils.pdf_extract import extract_text_from_pdf
+
+# 检查超时的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 关闭时等待解析进程正常退出的时间（秒），超时后强制终止
+SHUTDOWN_TIMEOUT = 2
+
+
+def failed_result(path, error):
+    """解析失败时的提取结果"""
+    return {
+        "path": path,
+        "text": "",
+        "extracted_pages": 0,
+        "total_pages": 0,
+        "error": error,
+    }
+
+
+def _worker_main(conn):
+    """解析进程的主循环：接收(键, 路径, 参数)，每解析完一页发送进度，最后发送结果"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        key, path, kwargs = task
+
+        def on_page(page_index):
+            conn.send(("page", key, page_index))
+
+        try:
+            result = extract_text_from_pdf(path, on_page=on_page, **kwargs)
+        except Exception as e:
+            result = failed_result(path, f"{type(e).__name__}: {str(e)}")
+        conn.send(("done", key, result))
+
+
+class _Worker:
+    """一个解析进程及其正在处理的任务"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.started = 0.0
+        self.last_progress = 0.0
+        self.page_index = -1
+
+    def assign(self, task):
+        self.conn.send(task)
+        self.task = task
+        self.started = self.last_progress = time.monotonic()
+        self.page_index = -1
+
+    def receive(self):
+        """
+        读取进程发来的全部消息
+        :return: 任务完成时返回提取结果，尚未完成时返回None
+        :raises EOFError: 进程已退出
+        """
+        while self.conn.poll():
+            kind, _, payload = self.conn.recv()
+            if kind == "page":
+                self.page_index = payload
+                self.last_progress = time.monotonic()
+            elif kind == "done":
+                self.task = None
+                return payload
+        if not self.process.is_alive():
+            raise EOFError
+        return None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedExtractor:
+    """
+    在独立的子进程中解析PDF
+    :param processes: 同时运行的解析进程数
+    :param file_timeout: 单个文件的解析时间上限（秒），0表示不限制
+    :param page_timeout: 打开文件或解析单页的时间上限（秒），0表示不限制
+    """
+
+    def __init__(self, processes=1, file_timeout=0, page_timeout=0):
+        self.processes = max(1, int(processes))
+        self.file_timeout = file_timeout or None
+        self.page_timeout = page_timeout or None
+        self.context = multiprocessing.get_context()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """结束所有解析进程，正在解析的进程直接终止"""
+        for worker in self.workers:
+            if worker.task is None and worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for worker in self.workers:
+            if worker.task is None:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+            worker.kill()
+        self.workers = []
+
+    def _check_timeout(self, worker, now):
+        """返回超时说明，未超时时返回None"""
+        if self.file_timeout and now - worker.started > self.file_timeout:
+            return f"解析超时：整个文件超过 {self.file_timeout} 秒未完成"
+        if self.page_timeout and now - worker.last_progress > self.page_timeout:
+            if worker.page_index < 0:
+                return f"解析超时：打开文件或解析第1页超过 {self.page_timeout} 秒"
+            return (
+                f"解析超时：第 {worker.page_index + 2} 页超过 "
+                f"{self.page_timeout} 秒未完成"
+            )
+        return None
+
+    @staticmethod
+    def _record_cache_entry(kwargs, result):
+        """解析进程写入的文本缓存条目由主进程中的缓存对象计入总大小"""
+        cache = kwargs.get("cache")
+        if cache is not None and result.get("cache_key"):
+            try:
+                cache.record_entry(result["cache_key"])
+            except Exception as e:
+                print(f"更新文本缓存大小失败: {str(e)}")
+
+    def _discard(self, worker):
+        worker.kill()
+        self.workers.remove(worker)
+
+    def imap_unordered(self, jobs, cancel_check=None):
+        """
+        解析多个PDF，按完成顺序返回结果
+        :param jobs: (键, PDF路径, extract_text_from_pdf的其余参数)列表
+        :param cancel_check: 返回True时停止分配和等待，剩余的任务不再返回结果
+        :return: 依次生成(键, 提取结果)；超时或崩溃的文件返回error说明原因的结果
+        """
+        pending = deque(jobs)
+        while True:
+            if cancel_check and cancel_check():
+                return
+
+            # 给空闲的进程分配任务，进程不足时启动新的进程
+            for worker in self.workers:
+                if pending and worker.task is None:
+                    worker.assign(pending.popleft())
+            while pending and len(self.workers) < self.processes:
+                worker = _Worker(self.context)
+                self.workers.append(worker)
+                worker.assign(pending.popleft())
+
+            busy = [worker for worker in self.workers if worker.task is not None]
+            if not busy:
+                return
+
+            handles = [worker.conn for worker in busy]
+            handles += [worker.process.sentinel for worker in busy]
+            wait(handles, timeout=POLL_INTERVAL)
+
+            now = time.monotonic()
+            for worker in busy:
+                key, path, kwargs = worker.task
+                try:
+                    result = worker.receive()
+                except (EOFError, OSError):
+                    exitcode = worker.process.exitcode
+                    print(f"PDF解析进程异常退出: {path}，退出码 {exitcode}")
+                    self._discard(worker)
+                    yield key, failed_result(
+                        path, f"解析进程异常退出（退出码 {exitcode}）"
+                    )
+                    continue
+
+                if result is not None:
+                    self._record_cache_entry(kwargs, result)
+                    yield key, result
+                    continue
+
+                timeout_error = self._check_timeout(worker, now)
+                if timeout_error:
+                    print(f"终止PDF解析进程: {path}，{timeout_error}")
+                    self._discard(worker)
+                    yield key, failed_result(path, timeout_error)
+
+    def extract(self, path, **kwargs):
+        """在解析进程中解析单个PDF，返回提取结果"""
+        for _, result in self.imap_unordered([(path, path, kwargs)]):
+            return result
+        return failed_result(path, "解析已取消")
@@ -0,0 +1,27 @@
+"""
+文件和文本的哈希计算
+"""
+
+import hashlib
+import json
+
+# 读取文件时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(path):
+    """计算文件内容的SHA-256哈希，与文件名和路径无关"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def compute_text_hash(*parts):
+    """计算若干可JSON序列化对象的组合哈希，用于生成缓存键"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
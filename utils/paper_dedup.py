@@ -0,0 +1,146 @@
+"""
+重复论文检测
+同一篇论文常以不同的文件名被重复下载，或同时存在预印本和正式发表的版本。
+内容完全相同的文件按文件哈希判断；不同版本按论文开头几页文本的指纹判断：
+把文本切分为连续若干个词组成的片段，取片段哈希值最小的若干个作为指纹（bottom-k），
+两个指纹的相似度是两篇论文片段集合Jaccard相似度的估计值。
+与Excel中已分析的论文比较时，从已有行的引用信息中取出标题，在论文开头的文本中查找。
+"""
+
+import hashlib
+import heapq
+import re
+import unicodedata
+
+# 计算指纹时提取的页数，标题、作者和摘要通常都在前两页
+FINGERPRINT_PAGES = 2
+
+# 只用开头这么多个词计算指纹，两个版本分页不同时比较的仍是相同范围的内容
+FINGERPRINT_WORDS = 1000
+
+# 每个片段包含的词数
+SHINGLE_WORDS = 3
+
+# 指纹保留的哈希值个数，越大相似度估计越准确
+FINGERPRINT_SIZE = 128
+
+# 片段少于此数时不计算指纹，避免扫描版等几乎没有文本的PDF被误判为重复
+MIN_FINGERPRINT_SHINGLES = 50
+
+# 标题规范化后少于此字符数时不用于匹配，避免过短的标题误匹配
+MIN_TITLE_CHARS = 20
+
+# 只在论文规范化文本的开头这么多个字符中查找标题，标题、作者和摘要都在这一范围内
+TITLE_SEARCH_CHARS = 3000
+
+# 英文单词和数字按词切分，中文按字切分
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+
+# 引用信息中的标题：APA格式“作者 (年份). 标题. 期刊”，GB/T 7714格式“作者. 标题[J]. 期刊”
+_APA_TITLE = re.compile(r"\(\s*\d{4}[a-z]?\s*\)\s*[.,]?\s*(.+?)[.?!](?:\s|$)")
+_GBT_TITLE = re.compile(r"\.\s*([^.]+?)\s*\[[A-Z](?:/OL)?\]")
+
+
+def _hash_shingle(shingle):
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def compute_text_fingerprint(text):
+    """
+    计算文本的指纹，忽略大小写、标点和换行的差异
+    :return: 按大小排列的哈希值元组，文本过少时返回None
+    """
+    tokens = _TOKEN_PATTERN.findall((text or "").lower())[:FINGERPRINT_WORDS]
+    shingles = {
+        " ".join(tokens[i : i + SHINGLE_WORDS])
+        for i in range(len(tokens) - SHINGLE_WORDS + 1)
+    }
+    if len(shingles) < MIN_FINGERPRINT_SHINGLES:
+        return None
+    hashes = {_hash_shingle(shingle) for shingle in shingles}
+    return tuple(heapq.nsmallest(FINGERPRINT_SIZE, hashes))
+
+
+def fingerprint_similarity(first, second):
+    """两个指纹的相似度（0到1），估计两段文本片段集合的Jaccard相似度"""
+    first, second = set(first), set(second)
+    sample = heapq.nsmallest(FINGERPRINT_SIZE, first | second)
+    if not sample:
+        return 0.0
+    shared = sum(1 for value in sample if value in first and value in second)
+    return shared / len(sample)
+
+
+def find_duplicate_papers(papers, threshold):
+    """
+    找出重复的论文，每组重复的论文保留最先出现的一篇
+    :param papers: 按保留优先级排列的(论文索引, 文件哈希, 文本指纹)列表，哈希或指纹未知时为None
+    :param threshold: 指纹相似度不低于此值时视为同一论文的不同版本
+    :return: {重复论文的索引: (保留的论文索引, 相似度)}，内容完全相同时相似度为None
+    """
+    duplicates = {}
+    kept_by_hash = {}
+    kept_fingerprints = {}
+    # 指纹中的哈希值到保留论文的倒排索引，只与有共同片段的论文比较
+    kept_by_value = {}
+
+    for index, file_hash, fingerprint in papers:
+        if file_hash is not None:
+            if file_hash in kept_by_hash:
+                duplicates[index] = (kept_by_hash[file_hash], None)
+                continue
+            kept_by_hash[file_hash] = index
+
+        if fingerprint is None:
+            continue
+
+        candidates = {
+            kept for value in fingerprint for kept in kept_by_value.get(value, ())
+        }
+        best = None
+        for kept in sorted(candidates):
+            similarity = fingerprint_similarity(fingerprint, kept_fingerprints[kept])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (kept, similarity)
+        if best:
+            duplicates[index] = best
+            continue
+
+        kept_fingerprints[index] = fingerprint
+        for value in fingerprint:
+            kept_by_value.setdefault(value, []).append(index)
+    return duplicates
+
+
+def normalize_title(text):
+    """规范化标题或文本：统一全半角和大小写，去掉标点，词之间用一个空格分隔"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(_TOKEN_PATTERN.findall(text))
+
+
+def extract_citation_title(citation):
+    """
+    从引用信息中取出规范化的论文标题
+    :return: 标题，无法识别或标题过短时返回None
+    """
+    if not isinstance(citation, str):
+        return None
+    match = _APA_TITLE.search(citation) or _GBT_TITLE.search(citation)
+    if not match:
+        return None
+    title = normalize_title(match.group(1))
+    return title if len(title) >= MIN_TITLE_CHARS else None
+
+
+def find_matching_title(text, titles):
+    """
+    在论文开头的文本中查找已有的标题
+    :param titles: extract_citation_title返回的规范化标题
+    :return: 第一个出现的标题，都未出现时返回None
+    """
+    head = f" {normalize_title(text)[:TITLE_SEARCH_CHARS]} "
+    for title in titles:
+        if f" {title} " in head:
+            return title
+    return None
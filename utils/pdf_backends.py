@@ -0,0 +1,219 @@
+"""
+PDF文本提取引擎
+统一的逐页提取接口，可在设置中选择解析引擎。PyPDF2是必装依赖，作为默认和兜底的引擎；
+PyMuPDF、pypdfium2和pdfminer.six为可选依赖，安装后可选用：
+PyMuPDF和pypdfium2基于C实现，解析速度远快于PyPDF2；pdfminer.six按版面分析文本块，
+双栏论文的阅读顺序更准确，但速度较慢。
+"""
+
+import importlib.util
+import mmap
+from contextlib import contextmanager
+
+# 兜底的解析引擎，其他引擎未安装或解析失败时使用
+FALLBACK_BACKEND = "pypdf2"
+
+# 设置为"auto"时按此顺序使用第一个已安装的引擎
+AUTO_BACKEND_ORDER = ["pymupdf", "pypdfium2", "pypdf2"]
+
+# 每解析这么多页后清空解析引擎缓存的对象，扫描版论文的页面图片等大对象不会一直留在内存中
+PAGE_CACHE_WINDOW = 8
+
+
+@contextmanager
+def map_file(f):
+    """
+    以内存映射的方式读取已打开的文件，文件内容由操作系统按需换入换出，不会整体读入进程内存
+    读过的页面计入进程的常驻内存，不支持madvise释放（如Windows）或空文件等无法映射时直接使用文件对象
+    """
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        yield f
+        return
+    try:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        yield f
+        return
+    try:
+        yield mapping
+    finally:
+        try:
+            mapping.close()
+        except BufferError:
+            pass  # 仍有对象引用映射的内容时由垃圾回收关闭
+
+
+def release_mapped_pages(stream):
+    """把内存映射中已读过的页面交还给操作系统，之后再读取时重新从文件换入"""
+    if isinstance(stream, mmap.mmap):
+        stream.madvise(mmap.MADV_DONTNEED)
+
+
+class PdfExtractor:
+    """PDF文本提取引擎的基类"""
+
+    name = ""
+    # 引擎依赖的模块名，用于检查是否已安装
+    module = ""
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    def iter_pages(self, path, max_pages):
+        """
+        逐页提取文本的生成器，只在取用时解析下一页
+        :return: 依次生成(页码（从0开始）, 总页数, 页面文本)
+        """
+        raise NotImplementedError
+
+
+class PyPDF2Extractor(PdfExtractor):
+    """PyPDF2：纯Python实现，无需额外安装"""
+
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def iter_pages(self, path, max_pages):
+        import PyPDF2
+
+        with open(path, "rb") as f, map_file(f) as stream:
+            pdf_reader = PyPDF2.PdfReader(stream)
+            num_pages = len(pdf_reader.pages)
+            for i in range(min(max_pages, num_pages)):
+                text = pdf_reader.pages[i].extract_text() or ""
+                # 只保留最近一个窗口内解析出的对象，之后用到时从文件中重新读取
+                if (i + 1) % PAGE_CACHE_WINDOW == 0:
+                    pdf_reader.resolved_objects.clear()
+                    release_mapped_pages(stream)
+                yield i, num_pages, text
+
+
+class PyMuPDFExtractor(PdfExtractor):
+    """PyMuPDF（pip install pymupdf）：基于MuPDF，速度最快"""
+
+    name = "pymupdf"
+    module = "pymupdf"
+
+    @classmethod
+    def is_available(cls):
+        # 1.24之前的版本只提供fitz模块
+        return super().is_available() or importlib.util.find_spec("fitz") is not None
+
+    def iter_pages(self, path, max_pages):
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf
+
+        with pymupdf.open(path) as document:
+            num_pages = document.page_count
+            for i in range(min(max_pages, num_pages)):
+                text = document[i].get_text("text") or ""
+                # 清空MuPDF缓存的已解码对象，否则扫描版论文的页面图片会一直留在内存中
+                if (i + 1) % PAGE_CACHE_WINDOW == 0:
+                    pymupdf.TOOLS.store_shrink(100)
+                yield i, num_pages, text
+
+
+class PdfiumExtractor(PdfExtractor):
+    """pypdfium2（pip install pypdfium2）：基于Chrome使用的PDFium"""
+
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def iter_pages(self, path, max_pages):
+        import pypdfium2
+
+        document = pypdfium2.PdfDocument(path)
+        try:
+            num_pages = len(document)
+            for i in range(min(max_pages, num_pages)):
+                # PDFium在文档关闭前保留已加载的页面资源，每个窗口重新打开一次文档
+                if i and i % PAGE_CACHE_WINDOW == 0:
+                    document.close()
+                    document = pypdfium2.PdfDocument(path)
+                page = document[i]
+                text_page = page.get_textpage()
+                try:
+                    text = text_page.get_text_range()
+                finally:
+                    text_page.close()
+                    page.close()
+                yield i, num_pages, text or ""
+        finally:
+            document.close()
+
+
+class PdfMinerExtractor(PdfExtractor):
+    """pdfminer.six（pip install pdfminer.six）：按版面分析文本块，双栏论文的顺序更准确"""
+
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def iter_pages(self, path, max_pages):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams, LTTextContainer
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdftypes import resolve1
+
+        with open(path, "rb") as f:
+            document = PDFDocument(PDFParser(f))
+            num_pages = int(resolve1(document.catalog["Pages"])["Count"])
+
+        # 不缓存已解析的对象，否则扫描版论文的页面图片会一直留在内存中
+        pages = extract_pages(
+            path, maxpages=max_pages, laparams=LAParams(), caching=False
+        )
+        for i, layout in enumerate(pages):
+            text = "".join(
+                element.get_text()
+                for element in layout
+                if isinstance(element, LTTextContainer)
+            )
+            yield i, num_pages, text
+
+
+PDF_EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (
+        PyPDF2Extractor,
+        PyMuPDFExtractor,
+        PdfiumExtractor,
+        PdfMinerExtractor,
+    )
+}
+
+
+def get_available_backends():
+    """已安装的解析引擎名称列表"""
+    return [
+        name for name, extractor in PDF_EXTRACTORS.items() if extractor.is_available()
+    ]
+
+
+def resolve_backend_name(name):
+    """
+    把设置中的引擎名称解析为实际使用的引擎
+    "auto"时选择最快的已安装引擎，未知或未安装的引擎改用PyPDF2
+    """
+    name = (name or "auto").strip().lower()
+    if name == "auto":
+        for candidate in AUTO_BACKEND_ORDER:
+            if PDF_EXTRACTORS[candidate].is_available():
+                return candidate
+        return FALLBACK_BACKEND
+
+    if name not in PDF_EXTRACTORS:
+        print(f"未知的PDF解析引擎 {name}，改用 {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+    if not PDF_EXTRACTORS[name].is_available():
+        print(f"PDF解析引擎 {name} 未安装，改用 {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+    return name
+
+
+def get_pdf_extractor(name=FALLBACK_BACKEND):
+    """获取解析引擎实例，name应为resolve_backend_name解析后的名称"""
+    return PDF_EXTRACTORS.get(name, PDF_EXTRACTORS[FALLBACK_BACKEND])()
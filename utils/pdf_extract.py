@@ -0,0 +1,286 @@
+"""
+PDF文本提取
+不依赖GUI组件，可以在子进程中运行
+"""
+
+import os
+import re
+import time
+from contextlib import closing
+
+from utils.api_utils import clean_text_for_api
+from utils.disk_cache import get_cache_dir, get_shared_cache
+from utils.hash_utils import compute_file_hash, compute_text_hash
+from utils.memory_utils import MB, get_rss_bytes
+from utils.pdf_backends import FALLBACK_BACKEND, get_pdf_extractor
+from utils.section_detector import find_references_start, has_section_structure
+from utils.token_budget import estimate_text_tokens
+
+# 每篇论文最多提取的页数
+MAX_PDF_PAGES = 30
+
+# 文本清理规则版本，修改提取或清理逻辑时递增，使旧的缓存条目失效
+TEXT_CLEANUP_VERSION = 1
+
+# 按token上限提前停止时多提取的余量，抵消按字符估算token的误差
+EARLY_STOP_TOKEN_MARGIN = 1.2
+
+# 之前的页面至少有这么多字符时才在参考文献处停止，避免把目录中的标题当作参考文献
+MIN_TEXT_BEFORE_REFERENCES = 2000
+
+
+def get_text_cache(max_mb=None):
+    """获取PDF提取文本的磁盘缓存，max_mb为None时不限制容量，相同上限复用同一个对象"""
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+    return get_shared_cache(get_cache_dir("pdf_text"), max_bytes=max_bytes)
+
+
+def get_extraction_cache_key(
+    file_hash,
+    max_pages,
+    token_limit=None,
+    stop_at_references=False,
+    backend=FALLBACK_BACKEND,
+    extend_pages=None,
+):
+    """缓存键由文件内容哈希和提取设置共同决定"""
+    settings = {"max_pages": max_pages, "cleanup_version": TEXT_CLEANUP_VERSION}
+    # 提前停止的条件、延长的页数和解析引擎会改变提取结果，未启用时保持原来的缓存键
+    if token_limit or stop_at_references:
+        settings["token_limit"] = token_limit
+        settings["stop_at_references"] = stop_at_references
+    if extend_pages:
+        settings["extend_pages"] = extend_pages
+    if backend != FALLBACK_BACKEND:
+        settings["backend"] = backend
+    return compute_text_hash("pdf_text", file_hash, settings)
+
+
+def iter_pdf_pages(path, max_pages=MAX_PDF_PAGES, backend=FALLBACK_BACKEND):
+    """
+    逐页提取PDF文本的生成器，只在取用时解析下一页，调用方停止迭代后不再解析后续页面
+    :param backend: 解析引擎名称，见pdf_backends.PDF_EXTRACTORS
+    :return: 依次生成(页码（从0开始）, 总页数, 页面文本)
+    """
+    return get_pdf_extractor(backend).iter_pages(path, max_pages)
+
+
+def _read_pages(
+    path,
+    max_pages,
+    token_limit,
+    stop_at_references,
+    extend_pages,
+    backend,
+    memory_limit_mb,
+    on_page,
+    result,
+):
+    """逐页读取文本直到满足停止条件，页数和停止原因写入result，返回各页文本"""
+    text_parts = []
+    text_length = 0
+    text_tokens = 0
+    # 读到参考文献时会停止，延长页数才不会一直读到延长的上限
+    if not stop_at_references or not extend_pages or extend_pages <= max_pages:
+        extend_pages = None
+    page_limit = max_pages
+    # 限制的是解析过程中的内存增长，在界面进程中解析时不计入界面本身占用的内存
+    base_rss = get_rss_bytes() if memory_limit_mb else None
+    with closing(iter_pdf_pages(path, extend_pages or max_pages, backend)) as pages:
+        for page_index, num_pages, text in pages:
+            result["total_pages"] = num_pages
+            result["extracted_pages"] = page_index + 1
+            if on_page:
+                on_page(page_index)
+
+            # 读到页数上限仍未遇到参考文献（遇到时已停止），且已有的文本能识别出章节结构时
+            # 继续读，论文后部的结果和结论才能参与按章节选择
+            if extend_pages and page_index + 1 == page_limit < num_pages:
+                head_text = re.sub(r"\s+", " ", " ".join(text_parts + [text]))
+                if has_section_structure(head_text):
+                    page_limit = extend_pages
+            is_last_page = page_index + 1 >= min(page_limit, num_pages)
+
+            # 内存增长超过上限时停止解析，只使用已提取的部分，避免进程被系统终止
+            if base_rss is not None and not is_last_page:
+                rss = get_rss_bytes()
+                if rss is not None and rss - base_rss > memory_limit_mb * MB:
+                    if text:
+                        text_parts.append(text)
+                    result["stop_reason"] = "memory"
+                    break
+
+            if not text:
+                if is_last_page:
+                    break
+                continue
+            text_parts.append(text)
+
+            # 参考文献之后是附录等价值较低的内容，不再解析
+            if (
+                stop_at_references
+                and text_length >= MIN_TEXT_BEFORE_REFERENCES
+                and find_references_start(re.sub(r"\s+", " ", text)) is not None
+            ):
+                if not is_last_page:
+                    result["stop_reason"] = "references"
+                break
+
+            # 已提取的文本足够填满预算，后续页面会被截断，不再解析
+            text_length += len(text)
+            text_tokens += estimate_text_tokens(text)
+            if token_limit and text_tokens >= token_limit * EARLY_STOP_TOKEN_MARGIN:
+                if not is_last_page:
+                    result["stop_reason"] = "budget"
+                break
+            if is_last_page:
+                break
+    return text_parts
+
+
+def extract_text_from_pdf(
+    path,
+    max_pages=MAX_PDF_PAGES,
+    cache=None,
+    token_limit=None,
+    stop_at_references=False,
+    extend_pages=None,
+    backend=FALLBACK_BACKEND,
+    memory_limit_mb=None,
+    max_file_mb=None,
+    on_page=None,
+):
+    """
+    从PDF提取并清理文本
+    :param path: PDF文件路径
+    :param max_pages: 最多提取的页数
+    :param cache: 提取文本的DiskCache，命中时跳过解析
+    :param token_limit: 已提取的文本估计超过这么多token时停止解析后续页面，None表示不限制
+    :param stop_at_references: 读到参考文献标题所在的页面后停止解析后续页面
+    :param extend_pages: 读到max_pages页仍未遇到参考文献、且已能识别出章节结构时，
+                         继续解析到这么多页，需同时启用stop_at_references
+    :param backend: 解析引擎名称，解析失败时改用PyPDF2重试
+    :param memory_limit_mb: 解析过程中进程内存增长的上限（MB），超出时停止解析后续页面
+    :param max_file_mb: 文件大小上限（MB），超出时不解析并返回错误
+    :param on_page: 每解析完一页后以页码调用，用于监控解析进度
+    :return: 字典，包含text、extracted_pages、total_pages、file_hash、cached、
+             stop_reason（提前停止的原因："budget"、"references"、"memory"或None）、
+             backend（实际使用的解析引擎）、pages_per_second（解析速度，命中缓存时为None）、
+             cache_key（写入了缓存时的缓存键，否则为None）和error（成功时为None）
+    """
+    result = {
+        "path": path,
+        "text": "",
+        "extracted_pages": 0,
+        "total_pages": 0,
+        "file_hash": None,
+        "cached": False,
+        "stop_reason": None,
+        "backend": backend,
+        "pages_per_second": None,
+        "cache_key": None,
+        "error": None,
+    }
+
+    try:
+        file_size = os.path.getsize(path)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+    if max_file_mb and file_size > max_file_mb * MB:
+        result["error"] = (
+            f"文件过大（{file_size / MB:.0f} MB，上限 {max_file_mb} MB），已跳过"
+        )
+        return result
+
+    cache_key = None
+    if cache is not None:
+        try:
+            result["file_hash"] = compute_file_hash(path)
+            cache_key = get_extraction_cache_key(
+                result["file_hash"],
+                max_pages,
+                token_limit,
+                stop_at_references,
+                backend,
+                extend_pages,
+            )
+            cached = cache.get(cache_key)
+            if cached:
+                result.update(cached)
+                result["cached"] = True
+                return result
+        except Exception as e:
+            print(f"读取文本缓存失败: {str(e)}")
+
+    try:
+        start_time = time.perf_counter()
+        try:
+            text_parts = _read_pages(
+                path,
+                max_pages,
+                token_limit,
+                stop_at_references,
+                extend_pages,
+                backend,
+                memory_limit_mb,
+                on_page,
+                result,
+            )
+        except Exception as e:
+            if backend == FALLBACK_BACKEND:
+                raise
+            print(f"{backend} 解析失败，改用 {FALLBACK_BACKEND}: {str(e)}")
+            result.update(backend=FALLBACK_BACKEND, stop_reason=None)
+            start_time = time.perf_counter()
+            text_parts = _read_pages(
+                path,
+                max_pages,
+                token_limit,
+                stop_at_references,
+                extend_pages,
+                FALLBACK_BACKEND,
+                memory_limit_mb,
+                on_page,
+                result,
+            )
+        elapsed = time.perf_counter() - start_time
+        if elapsed > 0:
+            result["pages_per_second"] = result["extracted_pages"] / elapsed
+
+        combined_text = "\n".join(text_parts)
+
+        # 进行基本清理
+        combined_text = re.sub(r"\s+", " ", combined_text)  # 合并多余空白
+        combined_text = re.sub(r"\n+", "\n", combined_text)  # 合并多余换行
+
+        # 添加API清理步骤，确保文本适合API处理
+        result["text"] = clean_text_for_api(combined_text)
+
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    # 因内存不足只提取了一部分的结果与当时的内存状况有关，不写入缓存
+    if cache_key and result["text"] and result["stop_reason"] != "memory":
+        try:
+            cache.set(
+                cache_key,
+                {
+                    "text": result["text"],
+                    "extracted_pages": result["extracted_pages"],
+                    "total_pages": result["total_pages"],
+                    "stop_reason": result["stop_reason"],
+                    "backend": result["backend"],
+                },
+            )
+            result["cache_key"] = cache_key
+        except Exception as e:
+            print(f"写入文本缓存失败: {str(e)}")
+
+    return result
+
+
+def get_default_extract_processes():
+    """获取默认的PDF解析进程数，保留一个CPU核心给界面和网络线程"""
+    return max(1, (os.cpu_count() or 2) - 1)
@@ -6,9 +6,50 @@ import pandas as pd
 import tkinter as tk
 import datetime
 from collections import Counter
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tkinter import messagebox, filedialog
 
-from utils.api_utils import get_api_adapter, clean_text_for_api
+from configs.analysis_config import load_analysis_settings
+from utils.api_utils import (
+    get_shared_api_adapter,
+    get_response_cache,
+)
+from configs.excel_header_config import load_custom_columns
+from utils.analysis_journal import get_analysis_journal
+from utils.batch_api import BatchClient, build_batch_request, write_batch_file
+from utils.chunked_analysis import (
+    BOUNDARY_SEARCH_RATIO,
+    build_chunk_prompt,
+    build_reduce_prompt,
+    get_chunk_prompt_overhead,
+    get_reduce_prompt_overhead,
+    split_text_into_chunks,
+)
+from utils.excel_utils import (
+    SOURCE_HASH_COLUMN,
+    build_source_index,
+    build_title_index,
+    save_to_excel_with_format,
+)
+from utils.hash_utils import compute_file_hash, compute_text_hash
+from utils.paper_dedup import (
+    FINGERPRINT_PAGES,
+    compute_text_fingerprint,
+    find_duplicate_papers,
+    find_matching_title,
+)
+from utils.rate_limiter import is_rate_limit_error
+from utils.retry_policy import InvalidResponseError
+from utils.section_detector import select_paper_text
+from utils.token_budget import count_tokens, get_text_token_budget, truncate_to_tokens
+from utils.extract_worker import IsolatedExtractor
+from utils.pdf_backends import resolve_backend_name
+from utils.pdf_extract import (
+    MAX_PDF_PAGES,
+    get_default_extract_processes,
+    get_text_cache,
+)
 from utils.app_manager import get_thread_safe_gui
 from utils.thread_utils import ThreadSafeText
 
@@ -25,6 +66,21 @@ def analyze_papers(self):
         messagebox.showerror("错误", "请先选择或创建要保存结果的Excel文件")
         return
 
+    # 检查是否有上次未完成的分析任务
+    resume = False
+    try:
+        journal = get_analysis_journal(self.excel_path.get(), load_custom_columns())
+        completed_count = count_resumable_papers(self, journal.load())
+    except Exception as e:
+        print(f"读取断点日志出错: {str(e)}")
+        completed_count = 0
+    if completed_count:
+        resume = messagebox.askyesno(
+            "继续上次分析",
+            f"检测到上次未完成的分析任务（已完成 {completed_count} 篇论文）。\n\n"
+            "选择“是”将跳过已完成的论文继续分析，选择“否”将重新分析全部论文。",
+        )
+
     self.disable_analysis_buttons()
     # 确保取消按钮可用且显示"取消任务"
     if hasattr(self, "cancel_analysis_btn"):
@@ -41,9 +97,16 @@ def analyze_papers(self):
 
     api_url, api_key = self.get_api_info()
 
+    # 批处理模式下一次性提交全部论文，否则逐篇流式分析
+    batch_mode = getattr(self, "batch_mode_var", None)
+    if batch_mode is not None and batch_mode.get():
+        target = self.process_papers_batch
+    else:
+        target = self.process_papers_async
+
     analysis_thread = threading.Thread(
-        target=self.process_papers_async,
-        args=(df, api_url, api_key, total_files),
+        target=target,
+        args=(df, api_url, api_key, total_files, resume),
         daemon=True,
     )
     analysis_thread.start()
@@ -51,14 +114,35 @@ def analyze_papers(self):
 
 CANCELLED = False
 
+# 并发分析时允许的最大线程数
+MAX_ANALYSIS_WORKERS = 16
+
+# 确认合并重复PDF的对话框中最多列出的文件数
+MAX_LISTED_DUPLICATES = 20
+
 
 def set_cancelled(flag):
     global CANCELLED
     CANCELLED = flag
 
 
-def process_papers_async(self, df, api_url, api_key, total_files):
-    """处理多个PDF文件的异步函数"""
+def get_analysis_workers(self):
+    """获取同时分析的论文数，无效值按1处理"""
+    try:
+        max_workers = int(self.analysis_workers_var.get())
+    except Exception:
+        max_workers = 1
+    return max(1, min(max_workers, MAX_ANALYSIS_WORKERS))
+
+
+def process_papers_async(
+    self, df, api_url, api_key, total_files, resume=False, regenerate=False
+):
+    """
+    处理多个PDF文件的异步函数
+    :param resume: 是否从断点日志恢复，跳过上次已完成的论文
+    :param regenerate: 重新生成已有的结果，不按“只分析新论文”跳过Excel中已有的论文
+    """
     tm = get_thread_safe_gui(self.root)
     self.cancel_analysis_requested = False
     set_cancelled(False)
@@ -74,202 +158,898 @@ def process_papers_async(self, df, api_url, api_key, total_files):
         model = self.api_model_var.get() or "gpt-3.5-turbo"
         tm.add_task(self.output_text.insert, tk.END, f"使用模型: {model}\n", "info")
 
+        # 本次分析的并发数在开始时确定，分析过程中修改界面设置不会重建连接池
+        self.api_concurrency = tm.call(get_api_concurrency, self)
+
         # 创建API适配器
-        api_adapter = get_api_adapter(api_url, api_key, model)
+        api_adapter = get_shared_api_adapter(
+            api_url, api_key, model, self.api_concurrency
+        )
         if not api_adapter:
             tm.add_task(self.show_error_and_reset, "无法创建API适配器，请检查API设置")
             return
 
-        # 初始化结果DataFrame
-        results = []
+        paper_results, pending = prepare_paper_results(self, df, resume, tm, regenerate)
+        max_workers = get_analysis_workers(self)
 
-        # 处理每个PDF文件
-        for i, pdf_path in enumerate(self.pdf_paths, 1):
-            if self.cancel_analysis_requested:
-                tm.add_task(
-                    self.output_text.insert, tk.END, "\n用户取消了分析任务\n", "warning"
-                )
-                tm.add_task(
-                    self.output_text.tag_configure, "warning", foreground="#e69138"
+        if len(pending) <= 1:
+            # 单篇论文直接在当前线程处理
+            for index in pending:
+                tm.add_task(self.update_progress_status, index + 1, total_files)
+                paper_results[index] = analyze_single_paper(
+                    self, self.pdf_paths[index], index + 1, total_files, tm
                 )
-                break
+        else:
+            run_analysis_pipeline(
+                self, paper_results, pending, total_files, max_workers, tm
+            )
 
-            tm.add_task(self.update_progress_status, i, total_files)
+        save_analysis_results(self, paper_results, tm)
 
-            # 更新输出文本
-            pdf_name = os.path.basename(pdf_path)
-            tm.add_task(
-                self.output_text.insert,
-                tk.END,
-                f"\n-- 正在处理 ({i}/{total_files}): {pdf_name} --\n",
-                "subheader",
-            )
+        # 恢复UI状态
+        tm.add_task(self.on_analysis_complete)
+
+    except Exception as e:
+        import traceback
+
+        print(f"PDF处理异常: {str(e)}")
+        print(traceback.format_exc())
+        tm.add_task(self.show_error_and_reset, f"处理过程中发生错误: {str(e)}")
+
+
+def process_papers_batch(self, df, api_url, api_key, total_files, resume=False):
+    """
+    批处理模式：解析全部PDF后，把分析请求写成JSONL文件一次性提交到批处理接口，
+    定期查询任务状态，结束后统一解析结果并保存。不使用流式输出，适合夜间批量分析大量论文
+    :param resume: 是否从断点日志恢复，跳过上次已完成的论文
+    """
+    tm = get_thread_safe_gui(self.root)
+    self.cancel_analysis_requested = False
+    set_cancelled(False)
+    out = ThreadSafeText(self.output_text, self.root)
+
+    try:
+        # 检查API信息
+        if not api_key:
             tm.add_task(
-                self.output_text.tag_configure,
-                "subheader",
-                foreground="#5ba3e0",
-                font=("微软雅黑", 10, "bold"),
+                self.show_error_and_reset, "API密钥为空，请在API设置中填写有效的密钥"
             )
+            return
 
-            # 提取PDF文本
-            out = ThreadSafeText(self.output_text, self.root)
-            pdf_text = extract_pdf_text(pdf_path, out)
+        model = self.api_model_var.get() or "gpt-3.5-turbo"
+        batch_url = load_analysis_settings()["batch_api_url"] or api_url
+        out.insert(tk.END, f"批处理模式，使用模型: {model}\n", "info")
+
+        paper_results, pending = prepare_paper_results(self, df, resume, tm)
+        extractions = extract_pending_papers(self, pending, tm)
+
+        # 构造每篇论文的请求，命中响应缓存的论文不再提交
+        response_cache = get_analysis_response_cache(self)
+        batch_requests = []
+        batch_papers = {}  # custom_id -> (论文索引, 响应缓存键)
+        for index in pending:
+            if self.cancel_analysis_requested or index not in extractions:
+                break
 
+            pdf_path = self.pdf_paths[index]
+            pdf_name = os.path.basename(pdf_path)
+            out.insert(
+                tk.END, f"\n-- 准备 ({index + 1}/{total_files}): {pdf_name} --\n"
+            )
+            pdf_text = report_extraction_result(extractions[index], out)
             if not pdf_text or len(pdf_text) < 100:
                 out.insert(
                     tk.END,
-                    "警告: PDF文本提取失败或文本内容过少，无法进行分析\n",
+                    f"警告: {pdf_name} 文本提取失败或文本内容过少，无法进行分析\n",
                     "warning",
                 )
                 continue
 
-            # 调用API并解析结果
-            try:
-                out.insert(tk.END, "调用API中，请稍候...\n", "processing")
-
-                response = call_api_with_retry(self, "", pdf_text, out, tm)
-
-                if not response or self.cancel_analysis_requested:
-                    if self.cancel_analysis_requested:
-                        out.insert(tk.END, "已取消分析\n", "warning")
-                    else:
-                        out.insert(tk.END, "API响应为空，跳过此文件\n", "error")
+            system_prompt, user_prompt, custom_columns = build_analysis_prompts(
+                pdf_text, out, model
+            )
+            cache_key = None
+            if response_cache is not None:
+                cache_key = get_response_cache_key(
+                    model, system_prompt, user_prompt, custom_columns
+                )
+                try:
+                    cached_response = response_cache.get(cache_key)
+                except Exception as e:
+                    print(f"读取API响应缓存失败: {str(e)}")
+                    cached_response = None
+                if cached_response:
+                    out.insert(tk.END, "已使用缓存的API响应，不加入批处理任务\n")
+                    paper_results[index] = finalize_paper_result(
+                        self,
+                        pdf_path,
+                        cached_response,
+                        tm,
+                        extractions[index].get("file_hash"),
+                    )
                     continue
 
-                # 解析响应
-                data = extract_data_from_response(response)
+            custom_id = f"paper-{index}"
+            batch_requests.append(
+                build_batch_request(custom_id, model, system_prompt, user_prompt)
+            )
+            batch_papers[custom_id] = (index, cache_key)
 
-                # 检查提取的数据
-                if not data.get("论文年份"):
-                    # 尝试从文件名中提取年份
-                    year_match = re.search(r"(19|20)\d{2}", pdf_name)
-                    if year_match:
-                        data["论文年份"] = year_match.group(0)
-                    else:
-                        # 默认使用当前年份
-                        data["论文年份"] = str(datetime.datetime.now().year - 1)
+        if batch_requests and not self.cancel_analysis_requested:
+            try:
+                contents, errors = submit_batch_job(
+                    self, batch_url, api_key, model, batch_requests, total_files, tm
+                )
+            except InterruptedError:
+                contents, errors = {}, {}
 
-                # 添加结果
-                results.append(data)
+            for custom_id, (index, cache_key) in batch_papers.items():
+                if self.cancel_analysis_requested:
+                    break
+                pdf_path = self.pdf_paths[index]
+                response = contents.get(custom_id)
+                if not response or not response.strip():
+                    error = errors.get(custom_id, "未返回结果")
+                    out.insert(
+                        tk.END,
+                        f"{os.path.basename(pdf_path)} 批处理请求失败: {error}\n",
+                        "error",
+                    )
+                    continue
 
-                # 输出摘要部分 - 修改预览文本长度并确保完整显示
-                tm.add_task(
-                    self.output_text.insert, tk.END, "\n摘要预览:\n", "preview_header"
-                )
-                tm.add_task(
-                    self.output_text.tag_configure,
-                    "preview_header",
-                    foreground="#4a8cca",
-                    font=("微软雅黑", 10, "bold"),
+                paper_results[index] = finalize_paper_result(
+                    self, pdf_path, response, tm, extractions[index].get("file_hash")
                 )
+                if cache_key:
+                    try:
+                        response_cache.set(cache_key, response)
+                    except Exception as e:
+                        print(f"写入API响应缓存失败: {str(e)}")
 
-                # 修改这里：增加预览摘要的长度并用省略号表示截断
-                preview_text = data.get("论文摘要（中文）", "未能提取摘要")
-                if len(preview_text) > 300:  # 从150扩展到300
-                    preview_text = preview_text[:300] + "..."
+        save_analysis_results(self, paper_results, tm)
 
-                tm.add_task(
-                    self.output_text.insert, tk.END, f"{preview_text}\n", "preview_text"
-                )
+        # 恢复UI状态
+        tm.add_task(self.on_analysis_complete)
 
-                # 显示完成标记
-                tm.add_task(self.output_text.insert, tk.END, "✓ 分析完成\n", "success")
-                tm.add_task(
-                    self.output_text.tag_configure, "success", foreground="#8bc34a"
-                )
+    except Exception as e:
+        import traceback
 
-            except Exception as api_error:
-                out.insert(tk.END, f"API调用或解析出错: {str(api_error)}\n", "error")
-                tm.add_task(
-                    self.output_text.tag_configure, "error", foreground="#ef5350"
-                )
-                continue
+        print(f"批处理分析异常: {str(e)}")
+        print(traceback.format_exc())
+        tm.add_task(self.show_error_and_reset, f"批处理过程中发生错误: {str(e)}")
+
+
+def extract_pending_papers(self, pending, tm):
+    """
+    在进程池中解析待分析的PDF
+    :return: 论文索引到提取结果的字典，取消时只包含已完成的部分
+    """
+    extractions = {}
+    if not pending:
+        return extractions
+
+    extract_processes = min(get_extract_processes(self), len(pending))
+    text_cache = get_analysis_text_cache(self)
+    extraction_options = get_extraction_options(self)
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"正在使用 {extract_processes} 个进程解析 {len(pending)} 个PDF...\n",
+        "info",
+    )
+    jobs = [
+        (i, self.pdf_paths[i], dict(extraction_options, cache=text_cache))
+        for i in pending
+    ]
+    with get_isolated_extractor(extract_processes) as extractor:
+        for index, extraction in extractor.imap_unordered(
+            jobs, cancel_check=lambda: self.cancel_analysis_requested
+        ):
+            extractions[index] = extraction
+    return extractions
+
+
+def submit_batch_job(self, batch_url, api_key, model, batch_requests, total_files, tm):
+    """
+    提交批处理任务并等待服务端处理完成
+    :return: (custom_id到响应文本的字典, custom_id到错误信息的字典)
+    """
+    out = ThreadSafeText(self.output_text, self.root)
+    client = BatchClient(batch_url, api_key, model)
+    try:
+        path = write_batch_file(batch_requests)
+        out.insert(
+            tk.END,
+            f"\n已生成批处理请求文件（{len(batch_requests)} 篇论文）: {path}\n",
+            "info",
+        )
+        batch = client.submit(path)
+        out.insert(
+            tk.END, f"批处理任务已提交，任务ID: {batch['id']}，等待服务端处理...\n"
+        )
 
-        # 保存结果到Excel
-        if results and not self.cancel_analysis_requested:
-            result_df = pd.DataFrame(results)
-            tm.add_task(
-                self.output_text.insert,
-                tk.END,
-                "\n所有PDF处理完成，正在保存到Excel...\n",
-                "info",
+        # 不在本次任务中的论文（已恢复或命中缓存）计为已完成
+        completed_before = total_files - len(batch_requests)
+
+        def on_status(batch):
+            counts = batch.get("request_counts") or {}
+            finished = counts.get("completed", 0) + counts.get("failed", 0)
+            print(
+                f"批处理任务状态: {batch.get('status')}，"
+                f"已完成 {finished}/{counts.get('total', len(batch_requests))}"
             )
-            tm.add_task(self.save_excel_result, result_df)
-        elif self.cancel_analysis_requested:
             tm.add_task(
-                self.output_text.insert, tk.END, "\n分析被取消，未保存结果\n", "warning"
+                self.update_progress_status, completed_before + finished, total_files
             )
+
+        batch = client.wait(
+            batch["id"],
+            load_analysis_settings()["batch_poll_interval"],
+            cancel_check=lambda: self.cancel_analysis_requested,
+            on_status=on_status,
+        )
+        out.insert(tk.END, f"批处理任务结束，状态: {batch.get('status')}\n", "info")
+        return client.fetch_results(batch)
+    finally:
+        client.close()
+
+
+def prepare_paper_results(self, df, resume, tm, regenerate=False):
+    """
+    初始化本次分析的结果列表和断点日志，并去掉不需要分析的论文
+    :param df: 目标Excel中已有的数据，用于只分析新论文
+    :param regenerate: 重新生成时全部重新分析，不跳过Excel中已有的论文
+    :return: (按输入顺序保存结果的列表, 仍需分析的论文索引列表)
+    """
+    # 按输入顺序保存每篇论文的结果，未成功的保持为None
+    paper_results = [None] * len(self.pdf_paths)
+    pending = list(range(len(self.pdf_paths)))
+
+    # 每篇论文完成后写入断点日志，结果保存到Excel后再删除
+    journal = get_analysis_journal(self.excel_path.get(), load_custom_columns())
+    if resume:
+        pending = restore_from_journal(self, journal, paper_results)
+        restored = len(self.pdf_paths) - len(pending)
+        tm.add_task(
+            self.output_text.insert,
+            tk.END,
+            f"已从断点日志恢复 {restored} 篇论文的结果，继续分析剩余 {len(pending)} 篇\n",
+            "info",
+        )
+    else:
+        journal.clear()
+    self.analysis_journal = journal
+
+    only_new = not regenerate and get_analysis_option(self, "only_new_papers")
+    deduplicate = load_analysis_settings()["deduplicate_papers"]
+    if pending and (only_new or deduplicate):
+        file_hashes = compute_paper_hashes(self)
+        if only_new:
+            pending = skip_existing_papers(self, df, pending, file_hashes, tm)
+        if deduplicate:
+            pending = remove_duplicate_papers(self, pending, file_hashes, tm)
+    return paper_results, pending
+
+
+def compute_paper_hashes(self):
+    """计算每篇论文的文件哈希，读取失败的论文为None"""
+    file_hashes = {}
+    for i, path in enumerate(self.pdf_paths):
+        try:
+            file_hashes[i] = compute_file_hash(path)
+        except OSError as e:
+            print(f"计算文件哈希失败: {path}，{str(e)}")
+            file_hashes[i] = None
+    return file_hashes
+
+
+def skip_existing_papers(self, df, pending, file_hashes, tm):
+    """
+    只分析新论文：跳过目标Excel中已有的论文
+    先按来源哈希列匹配文件内容，没有来源哈希的旧行按引用信息中的标题在论文开头的文本中查找
+    :return: 去掉已有论文后的待分析索引列表
+    """
+    if df is None or df.empty:
+        return pending
+
+    existing = {}
+    source_index = build_source_index(df)
+    for i in pending:
+        if file_hashes[i] is not None and file_hashes[i] in source_index:
+            existing[i] = "文件内容相同"
+
+    title_index = build_title_index(df)
+    remaining = [i for i in pending if i not in existing]
+    if title_index and remaining:
+        tm.add_task(
+            self.output_text.insert,
+            tk.END,
+            "正在按标题查找Excel中已有的论文...\n",
+            "info",
+        )
+        for i, text in extract_leading_text(self, remaining).items():
+            title = find_matching_title(text, title_index)
+            if title:
+                existing[i] = f"标题相同: {title}"
+
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"只分析新论文：Excel中已有 {len(existing)} 篇所选论文，"
+        f"本次分析 {len(pending) - len(existing)} 篇\n",
+        "info",
+    )
+    if not existing:
+        return pending
+
+    lines = [
+        f"  跳过 {os.path.basename(self.pdf_paths[i])}（{reason}）\n"
+        for i, reason in sorted(existing.items())
+    ]
+    tm.add_task(self.output_text.insert, tk.END, "".join(lines))
+    return [i for i in pending if i not in existing]
+
+
+def remove_duplicate_papers(self, pending, file_hashes, tm):
+    """
+    分析前合并重复的论文：内容完全相同的文件，以及开头几页文本相似的不同版本（如预印本和正式发表版）
+    每组只分析一篇，不在本次分析中的论文（已从断点日志恢复或Excel中已有）优先保留，其余按列表顺序保留第一篇
+    :return: 去掉重复论文后的待分析索引列表
+    """
+    if len(self.pdf_paths) < 2 or not pending:
+        return pending
+
+    tm.add_task(self.output_text.insert, tk.END, "正在检查重复的PDF...\n", "info")
+    settings = load_analysis_settings()
+    pending_set = set(pending)
+    order = [i for i in range(len(self.pdf_paths)) if i not in pending_set]
+    order += pending
+
+    fingerprints = {}
+    if settings["near_duplicate_detection"]:
+        # 内容相同的文件只计算一次指纹
+        seen_hashes = set()
+        indices = []
+        for i in order:
+            if file_hashes[i] is None or file_hashes[i] not in seen_hashes:
+                indices.append(i)
+                seen_hashes.add(file_hashes[i])
+        for i, text in extract_leading_text(self, indices).items():
+            fingerprint = compute_text_fingerprint(text)
+            if fingerprint is not None:
+                fingerprints[i] = fingerprint
+
+    duplicates = find_duplicate_papers(
+        [(i, file_hashes[i], fingerprints.get(i)) for i in order],
+        float(settings["near_duplicate_threshold"]),
+    )
+    duplicates = {i: duplicates[i] for i in pending if i in duplicates}
+    if not duplicates:
+        return pending
+
+    lines = []
+    for i, (kept, similarity) in sorted(duplicates.items()):
+        name = os.path.basename(self.pdf_paths[i])
+        kept_name = os.path.basename(self.pdf_paths[kept])
+        if similarity is None:
+            lines.append(f"{name} 与 {kept_name} 内容相同")
         else:
+            lines.append(
+                f"{name} 与 {kept_name} 疑似同一论文的不同版本"
+                f"（相似度 {similarity:.0%}）"
+            )
+
+    # 合并前请用户确认，避免把不同的论文误判为重复后直接跳过
+    shown = lines[:MAX_LISTED_DUPLICATES]
+    if len(lines) > len(shown):
+        shown.append(f"……等共 {len(lines)} 个文件")
+    confirmed = tm.call(
+        messagebox.askyesno,
+        "合并重复的PDF",
+        f"检测到 {len(duplicates)} 个重复的PDF，每组只分析第一篇：\n\n"
+        + "\n".join(shown)
+        + "\n\n选择“是”合并重复的文件，选择“否”分析全部文件。",
+    )
+    if not confirmed:
+        tm.add_task(
+            self.output_text.insert,
+            tk.END,
+            f"检测到 {len(duplicates)} 个重复的PDF，已按选择全部分析\n",
+            "info",
+        )
+        return pending
+
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"已合并 {len(duplicates)} 个重复的PDF，不再重复分析：\n"
+        + "".join(f"  {line}\n" for line in lines),
+        "warning",
+    )
+    tm.add_task(self.output_text.tag_configure, "warning", foreground="#e69138")
+    return [i for i in pending if i not in duplicates]
+
+
+def extract_leading_text(self, indices):
+    """
+    提取论文开头几页的文本，用于识别重复的论文和查找标题
+    :return: {论文索引: 文本}，取消时只包含已完成的部分
+    """
+    options = get_extraction_options(self)
+    options.pop("token_limit", None)
+    options.pop("stop_at_references", None)
+    options.pop("extend_pages", None)
+    options.update(max_pages=FINGERPRINT_PAGES, cache=get_analysis_text_cache(self))
+    jobs = [(i, self.pdf_paths[i], options) for i in indices]
+
+    texts = {}
+    processes = min(get_extract_processes(self), len(jobs))
+    with get_isolated_extractor(processes) as extractor:
+        for index, extraction in extractor.imap_unordered(
+            jobs, cancel_check=lambda: self.cancel_analysis_requested
+        ):
+            texts[index] = extraction["text"]
+    return texts
+
+
+def save_analysis_results(self, paper_results, tm):
+    """把成功分析的论文保存到Excel，取消或没有结果时只输出提示"""
+    if self.cancel_analysis_requested:
+        tm.add_task(
+            self.output_text.insert, tk.END, "\n用户取消了分析任务\n", "warning"
+        )
+        tm.add_task(self.output_text.tag_configure, "warning", foreground="#e69138")
+
+    results = [data for data in paper_results if data]
+
+    # 保存结果到Excel
+    if results and not self.cancel_analysis_requested:
+        result_df = pd.DataFrame(results)
+        tm.add_task(
+            self.output_text.insert,
+            tk.END,
+            "\n所有PDF处理完成，正在保存到Excel...\n",
+            "info",
+        )
+        tm.add_task(self.save_excel_result, result_df)
+    elif self.cancel_analysis_requested:
+        tm.add_task(
+            self.output_text.insert, tk.END, "\n分析被取消，未保存结果\n", "warning"
+        )
+        if results:
             tm.add_task(
                 self.output_text.insert,
                 tk.END,
-                "\n没有成功分析的PDF，未保存结果\n",
-                "warning",
+                f"已完成的 {len(results)} 篇论文已记录，下次开始分析时可选择继续\n",
+                "info",
             )
+    else:
+        tm.add_task(
+            self.output_text.insert,
+            tk.END,
+            "\n没有成功分析的PDF，未保存结果\n",
+            "warning",
+        )
 
-        # 恢复UI状态
-        tm.add_task(self.on_analysis_complete)
 
-    except Exception as e:
-        import traceback
+def get_api_concurrency(self):
+    """
+    同时进行的API请求数的上限：界面上设置的同时分析论文数，
+    分块分析时每篇论文还会同时分析chunk_workers块。读取界面变量，需在GUI线程中调用
+    """
+    concurrency = get_analysis_workers(self)
+    if get_analysis_option(self, "chunked_analysis"):
+        concurrency *= max(1, int(load_analysis_settings()["chunk_workers"]))
+    return concurrency
 
-        print(f"PDF处理异常: {str(e)}")
-        print(traceback.format_exc())
-        tm.add_task(self.show_error_and_reset, f"处理过程中发生错误: {str(e)}")
 
+def get_extract_processes(self):
+    """获取PDF解析进程数，0或无效值表示自动"""
+    try:
+        processes = int(self.extract_processes_var.get())
+    except Exception:
+        processes = 0
+    if processes <= 0:
+        return get_default_extract_processes()
+    return processes
+
+
+def get_isolated_extractor(processes):
+    """按分析设置中的单页和单个文件的解析时间上限创建解析进程"""
+    settings = load_analysis_settings()
+    return IsolatedExtractor(
+        processes,
+        file_timeout=float(settings["extract_file_timeout"] or 0),
+        page_timeout=float(settings["extract_page_timeout"] or 0),
+    )
+
+
+def get_analysis_option(self, key):
+    """
+    读取分析设置中的一项，界面上可修改的设置以界面的当前值为准
+    界面上的修改只在程序退出时写入配置文件
+    """
+    var = getattr(self, "analysis_setting_vars", {}).get(key)
+    if var is not None:
+        try:
+            return var.get()
+        except Exception:
+            pass
+    return load_analysis_settings()[key]
 
-def extract_pdf_text(path, out):
-    """从PDF提取文本"""
-    out.insert(tk.END, "正在提取PDF文本...\n")
 
+def get_analysis_text_cache(self):
+    """根据分析设置获取PDF文本缓存，未启用时返回None"""
     try:
-        import PyPDF2
+        if not self.text_cache_enabled_var.get():
+            return None
+        max_mb = float(self.text_cache_max_mb_var.get())
+    except Exception:
+        return None
+    return get_text_cache(max_mb)
 
-        with open(path, "rb") as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            num_pages = len(pdf_reader.pages)
 
-            # 提取前30页或所有页面（取较小值）
-            max_pages = min(30, num_pages)
-            text_parts = []
+def get_analysis_response_cache(self):
+    """根据分析设置获取API响应缓存，未启用时返回None"""
+    try:
+        if not self.response_cache_enabled_var.get():
+            return None
+    except Exception:
+        return None
+    settings = load_analysis_settings()
+    return get_response_cache(
+        settings["response_cache_max_mb"], settings["response_cache_ttl_hours"]
+    )
 
-            for i in range(max_pages):
-                page = pdf_reader.pages[i]
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
 
-            combined_text = "\n".join(text_parts)
+def clear_response_cache(self):
+    """清空API响应缓存"""
+    removed = get_response_cache().clear()
+    self.status_bar["text"] = f"已清空API响应缓存，共删除 {removed} 个条目"
+    messagebox.showinfo("提示", f"已清空API响应缓存，共删除 {removed} 个条目")
 
-            # 进行基本清理
-            combined_text = re.sub(r"\s+", " ", combined_text)  # 合并多余空白
-            combined_text = re.sub(r"\n+", "\n", combined_text)  # 合并多余换行
 
-            # 添加API清理步骤，确保文本适合API处理
-            combined_text = clean_text_for_api(combined_text)
+def clear_text_cache(self):
+    """清空PDF文本缓存"""
+    removed = get_text_cache().clear()
+    self.status_bar["text"] = f"已清空PDF文本缓存，共删除 {removed} 个条目"
+    messagebox.showinfo("提示", f"已清空PDF文本缓存，共删除 {removed} 个条目")
 
-            extracted_percent = (max_pages / num_pages) * 100
-            out.insert(
-                tk.END,
-                f"已提取 {max_pages}/{num_pages} 页 ({extracted_percent:.1f}%)\n",
-            )
-            return combined_text
 
-    except Exception as e:
-        out.insert(tk.END, f"PDF文本提取失败: {str(e)}\n", "error")
+def count_resumable_papers(self, completed):
+    """统计断点日志中属于本次所选PDF的论文数，日志中其他论文的结果不会被恢复"""
+    if not completed:
+        return 0
+    count = 0
+    for pdf_path in self.pdf_paths:
+        try:
+            if compute_file_hash(pdf_path) in completed:
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def restore_from_journal(self, journal, paper_results):
+    """
+    从断点日志恢复已完成论文的结果
+    :return: 仍需分析的论文索引列表
+    """
+    completed = journal.load()
+    pending = []
+    for i, pdf_path in enumerate(self.pdf_paths):
+        try:
+            file_hash = compute_file_hash(pdf_path)
+        except OSError:
+            file_hash = None
+
+        if file_hash in completed:
+            paper_results[i] = dict(completed[file_hash])
+            paper_results[i].setdefault(SOURCE_HASH_COLUMN, file_hash)
+        else:
+            pending.append(i)
+    return pending
+
+
+def run_analysis_pipeline(self, paper_results, pending, total_files, max_workers, tm):
+    """
+    两阶段分析流水线：
+    进程池并行解析PDF，解析结果放入队列，由max_workers个API线程依次取出分析。
+    只处理pending中的论文索引，结果按输入顺序写入paper_results。
+    """
+    extract_processes = min(get_extract_processes(self), len(pending))
+    text_cache = get_analysis_text_cache(self)
+    extraction_options = get_extraction_options(self)
+    stream_output = max_workers <= 1
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"分析流水线：{extract_processes} 个PDF解析进程，"
+        f"同时分析 {max_workers} 篇论文\n",
+        "info",
+    )
+
+    # 队列有界，避免API阶段跟不上时已解析的文本无限堆积
+    text_queue = queue.Queue(maxsize=max_workers * 2)
+    progress_lock = threading.Lock()
+    completed = [len(self.pdf_paths) - len(pending)]
+
+    def extraction_stage():
+        """在解析进程中解析PDF，按完成顺序送入队列；超时或崩溃的文件按提取失败处理"""
+        jobs = [
+            (i, self.pdf_paths[i], dict(extraction_options, cache=text_cache))
+            for i in pending
+        ]
+        try:
+            with get_isolated_extractor(extract_processes) as extractor:
+                for index, extraction in extractor.imap_unordered(
+                    jobs, cancel_check=lambda: self.cancel_analysis_requested
+                ):
+                    text_queue.put((index, extraction))
+        except Exception as e:
+            print(f"PDF解析进程池异常: {type(e).__name__}: {str(e)}")
+        finally:
+            # 通知每个API线程结束
+            for _ in range(max_workers):
+                text_queue.put(None)
+
+    def api_stage():
+        """从队列取出解析好的文本并调用API分析"""
+        while True:
+            item = text_queue.get()
+            if item is None:
+                break
+            if self.cancel_analysis_requested:
+                continue  # 继续取出剩余项，直到收到结束标记
+
+            index, extraction = item
+            try:
+                paper_results[index] = analyze_single_paper(
+                    self,
+                    self.pdf_paths[index],
+                    index + 1,
+                    total_files,
+                    tm,
+                    stream_output=stream_output,
+                    extraction=extraction,
+                )
+            except Exception as e:
+                print(f"论文分析线程异常: {type(e).__name__}: {str(e)}")
+
+            with progress_lock:
+                completed[0] += 1
+                tm.add_task(self.update_progress_status, completed[0], total_files)
+
+    producer = threading.Thread(target=extraction_stage, daemon=True)
+    producer.start()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in range(max_workers):
+            executor.submit(api_stage)
+
+    producer.join()
+
+
+def analyze_single_paper(
+    self, pdf_path, index, total_files, tm, stream_output=True, extraction=None
+):
+    """
+    分析单篇论文：提取文本、调用API并解析结果
+    :param stream_output: 是否将API流式响应实时写入输出区域，并发时关闭以免多篇输出交错
+    :param extraction: 解析进程已完成的提取结果，为None时在当前线程中提取
+    :return: 解析出的数据字典，失败或取消时返回None
+    """
+    if self.cancel_analysis_requested:
+        return None
+
+    # 更新输出文本
+    pdf_name = os.path.basename(pdf_path)
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"\n-- 正在处理 ({index}/{total_files}): {pdf_name} --\n",
+        "subheader",
+    )
+    tm.add_task(
+        self.output_text.tag_configure,
+        "subheader",
+        foreground="#5ba3e0",
+        font=("微软雅黑", 10, "bold"),
+    )
+
+    # 提取PDF文本
+    out = ThreadSafeText(self.output_text, self.root)
+    if extraction is None:
+        pdf_text = extract_pdf_text(
+            pdf_path, out, get_analysis_text_cache(self), get_extraction_options(self)
+        )
+    else:
+        pdf_text = report_extraction_result(extraction, out)
+
+    if not pdf_text or len(pdf_text) < 100:
+        out.insert(
+            tk.END,
+            f"警告: {pdf_name} 文本提取失败或文本内容过少，无法进行分析\n",
+            "warning",
+        )
+        return None
+
+    # 调用API并解析结果
+    try:
+        out.insert(tk.END, "调用API中，请稍候...\n", "processing")
+
+        response = call_api_with_retry(
+            self, "", pdf_text, out, tm, stream_output=stream_output
+        )
+
+        if not response or self.cancel_analysis_requested:
+            if self.cancel_analysis_requested:
+                out.insert(tk.END, "已取消分析\n", "warning")
+            else:
+                out.insert(tk.END, f"API响应为空，跳过文件 {pdf_name}\n", "error")
+            return None
+
+        file_hash = (extraction or {}).get("file_hash")
+        return finalize_paper_result(self, pdf_path, response, tm, file_hash)
+
+    except Exception as api_error:
+        out.insert(tk.END, f"API调用或解析出错: {str(api_error)}\n", "error")
+        tm.add_task(self.output_text.tag_configure, "error", foreground="#ef5350")
+        return None
+
+
+def finalize_paper_result(self, pdf_path, response, tm, file_hash=None):
+    """
+    解析单篇论文的API响应，补全年份和来源哈希，并写入断点日志
+    :param file_hash: 已知的PDF内容哈希，为None时重新计算
+    :return: 解析出的数据字典
+    """
+    pdf_name = os.path.basename(pdf_path)
+
+    # 解析响应
+    data = extract_data_from_response(response)
+
+    # 检查提取的数据
+    if not data.get("论文年份"):
+        # 尝试从文件名中提取年份
+        year_match = re.search(r"(19|20)\d{2}", pdf_name)
+        if year_match:
+            data["论文年份"] = year_match.group(0)
+        else:
+            # 默认使用当前年份
+            data["论文年份"] = str(datetime.datetime.now().year - 1)
+
+    # 输出摘要部分 - 修改预览文本长度并确保完整显示
+    tm.add_task(
+        self.output_text.insert,
+        tk.END,
+        f"\n摘要预览 ({pdf_name}):\n",
+        "preview_header",
+    )
+    tm.add_task(
+        self.output_text.tag_configure,
+        "preview_header",
+        foreground="#4a8cca",
+        font=("微软雅黑", 10, "bold"),
+    )
+
+    # 修改这里：增加预览摘要的长度并用省略号表示截断
+    preview_text = data.get("论文摘要（中文）", "未能提取摘要")
+    if len(preview_text) > 300:  # 从150扩展到300
+        preview_text = preview_text[:300] + "..."
+
+    tm.add_task(self.output_text.insert, tk.END, f"{preview_text}\n", "preview_text")
+
+    # 记录来源PDF的内容哈希，写入Excel的隐藏列，重新生成时据此定位行
+    try:
+        file_hash = file_hash or compute_file_hash(pdf_path)
+        data[SOURCE_HASH_COLUMN] = file_hash
+    except OSError as e:
+        file_hash = None
+        print(f"计算文件哈希失败: {str(e)}")
+
+    # 写入断点日志
+    journal = getattr(self, "analysis_journal", None)
+    if journal is not None and file_hash:
+        try:
+            journal.append(file_hash, pdf_path, data)
+        except Exception as e:
+            print(f"写入断点日志失败: {str(e)}")
+
+    # 显示完成标记
+    tm.add_task(self.output_text.insert, tk.END, "✓ 分析完成\n", "success")
+    tm.add_task(self.output_text.tag_configure, "success", foreground="#8bc34a")
+
+    return data
+
+
+def extract_pdf_text(path, out, cache=None, options=None):
+    """
+    从PDF提取文本
+    :param options: get_extraction_options返回的提取参数，为None时只限制页数
+    """
+    out.insert(tk.END, "正在提取PDF文本...\n")
+    options = options or {"max_pages": MAX_PDF_PAGES}
+    with get_isolated_extractor(1) as extractor:
+        result = extractor.extract(path, cache=cache, **options)
+    return report_extraction_result(result, out)
+
+
+def get_extraction_options(self):
+    """
+    PDF提取参数：最多提取的页数、解析引擎、内存和文件大小上限，以及提前停止解析的条件
+    读到参考文献后停止；只保留开头部分时，已提取的文本够用就停止。
+    按章节选择时需要论文后部的结果和结论，不按token数停止，
+    读满页数上限仍未遇到参考文献的长论文继续读到smart_selection_max_pages页
+    """
+    settings = load_analysis_settings()
+    options = {
+        "max_pages": MAX_PDF_PAGES,
+        "backend": resolve_backend_name(settings["pdf_extract_backend"]),
+        "memory_limit_mb": int(settings["extract_memory_limit_mb"] or 0),
+        "max_file_mb": int(settings["max_pdf_size_mb"] or 0),
+    }
+    if not settings["early_stop_extraction"]:
+        return options
+
+    options["stop_at_references"] = True
+    if settings["smart_text_selection"]:
+        options["extend_pages"] = int(settings["smart_selection_max_pages"])
+    else:
+        model = self.api_model_var.get() or "gpt-3.5-turbo"
+        format_str, _ = load_prompt_format()
+        if get_analysis_option(self, "chunked_analysis"):
+            _, options["token_limit"] = get_chunked_token_budget(model, format_str)
+        else:
+            options["token_limit"] = get_paper_token_budget(model, format_str)
+    return options
+
+
+def report_extraction_result(result, out):
+    """输出PDF提取结果并返回提取的文本"""
+    if result["error"]:
+        out.insert(tk.END, f"PDF文本提取失败: {result['error']}\n", "error")
         return ""
 
+    if result.get("cached"):
+        out.insert(tk.END, "已从缓存读取PDF文本，跳过解析\n")
 
-def call_api_with_retry(self, system_prompt, prompt, out, tm):
-    """调用API并支持重试机制"""
-    api_url, api_key = self.get_api_info()
-    model = self.api_model_var.get() or "gpt-3.5-turbo"
+    total_pages = result["total_pages"]
+    extracted_pages = result["extracted_pages"]
+    extracted_percent = (extracted_pages / total_pages) * 100 if total_pages else 0
+    out.insert(
+        tk.END,
+        f"已提取 {extracted_pages}/{total_pages} 页 ({extracted_percent:.1f}%)\n",
+    )
+    if result.get("pages_per_second"):
+        out.insert(
+            tk.END,
+            f"解析引擎: {result['backend']}，{result['pages_per_second']:.1f} 页/秒\n",
+        )
+    if result.get("stop_reason") == "references":
+        out.insert(tk.END, "已读到参考文献，跳过后续页面\n")
+    elif result.get("stop_reason") == "budget":
+        out.insert(tk.END, "已提取的文本超出模型的可用预算，跳过后续页面\n")
+    elif result.get("stop_reason") == "memory":
+        out.insert(
+            tk.END,
+            "解析占用的内存超过上限（extract_memory_limit_mb），只使用已提取的页面\n",
+            "warning",
+        )
+    return result["text"]
+
+
+# 论文分析的系统提示词
+ANALYSIS_SYSTEM_PROMPT = (
+    "你是一位学术研究总结专家，擅长对各类学术论文进行深入分析和总结。"
+)
 
-    # 增加调试日志
-    print(f"API调用开始 - URL: {api_url}, 模型: {model}, 文本长度: {len(prompt)}")
-    out.insert(tk.END, f"使用模型: {model}\n", "info")
 
-    # 使用正确的提示词构造方式
+def load_prompt_format():
+    """
+    根据自定义表头构造提示词中要求的输出格式
+    :return: (格式字符串, 自定义表头列表，加载失败时为None)
+    """
     try:
         from configs.excel_header_config import load_custom_columns
 
@@ -281,6 +1061,7 @@ def call_api_with_retry(self, system_prompt, prompt, out, tm):
         print(f"已加载自定义表头, 共{len(custom_columns)}列")
     except Exception as e:
         print(f"加载自定义表头出错: {str(e)}")
+        custom_columns = None
         # 使用安全的默认表头格式 - 只包含最基本的必需字段
         format_str = """论文年份|[年份]
 论文英文引用信息|[引用信息]
@@ -293,36 +1074,251 @@ def call_api_with_retry(self, system_prompt, prompt, out, tm):
 重要结论|[内容]
 未来研究展望|[内容]"""
         print("使用默认表头格式")
+    return format_str, custom_columns
 
-    # 构造API提示词
-    system_prompt = "你是一位学术研究总结专家，擅长对各类学术论文进行深入分析和总结。"
 
-    # 清理PDF文本确保适合API处理
-    cleaned_text = clean_text_for_api(prompt)
+def build_analysis_user_prompt(format_str):
+    """构造论文分析的用户提示词，论文文本位置为{paper_text}占位符"""
+    return f"""
+\"Background\": \"用户需要对学术论文进行详细的总结，用于文献综述或研究整理。\",
+\"Skills\": \"你具备强大的文献阅读和分析能力，能够快速理解论文的核心内容。\",
+\"Goals\": \"根据用户提供的论文信息，详细总结论文的各个方面，并严格按照以下格式提供分析结果（确保使用|分隔符，并且只输出下面指定的字段）：
+{format_str}\",
+\"Constrains\": \"内容应符合学术规范，信息准确、完整，且具有一定的逻辑性和可读性。必须严格按照指定格式返回结果。只返回指定字段，不要添加额外字段。如果需要回复研究意义，确保只回复一段话且可以直接运用于综述。\",
+\"论文内容\": \"{{paper_text}}\"
+"""
+
+
+def get_paper_token_budget(model, format_str):
+    """论文文本在单次分析请求中可用的token数"""
+    fixed_prompt = build_analysis_user_prompt(format_str).replace("{paper_text}", "")
+    return get_text_token_budget(model, ANALYSIS_SYSTEM_PROMPT, fixed_prompt)
+
 
-    # 限制文本长度，避免超出模型上下文窗口
-    max_length = 60000  # 根据模型调整，GPT-3.5可能需要较短
-    if len(cleaned_text) > max_length:
+def fit_paper_text(text, budget, model, out):
+    """
+    把论文文本缩减到token预算以内，未超出时原样返回
+    开启按章节选择时优先保留摘要、结论和结果，否则保留开头部分
+    """
+    if load_analysis_settings()["smart_text_selection"]:
+        # 按章节选择，优先保留摘要、结论和结果，舍弃参考文献
+        paper_text, selection = select_paper_text(text, budget, model)
+    else:
+        paper_text, selection = truncate_to_tokens(text, budget, model), ""
+    if paper_text != text:
         out.insert(
             tk.END,
-            f"原文本长度: {len(cleaned_text)}字符，截断到{max_length}字符\n",
+            f"论文约 {count_tokens(text, model)} tokens，超出模型 {model} 的可用预算"
+            f"（{budget} tokens），保留 {len(paper_text)}/{len(text)} 字符\n",
             "warning",
         )
-        cleaned_text = cleaned_text[:max_length] + "..."
+        if selection:
+            out.insert(tk.END, f"{selection}\n", "info")
+        else:
+            paper_text += "..."
+    return paper_text
 
-    print(f"清理后文本长度: {len(cleaned_text)}")
 
-    user_prompt = f"""
-\"Background\": \"用户需要对学术论文进行详细的总结，用于文献综述或研究整理。\",
-\"Skills\": \"你具备强大的文献阅读和分析能力，能够快速理解论文的核心内容。\",
-\"Goals\": \"根据用户提供的论文信息，详细总结论文的各个方面，并严格按照以下格式提供分析结果（确保使用|分隔符，并且只输出下面指定的字段）：
-{format_str}\",
-\"Constrains\": \"内容应符合学术规范，信息准确、完整，且具有一定的逻辑性和可读性。必须严格按照指定格式返回结果。只返回指定字段，不要添加额外字段。如果需要回复研究意义，确保只回复一段话且可以直接运用于综述。\",
-\"论文内容\": \"{cleaned_text}\"
-"""
+def build_analysis_prompts(prompt, out, model):
+    """
+    根据PDF文本和自定义表头构造论文分析的提示词，论文文本按模型的token预算截断
+    :param prompt: extract_text_from_pdf提取并清理后的论文文本
+    :param model: 模型名称，用于确定上下文窗口
+    :return: (系统提示词, 用户提示词, 自定义表头列表)
+    """
+    format_str, custom_columns = load_prompt_format()
+
+    # 构造API提示词
+    system_prompt = ANALYSIS_SYSTEM_PROMPT
+    user_prompt = build_analysis_user_prompt(format_str)
+
+    # 扣除系统提示词和表头格式后，按模型的上下文窗口保留尽可能多的论文内容
+    # 提取PDF文本时已经用clean_text_for_api清理过，这里不再重复清理
+    budget = get_paper_token_budget(model, format_str)
+    paper_text = fit_paper_text(prompt, budget, model, out)
+
+    print(f"论文文本长度: {len(paper_text)}，可用token预算: {budget}")
+    user_prompt = user_prompt.replace("{paper_text}", paper_text)
+    return system_prompt, user_prompt, custom_columns
 
-    max_retries = 3
-    retry_delay = 5  # 秒
+
+def get_response_cache_key(model, system_prompt, user_prompt, custom_columns):
+    """API响应缓存的键，相同模型、提示词和表头的请求共用一个缓存条目"""
+    return compute_text_hash(
+        "api_response", model, system_prompt, user_prompt, custom_columns
+    )
+
+
+def call_api_with_retry(self, system_prompt, prompt, out, tm, stream_output=True):
+    """调用API并支持重试机制"""
+    api_url, api_key = self.get_api_info()
+    model = self.api_model_var.get() or "gpt-3.5-turbo"
+
+    # 增加调试日志
+    print(f"API调用开始 - URL: {api_url}, 模型: {model}, 文本长度: {len(prompt)}")
+    out.insert(tk.END, f"使用模型: {model}\n", "info")
+
+    # 超出预算的论文分块并行分析后合并，而不是截断
+    if get_analysis_option(self, "chunked_analysis"):
+        format_str, _ = load_prompt_format()
+        if count_tokens(prompt, model) > get_paper_token_budget(model, format_str):
+            return call_api_chunked(self, prompt, out, model, stream_output)
+
+    system_prompt, user_prompt, custom_columns = build_analysis_prompts(
+        prompt, out, model
+    )
+    return request_analysis_response(
+        self, model, system_prompt, user_prompt, custom_columns, out, stream_output
+    )
+
+
+def get_chunked_token_budget(model, format_str):
+    """
+    分块分析的token预算
+    :return: (每块可用的token数, 全部块合计可覆盖的论文token数)
+    """
+    settings = load_analysis_settings()
+    max_chunks = max(1, int(settings["max_analysis_chunks"]))
+    overlap_tokens = max(0, int(settings["chunk_overlap_tokens"]))
+    chunk_budget = get_text_token_budget(
+        model,
+        ANALYSIS_SYSTEM_PROMPT,
+        get_chunk_prompt_overhead(format_str, max_chunks),
+    )
+    # 在边界处切分会使块略短，按最短的块估算
+    usable_tokens = int(chunk_budget * (1 - BOUNDARY_SEARCH_RATIO)) - overlap_tokens
+    return chunk_budget, max(0, usable_tokens * max_chunks + overlap_tokens)
+
+
+def call_api_chunked(self, paper_text, out, model, stream_output=True):
+    """
+    分块分析超出预算的论文：把全文切成相互重叠的块，并行提取每块的字段信息，
+    再调用一次API把各块结果合并为完整的分析结果
+    :return: 合并后的API响应文本，失败或取消时返回None
+    """
+    settings = load_analysis_settings()
+    format_str, custom_columns = load_prompt_format()
+    max_chunks = max(1, int(settings["max_analysis_chunks"]))
+    overlap_tokens = max(0, int(settings["chunk_overlap_tokens"]))
+
+    chunk_budget, total_budget = get_chunked_token_budget(model, format_str)
+    if chunk_budget <= overlap_tokens * 2:
+        out.insert(tk.END, "模型的可用预算过小，无法分块分析\n", "warning")
+        system_prompt, user_prompt, custom_columns = build_analysis_prompts(
+            paper_text, out, model
+        )
+        return request_analysis_response(
+            self, model, system_prompt, user_prompt, custom_columns, out, stream_output
+        )
+
+    # 分块数有上限，超出的部分按章节选择或截断
+    paper_text = fit_paper_text(paper_text, total_budget, model, out)
+    chunks = split_text_into_chunks(paper_text, chunk_budget, overlap_tokens, model)
+    chunks = chunks[:max_chunks]
+    total = len(chunks)
+    workers = min(total, max(1, int(settings["chunk_workers"])))
+    out.insert(
+        tk.END,
+        f"论文超出单次请求的预算，分为 {total} 块分析（每块最多 {chunk_budget} tokens，"
+        f"同时分析 {workers} 块）\n",
+        "info",
+    )
+
+    partial_results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                request_analysis_response,
+                self,
+                model,
+                ANALYSIS_SYSTEM_PROMPT,
+                build_chunk_prompt(format_str, chunk, index, total),
+                custom_columns,
+                out,
+                False,
+            ): index
+            for index, chunk in enumerate(chunks, 1)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                response = future.result()
+            except Exception as e:
+                print(f"第 {index} 块分析异常: {type(e).__name__}: {str(e)}")
+                response = None
+            if response:
+                partial_results[index] = response
+                out.insert(tk.END, f"第 {index}/{total} 块分析完成\n", "info")
+            else:
+                out.insert(tk.END, f"第 {index}/{total} 块分析失败\n", "warning")
+
+    if self.cancel_analysis_requested:
+        return None
+    if not partial_results:
+        out.insert(tk.END, "所有分块均分析失败\n", "error")
+        return None
+    if total == 1:
+        return partial_results[1]
+
+    # 合并各块结果，结果过长时按比例截断每块的结果
+    partial_results = sorted(partial_results.items())
+    reduce_budget = get_text_token_budget(
+        model,
+        ANALYSIS_SYSTEM_PROMPT,
+        get_reduce_prompt_overhead(format_str, len(partial_results)),
+    )
+    user_prompt = build_reduce_prompt(format_str, partial_results, reduce_budget, model)
+    out.insert(
+        tk.END, f"正在合并 {len(partial_results)}/{total} 块的分析结果...\n", "info"
+    )
+    return request_analysis_response(
+        self,
+        model,
+        ANALYSIS_SYSTEM_PROMPT,
+        user_prompt,
+        custom_columns,
+        out,
+        stream_output,
+    )
+
+
+def request_analysis_response(
+    self, model, system_prompt, user_prompt, custom_columns, out, stream_output=True
+):
+    """
+    发送一次分析请求，按重试策略重试，有效的响应写入缓存
+    :return: API响应文本，失败或取消时返回None
+    """
+    api_url, api_key = self.get_api_info()
+
+    # 相同模型、提示词和表头的请求直接使用缓存的响应
+    response_cache = get_analysis_response_cache(self)
+    cache_key = None
+    if response_cache is not None:
+        cache_key = get_response_cache_key(
+            model, system_prompt, user_prompt, custom_columns
+        )
+        try:
+            cached_response = response_cache.get(cache_key)
+        except Exception as e:
+            print(f"读取API响应缓存失败: {str(e)}")
+            cached_response = None
+        if cached_response:
+            print("命中API响应缓存，跳过API调用")
+            out.insert(tk.END, "已使用缓存的API响应，跳过API调用\n", "info")
+            return cached_response
+
+    # 获取复用的API适配器，重试时继续使用同一个适配器及其连接池
+    api_adapter = get_shared_api_adapter(
+        api_url, api_key, model, getattr(self, "api_concurrency", None)
+    )
+    if not api_adapter:
+        out.insert(tk.END, "API调用失败: 无法创建API适配器\n", "error")
+        return None
+    retry_policy = api_adapter.retry_policy
+    print(
+        f"API适配器：{type(api_adapter).__name__}，最多尝试 {retry_policy.max_attempts} 次"
+    )
 
     # 添加响应验证函数
     def is_valid_response(text):
@@ -352,48 +1348,18 @@ def call_api_with_retry(self, system_prompt, prompt, out, tm):
 
     # 用于收集和存储流式响应的变量
     complete_response_text = ""
-    broken_chunk = False
-    api_adapters_tried = []
+    start_time = time.time()
+    attempt = 0
 
-    for attempt in range(max_retries):
+    while True:
+        attempt += 1
         try:
             # 检查是否取消
             if self.cancel_analysis_requested:
                 print("用户取消API调用")
                 return None
 
-            # 创建API适配器
-            print(f"尝试创建API适配器 (尝试 {attempt+1}/{max_retries})")
-
-            # 确保我们不会重复使用失败的适配器
-            api_adapter = None
-            while api_adapter is None:
-                api_adapter = get_api_adapter(api_url, api_key, model)
-                current_adapter_info = f"{type(api_adapter).__name__}_{model}"
-
-                if api_adapter is None:
-                    print("API适配器创建失败，重试...")
-                elif current_adapter_info in api_adapters_tried:
-                    # 如果已经尝试过这个适配器，尝试切换模型
-                    print(f"已尝试过 {current_adapter_info}，尝试其他模型")
-                    if "gpt-3.5" in model:
-                        model = model.replace("gpt-3.5", "gpt-4")
-                    elif "gpt-4" in model:
-                        model = model.replace("gpt-4", "gpt-3.5")
-                    elif "-chat" in model:
-                        model = model.replace("-chat", "")
-                    else:
-                        model = model + "-turbo" if "-turbo" not in model else model
-
-                    api_adapter = None  # 重新获取适配器
-                else:
-                    # 记录已尝试的适配器类型
-                    api_adapters_tried.append(current_adapter_info)
-
-            if not api_adapter:
-                raise Exception("无法创建API适配器")
-
-            print(f"API适配器创建成功：{type(api_adapter).__name__}，开始API调用")
+            print(f"开始API调用 (尝试 {attempt}/{retry_policy.max_attempts})")
             out.insert(tk.END, "正在向API发送请求...\n", "info")
             out.flush()  # 确保显示最新状态
 
@@ -414,127 +1380,110 @@ def call_api_with_retry(self, system_prompt, prompt, out, tm):
                     received_chunks += 1
 
                 # 写入UI
-                out.insert(tk.END, chunk)
+                if stream_output:
+                    out.insert(tk.END, chunk)
 
             # 设置回调并调用API
             api_adapter.set_chunk_callback(on_chunk_received)
             print("开始API流式请求，超时设置为", timeout, "秒")
 
-            # 暂存响应对象
-            response_obj = None
+            # 调用API获取流式响应
+            response_obj = api_adapter.create_completion(
+                prompt=user_prompt,
+                system=system_prompt,
+                stream=True,
+                timeout=timeout,
+                terminate_check_fn=lambda: self.cancel_analysis_requested,
+            )
+            if not response_obj:
+                print("API返回空响应对象")
+                raise InvalidResponseError("API返回空响应对象")
 
-            try:
-                # 调用API获取流式响应
-                response_obj = api_adapter.create_completion(
-                    prompt=user_prompt,
-                    system=system_prompt,
-                    stream=True,
-                    timeout=timeout,
-                )
+            # 处理流式响应
+            chunk_count = 0
 
-                if not response_obj:
-                    print("API返回空响应对象")
-                    raise Exception("API返回空响应对象")
-            except Exception as api_err:
-                print(f"API初始调用失败: {type(api_err).__name__}: {api_err}")
-                broken_chunk = True
-                raise api_err
+            # 确保刷新任何剩余的文本
+            out.flush()
 
-            # 处理流式响应
-            try:
-                chunk_count = 0
-
-                # 确保刷新任何剩余的文本
-                out.flush()
-
-                print("开始处理API响应流")
-                for chunk in response_obj:
-                    # 检查是否应该终止处理
-                    if self.cancel_analysis_requested:
-                        print("用户取消，终止响应处理")
-                        break
-
-                    # 提取内容
-                    chunk_content = None
-                    if hasattr(chunk, "choices") and len(chunk.choices) > 0:
-                        if hasattr(chunk.choices[0], "delta") and hasattr(
-                            chunk.choices[0].delta, "content"
-                        ):
-                            chunk_content = chunk.choices[0].delta.content
-
-                    if chunk_content:
-                        chunk_count += 1
-
-                # 收集流式响应后的处理结果
-                print(
-                    f"API响应流处理完成，收到 {chunk_count} 个块，总长度 {len(complete_response_text)}"
-                )
+            print("开始处理API响应流")
+            for chunk in response_obj:
+                # 检查是否应该终止处理
+                if self.cancel_analysis_requested:
+                    print("用户取消，终止响应处理")
+                    break
 
-                # 如果通过回调收集的数据为空，但通过遍历收集的不为空，则使用后者
-                if not complete_response_text and chunk_count > 0:
-                    print("警告：回调收集响应为空，但流式处理收到了内容")
-                    broken_chunk = True
+                # 提取内容
+                chunk_content = None
+                if hasattr(chunk, "choices") and len(chunk.choices) > 0:
+                    if hasattr(chunk.choices[0], "delta") and hasattr(
+                        chunk.choices[0].delta, "content"
+                    ):
+                        chunk_content = chunk.choices[0].delta.content
 
-                # 确保保存了响应文本
-                if received_chunks == 0 and chunk_count == 0:
-                    print("未收到任何内容块")
+                if chunk_content:
+                    chunk_count += 1
 
-                if complete_response_text.strip():
-                    # 打印响应内容的前100个字符作为调试用途
-                    preview = complete_response_text[:100].replace("\n", "\\n")
-                    print(f"收到的响应内容预览: {preview}...")
+            # 收集流式响应后的处理结果
+            print(
+                f"API响应流处理完成，收到 {chunk_count} 个块，总长度 {len(complete_response_text)}"
+            )
 
-                if is_valid_response(complete_response_text):
-                    out.insert(tk.END, "\n✅ API响应接收完成\n", "success")
-                    out.tag_configure(
-                        "success", foreground="#8bc34a", font=("微软雅黑", 10, "bold")
-                    )
-                    return complete_response_text
-                else:
-                    print("API响应内容不符合预期格式")
-                    raise Exception("API响应格式不正确")
+            if self.cancel_analysis_requested:
+                return None
+
+            # 如果通过回调收集的数据为空，但通过遍历收集的不为空，则使用后者
+            if not complete_response_text and chunk_count > 0:
+                print("警告：回调收集响应为空，但流式处理收到了内容")
+
+            # 确保保存了响应文本
+            if received_chunks == 0 and chunk_count == 0:
+                print("未收到任何内容块")
 
-            except Exception as stream_err:
-                print(f"处理流式响应时出错: {type(stream_err).__name__}: {stream_err}")
-                broken_chunk = True
+            if complete_response_text.strip():
+                # 打印响应内容的前100个字符作为调试用途
+                preview = complete_response_text[:100].replace("\n", "\\n")
+                print(f"收到的响应内容预览: {preview}...")
 
-                raise stream_err
+            if not is_valid_response(complete_response_text):
+                print("API响应内容不符合预期格式")
+                raise InvalidResponseError("API响应格式不正确")
+
+            out.insert(tk.END, "\n✅ API响应接收完成\n", "success")
+            out.tag_configure(
+                "success", foreground="#8bc34a", font=("微软雅黑", 10, "bold")
+            )
+            # 只缓存完整有效的响应
+            if cache_key:
+                try:
+                    response_cache.set(cache_key, complete_response_text)
+                except Exception as e:
+                    print(f"写入API响应缓存失败: {str(e)}")
+            return complete_response_text
 
         except Exception as e:
             print(f"API调用异常: {type(e).__name__}: {str(e)}")
+            if self.cancel_analysis_requested:
+                print("用户取消，放弃API调用")
+                return None
 
-            # 如果已经收集了一些内容，并且看起来是有效的，返回它
-            if (
-                complete_response_text
-                and "|" in complete_response_text
-                and len(complete_response_text) > 100
-            ):
-                print("虽然发生错误，但已收集到有用内容，尝试使用")
-                out.insert(tk.END, "\n⚠️ API响应部分完成，尝试处理\n", "warning")
-                return complete_response_text
-
-            if attempt < max_retries - 1 and not self.cancel_analysis_requested:
-                out.insert(
-                    tk.END,
-                    f"API调用失败 (尝试 {attempt+1}/{max_retries}): {str(e)}\n",
-                    "warning",
-                )
-                out.insert(tk.END, f"等待 {retry_delay} 秒后重试...\n", "info")
-                out.flush()  # 确保显示最新状态
-
-                # 等待指定时间，期间检查是否取消
-                for i in range(retry_delay):
-                    if self.cancel_analysis_requested:
-                        print("等待重试期间用户取消")
-                        return None
-                    time.sleep(1)
-                    if i % 2 == 0:  # 每2秒更新一次倒计时
-                        remaining = retry_delay - i
-                        out.insert(tk.END, f"再等 {remaining} 秒...\r", "info")
-            else:
-                print("达到最大重试次数或用户取消，放弃API调用")
+            delay = retry_policy.next_delay(e, attempt, time.time() - start_time)
+            if delay is None:
+                if retry_policy.is_retryable(e):
+                    print("达到最大重试次数或总时长上限，放弃API调用")
+                else:
+                    print(f"{type(e).__name__} 不可重试，放弃API调用")
                 out.insert(tk.END, f"API调用失败: {str(e)}\n", "error")
 
+                # 流式响应中断时，已收集的内容看起来有效则直接使用
+                if (
+                    complete_response_text
+                    and "|" in complete_response_text
+                    and len(complete_response_text) > 100
+                ):
+                    print("虽然发生错误，但已收集到有用内容，尝试使用")
+                    out.insert(tk.END, "\n⚠️ API响应部分完成，尝试处理\n", "warning")
+                    return complete_response_text
+
                 # 如果有一些内容，即使不符合预期格式，也尝试使用它
                 if complete_response_text and len(complete_response_text) > 50:
                     print("返回不完整的响应用于尝试处理")
@@ -543,8 +1492,25 @@ def call_api_with_retry(self, system_prompt, prompt, out, tm):
 
                 return None
 
-    print("所有重试失败，返回None")
-    return None
+            out.insert(
+                tk.END,
+                f"API调用失败 (尝试 {attempt}/{retry_policy.max_attempts}): {str(e)}\n",
+                "warning",
+            )
+            if is_rate_limit_error(e):
+                # 限速器已让该端点的所有请求暂停，下一次请求发送前会自动等待
+                out.insert(tk.END, "触发API限速，限速结束后自动重试...\n", "info")
+                continue
+            out.insert(tk.END, f"等待 {delay:.1f} 秒后重试...\n", "info")
+            out.flush()  # 确保显示最新状态
+
+            # 等待退避时间，期间检查是否取消
+            wait_until = time.time() + delay
+            while time.time() < wait_until:
+                if self.cancel_analysis_requested:
+                    print("等待重试期间用户取消")
+                    return None
+                time.sleep(min(0.5, max(0.0, wait_until - time.time())))
 
 
 def collect_response_stream(self, response, out, tm):
@@ -730,111 +1696,49 @@ def perform_regenerate(self):
         if os.path.exists(self.excel_path.get()):
             # 读取Excel文件
             df = pd.read_excel(self.excel_path.get())
-            pdf_filenames = [os.path.basename(path) for path in self.pdf_paths]
-            file_count = len(pdf_filenames)
+            file_count = len(self.pdf_paths)
 
             if len(df) > 0 and file_count > 0:
-                original_count = len(df)
-                rows_to_keep = []
-                header_rows = []
+                # 按来源哈希索引定位每篇论文之前的结果行
+                source_index = build_source_index(df)
                 matched_rows = []
+                unmatched_names = []
+                for pdf_path in self.pdf_paths:
+                    try:
+                        rows = source_index.get(compute_file_hash(pdf_path))
+                    except OSError:
+                        rows = None
+                    if rows:
+                        matched_rows.extend(rows)
+                    else:
+                        unmatched_names.append(os.path.basename(pdf_path))
 
-                # 1. 查找表头分隔行和匹配行
-                for idx, row in df.iterrows():
-                    # 检查是否有表头分隔标记
-                    has_header_mark = False
-                    for col in df.columns:
-                        if (
-                            isinstance(row[col], str)
-                            and "--以下使用新表头--" in row[col]
-                        ):
-                            header_rows.append(idx)
-                            has_header_mark = True
-                            break
-
-                    if has_header_mark:
-                        continue
-
-                    # 检查是否有文件名匹配
-                    match_found = False
-                    for pdf_name in pdf_filenames:
-                        base_name = os.path.splitext(pdf_name)[0]
-                        pdf_name_lower = pdf_name.lower()
-                        base_name_lower = base_name.lower()
-
-                        for col in df.columns:
-                            cell_value = str(row[col]).lower()
-                            if (
-                                pdf_name_lower in cell_value
-                                or (
-                                    len(base_name) > 4 and base_name_lower in cell_value
-                                )
-                                or (
-                                    len(cell_value) > 10
-                                    and cell_value in pdf_name_lower
-                                )
-                                or (
-                                    len(cell_value) > 10
-                                    and cell_value in base_name_lower
-                                )
-                            ):
-                                match_found = True
-                                matched_rows.append(idx)
-                                break
-
-                        if match_found:
-                            break
-
-                    # 保留不匹配的行
-                    if not match_found:
-                        rows_to_keep.append(idx)
-
-                # 2. 根据查找结果处理数据
-                if header_rows:
-                    last_header = header_rows[-1]
-                    df = df.iloc[: last_header + 1].copy()
-                    tm.add_task(
-                        self.output_text.insert,
-                        tk.END,
-                        "\n找到表头分隔行，将保留到该行并添加新分析。\n",
-                        "info",
-                    )
-                elif matched_rows:
+                if matched_rows:
                     df = df.drop(matched_rows).reset_index(drop=True)
-                    tm.add_task(
-                        self.output_text.insert,
-                        tk.END,
-                        f"\n找到 {len(matched_rows)} 行匹配的先前结果，将删除这些行并添加新分析。\n",
-                        "warning",
+                    save_to_excel_with_format(
+                        df, self.excel_path.get(), append_mode=False
                     )
-                elif len(rows_to_keep) < original_count:
-                    df = df.loc[rows_to_keep].copy()
-                    rows_removed = original_count - len(df)
                     tm.add_task(
                         self.output_text.insert,
                         tk.END,
-                        f"\n已删除 {rows_removed} 行匹配的先前结果。\n",
+                        f"\n找到 {len(matched_rows)} 行匹配的先前结果，将删除这些行并添加新分析。\n",
                         "warning",
                     )
-                elif original_count >= file_count:
-                    # 如果无法确定要删除哪些行，但原始行数大于等于文件数，假设最后几行是要删除的
-                    df = df.iloc[:-file_count].copy()
 
-                else:
+                if unmatched_names:
                     tm.add_task(
                         self.output_text.insert,
                         tk.END,
-                        "\n未找到匹配的先前结果，将在Excel末尾添加新分析。建议手动删除可能重复的结果。\n",
+                        f"\n以下论文在Excel中没有来源记录，将在Excel末尾添加新分析，"
+                        f"建议手动删除可能重复的结果：{', '.join(unmatched_names)}\n",
                         "info",
                     )
 
-                # 3. 保存更新后的DataFrame
-                df.to_excel(self.excel_path.get(), index=False)
                 tm.add_task(self.status_bar.configure, text="准备就绪，开始新的分析...")
 
             # 开始分析
             api_url, api_key = self.get_api_info()
-            self.process_papers_async(df, api_url, api_key, file_count)
+            self.process_papers_async(df, api_url, api_key, file_count, regenerate=True)
 
     except Exception as e:
         error_msg = f"重新生成过程中出错：{str(e)}"
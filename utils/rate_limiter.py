@@ -0,0 +1,228 @@
+"""
+API请求限速
+每个端点共享一组令牌桶，分别限制每分钟请求数（RPM）和每分钟token数（TPM），
+并根据Retry-After和x-ratelimit-*响应头自适应退避，
+并发分析时所有线程一起等待，避免集中重试触发更多429错误。
+"""
+
+import asyncio
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from utils.token_budget import estimate_text_tokens
+
+# 没有Retry-After时的退避时间（秒），连续触发限速时按指数增长
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+
+# 估算token时为模型输出预留的数量
+EXPECTED_OUTPUT_TOKENS = 1000
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class TokenBucket:
+    """按分钟速率匀速补充的令牌桶，容量为一分钟的配额"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """
+        预留amount个令牌，令牌不足时允许透支
+        :return: 透支部分补充完毕需要等待的秒数
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # 单个请求超过整桶容量时按整桶计算，避免永远无法发送
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """单个端点的限速器，可在多个线程之间共享"""
+
+    def __init__(self, rpm=0, tpm=0):
+        """
+        :param rpm: 每分钟最多请求数，0表示不限制
+        :param tpm: 每分钟最多token数，0表示不限制
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.lock = threading.Lock()
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        # 服务端要求暂停时，在此时间之前不发送任何请求
+        self.blocked_until = 0.0
+        self.consecutive_limits = 0
+
+    def reserve(self, tokens=0):
+        """预留一次请求的配额，返回需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.blocked_until - now
+            if self.request_bucket is not None:
+                wait = max(wait, self.request_bucket.reserve(1, now))
+            if self.token_bucket is not None and tokens:
+                wait = max(wait, self.token_bucket.reserve(tokens, now))
+            return max(0.0, wait)
+
+    def remaining_block(self):
+        """距离服务端要求的暂停结束还有多少秒"""
+        with self.lock:
+            return max(0.0, self.blocked_until - time.monotonic())
+
+    def acquire(self, tokens=0, cancel_check=None):
+        """
+        等待直到可以发送请求
+        :param cancel_check: 返回True时放弃等待
+        :return: 是否可以发送请求
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            print(f"客户端限速，等待 {wait:.1f} 秒后发送请求")
+        while wait > 0:
+            if cancel_check and cancel_check():
+                return False
+            time.sleep(min(wait, 0.5))
+            wait -= min(wait, 0.5)
+            if wait <= 0:
+                # 等待期间其他请求可能触发了新的限速
+                wait = self.remaining_block()
+        return True
+
+    async def acquire_async(self, tokens=0):
+        """acquire的异步版本，等待时不阻塞事件循环"""
+        wait = self.reserve(tokens)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.remaining_block()
+
+    def on_response(self, headers):
+        """根据成功响应的x-ratelimit-*响应头，在配额用完时暂停到重置时间"""
+        with self.lock:
+            self.consecutive_limits = 0
+        if not headers:
+            return
+        for kind in ("requests", "tokens"):
+            remaining = _parse_number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if remaining is not None and remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self._block(reset)
+
+    def on_rate_limited(self, headers=None):
+        """
+        收到429后暂停该端点的所有请求
+        优先使用服务端给出的Retry-After，否则按连续触发次数指数退避
+        :return: 暂停的秒数
+        """
+        with self.lock:
+            self.consecutive_limits += 1
+            count = self.consecutive_limits
+        delay = parse_retry_after(headers)
+        if delay is None:
+            delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (count - 1))
+        self._block(delay)
+        print(f"API限速，该端点暂停 {delay:.1f} 秒")
+        return delay
+
+    def _block(self, delay):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+def parse_duration(value):
+    """解析"1s"、"6m0s"、"20ms"或纯数字秒数格式的时长，返回秒数"""
+    if not value:
+        return None
+    value = str(value).strip()
+    number = _parse_number(value)
+    if number is not None:
+        return number
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers):
+    """解析retry-after-ms或Retry-After响应头（秒数或HTTP日期），返回秒数"""
+    if not headers:
+        return None
+    retry_after_ms = _parse_number(headers.get("retry-after-ms"))
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return seconds
+    try:
+        retry_time = parsedate_to_datetime(value)
+        return max(0.0, retry_time.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_error_status(error):
+    """获取API异常对应的HTTP状态码，兼容openai和requests的异常"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def get_error_headers(error):
+    """获取API异常对应的响应头"""
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+def is_rate_limit_error(error):
+    return get_error_status(error) == 429
+
+
+def estimate_tokens(messages):
+    """
+    粗略估算请求消耗的token数：中文字符按每字1个token，其余字符按每4个字符1个token，
+    再加上为模型输出预留的数量
+    """
+    return EXPECTED_OUTPUT_TOKENS + sum(
+        estimate_text_tokens(message.get("content") or "") for message in messages
+    )
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(endpoint, model, rpm=0, tpm=0):
+    """
+    获取端点共享的限速器，相同端点和模型的所有适配器使用同一个限速器
+    RPM/TPM设置变化时重新创建
+    """
+    key = (endpoint, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or (limiter.rpm, limiter.tpm) != (rpm, tpm):
+            limiter = RateLimiter(rpm, tpm)
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,108 @@
+"""
+API调用重试策略
+区分可重试和不可重试的错误：认证失败、参数错误等立即放弃，
+网络中断、超时、5xx和限速错误按带随机抖动的指数退避重试，并受总时长限制。
+"""
+
+import random
+
+import openai
+import requests
+
+from utils.rate_limiter import get_error_status
+
+# 重试后仍可能成功的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# 重试也不会成功的错误：认证、权限、参数和资源不存在
+FATAL_EXCEPTIONS = (
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.BadRequestError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError,
+    InterruptedError,
+)
+
+# 网络层错误，通常是暂时性的
+TRANSIENT_EXCEPTIONS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class InvalidResponseError(Exception):
+    """API返回了空响应或格式不正确的响应，重新请求通常可以得到正确结果"""
+
+
+class RetryPolicy:
+    """
+    重试策略
+    第n次失败后等待 random(0, min(max_delay, base_delay * 2^(n-1))) 秒（full jitter），
+    避免多个并发请求同时重试
+    """
+
+    def __init__(self, max_attempts=5, base_delay=2.0, max_delay=60.0, deadline=600.0):
+        """
+        :param max_attempts: 最多尝试次数（包含第一次请求）
+        :param base_delay: 退避的基准时间（秒）
+        :param max_delay: 单次等待的上限（秒）
+        :param deadline: 从第一次请求开始计算的总时长上限（秒），超过后不再重试
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.deadline = float(deadline)
+
+    @classmethod
+    def from_settings(cls, settings, backend=None):
+        """
+        根据分析设置创建重试策略
+        retry_overrides中可以按后端类型（openai、azure、generic）覆盖默认值
+        """
+        options = {
+            "max_attempts": settings.get("retry_max_attempts", 5),
+            "base_delay": settings.get("retry_base_delay", 2.0),
+            "max_delay": settings.get("retry_max_delay", 60.0),
+            "deadline": settings.get("retry_deadline", 600.0),
+        }
+        overrides = (settings.get("retry_overrides") or {}).get(backend) or {}
+        for key in options:
+            if key in overrides:
+                options[key] = overrides[key]
+        return cls(**options)
+
+    def is_retryable(self, error):
+        """判断错误是否值得重试"""
+        if isinstance(error, FATAL_EXCEPTIONS):
+            return False
+        if isinstance(error, TRANSIENT_EXCEPTIONS):
+            return True
+        status = get_error_status(error)
+        if status is not None:
+            return status in RETRYABLE_STATUS_CODES or status >= 500
+        # 网络错误、响应格式错误以及其他未知错误都重试
+        return True
+
+    def backoff(self, attempt):
+        """第attempt次失败后的等待时间（秒）"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def next_delay(self, error, attempt, elapsed):
+        """
+        :param attempt: 已经尝试的次数
+        :param elapsed: 从第一次请求开始已经过去的秒数
+        :return: 下次重试前的等待秒数，不应重试时返回None
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        delay = self.backoff(attempt)
+        if elapsed + delay >= self.deadline:
+            return None
+        return delay
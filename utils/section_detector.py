@@ -0,0 +1,284 @@
+"""
+论文章节识别与文本选择
+在提取的文本中识别摘要、引言、方法、结果、讨论、结论、参考文献等章节标题，
+论文超出token预算时按章节价值分配预算，优先保留摘要、结论和结果，舍弃参考文献和附录，
+而不是只保留开头的部分。
+"""
+
+import re
+
+from utils.token_budget import count_tokens, truncate_to_tokens
+
+# 章节标题，按章节类型分组；英文标题区分大小写，避免匹配正文中的普通单词
+SECTION_TITLES = {
+    "abstract": ["Abstract", "摘要", "摘 要"],
+    "introduction": ["Introduction", "Background", "引言", "绪论", "前言", "研究背景"],
+    "related_work": [
+        "Related Work",
+        "Related Works",
+        "Literature Review",
+        "Theoretical Framework",
+        "文献综述",
+        "相关工作",
+        "相关研究",
+    ],
+    "methods": [
+        "Materials and Methods",
+        "Methods",
+        "Methodology",
+        "Method",
+        "Research Design",
+        "Data and Methods",
+        "Experimental Setup",
+        "Experiments",
+        "Data",
+        "研究方法",
+        "研究设计",
+        "实验设计",
+        "数据与方法",
+    ],
+    "results": [
+        "Results and Discussion",
+        "Results",
+        "Findings",
+        "Empirical Results",
+        "Evaluation",
+        "研究结果",
+        "实验结果",
+        "实证结果",
+    ],
+    "discussion": ["Discussion", "General Discussion", "讨论", "分析与讨论"],
+    "conclusion": [
+        "Conclusions",
+        "Conclusion",
+        "Concluding Remarks",
+        "Conclusion and Future Work",
+        "Limitations and Future Research",
+        "Future Work",
+        "结论",
+        "结论与展望",
+        "总结与展望",
+        "研究结论",
+    ],
+    "references": ["References", "Bibliography", "Works Cited", "参考文献"],
+    "appendix": [
+        "Appendix",
+        "Appendices",
+        "Acknowledgements",
+        "Acknowledgments",
+        "附录",
+        "致谢",
+    ],
+}
+
+# 预算不足时的保留顺序；front为第一个标题之前的标题、作者等信息，body为无法归类的正文
+SECTION_PRIORITY = [
+    "front",
+    "abstract",
+    "conclusion",
+    "results",
+    "methods",
+    "introduction",
+    "discussion",
+    "body",
+    "related_work",
+    "appendix",
+]
+
+# 不发送给API的章节
+DROPPED_SECTIONS = {"references"}
+
+# 第一轮分配中单个章节最多占用预算的比例，避免一个很长的章节挤掉其他章节
+SECTION_SHARE = {"front": 0.05, "abstract": 0.15}
+DEFAULT_SECTION_SHARE = 0.25
+
+# 被省略的内容用此标记代替
+OMISSION_MARK = "[...]"
+
+# 至少识别出这么多个章节标题才按章节选择，否则按开头截断
+MIN_DETECTED_HEADINGS = 2
+
+
+def _build_heading_pattern():
+    titles = {}
+    for section, names in SECTION_TITLES.items():
+        for name in names:
+            titles[name] = section
+            if re.search(r"[A-Za-z]", name):
+                titles[name.upper()] = section
+
+    # 长标题优先匹配，如"Results and Discussion"先于"Results"
+    alternatives = "|".join(
+        re.escape(name).replace(r"\ ", r"\s+")
+        for name in sorted(titles, key=len, reverse=True)
+    )
+    pattern = re.compile(
+        r"(?:(?<=\s)|^)"
+        r"(?P<number>(?:\d{1,2}(?:\.\d{1,2})*|[IVX]{1,4}|[一二三四五六七八九十]{1,3})[.、．]?\s*)?"
+        rf"(?P<title>{alternatives})(?![A-Za-z])"
+        r"(?P<after>\s*[:：.]?\s*)"
+    )
+    return pattern, titles
+
+
+_HEADING_PATTERN, _HEADING_TITLES = _build_heading_pattern()
+
+# 编号前是这些词时为图表或章节引用，不是标题，如"Table 2 Results"
+_REFERENCE_PREFIX = re.compile(
+    r"(?:Table|Tab\.|Figure|Fig\.|Section|Sec\.|Eq\.|表|图|第)\s*$"
+)
+
+# 不带编号时也认为是标题的章节，其余章节的首字母大写标题需要编号或全大写
+_UNNUMBERED_SECTIONS = {"abstract", "references", "appendix"}
+
+# 不带编号的首字母大写标题后面应是新句子或文献条目的开头
+_HEADING_FOLLOWER = re.compile(r"[A-Z0-9\u4e00-\u9fff\[(（“\"]")
+
+
+def _is_heading(text, match, section):
+    title = match.group("title")
+    if match.group("number") or (title.isupper() and len(title) > 3):
+        return True
+    if re.search(r"[\u4e00-\u9fff]", title):
+        # 中文标题需要独立成段：后面跟冒号或空格
+        return bool(match.group("after"))
+    if section not in _UNNUMBERED_SECTIONS:
+        return False
+    return match.end() == len(text) or bool(_HEADING_FOLLOWER.match(text, match.end()))
+
+
+def _iter_headings(text):
+    """按出现顺序生成文本中的章节标题(位置, 章节类型, 标题)"""
+    for match in _HEADING_PATTERN.finditer(text):
+        title = re.sub(r"\s+", " ", match.group("title"))
+        section = _HEADING_TITLES.get(title) or _HEADING_TITLES.get(title.upper())
+        if match.group("number") and _REFERENCE_PREFIX.search(
+            text, max(0, match.start() - 8), match.start()
+        ):
+            continue
+        if section and _is_heading(text, match, section):
+            yield match.start(), section, title
+
+
+def find_references_start(text):
+    """返回参考文献标题在文本中的位置，没有时返回None"""
+    for start, section, _ in _iter_headings(text):
+        if section == "references":
+            return start
+    return None
+
+
+def has_section_structure(text):
+    """文本中是否有足够的章节标题，可以按章节选择"""
+    for count, _ in enumerate(_iter_headings(text), 1):
+        if count >= MIN_DETECTED_HEADINGS:
+            return True
+    return False
+
+
+def detect_sections(text):
+    """
+    识别文本中的章节
+    :return: 按出现顺序排列的章节列表，每项为{"name", "title", "start", "end"}，
+             第一个标题之前的内容为"front"
+    """
+    headings = list(_iter_headings(text))
+
+    sections = []
+    if not headings or headings[0][0] > 0:
+        end = headings[0][0] if headings else len(text)
+        sections.append({"name": "front", "title": "", "start": 0, "end": end})
+
+    references_seen = False
+    for i, (start, section, title) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        # 参考文献之后的"标题"多为文献条目中的单词，归入参考文献
+        if references_seen and section != "appendix":
+            sections[-1]["end"] = end
+            continue
+        references_seen = references_seen or section == "references"
+        sections.append({"name": section, "title": title, "start": start, "end": end})
+    return sections
+
+
+def _allocate_budget(sizes, budget):
+    """按章节优先级分配token预算，返回每个章节可用的token数"""
+    allocation = {index: 0 for index in sizes}
+    ordered = sorted(
+        sizes,
+        key=lambda index: SECTION_PRIORITY.index(sizes[index][0]),
+    )
+    remaining = budget
+
+    # 第一轮：每个章节最多分到一定比例的预算
+    for index in ordered:
+        name, size = sizes[index]
+        share = int(budget * SECTION_SHARE.get(name, DEFAULT_SECTION_SHARE))
+        allocation[index] = min(size, share, remaining)
+        remaining -= allocation[index]
+
+    # 第二轮：剩余预算按优先级补给尚未完整保留的章节
+    for index in ordered:
+        if remaining <= 0:
+            break
+        extra = min(sizes[index][1] - allocation[index], remaining)
+        allocation[index] += extra
+        remaining -= extra
+    return allocation
+
+
+def select_paper_text(text, budget, model=None):
+    """
+    在token预算内选择论文文本
+    全文不超过预算时原样返回；否则识别章节，按优先级保留高价值章节，
+    每个章节保留开头部分，并按原文顺序拼接
+    :return: (选择后的文本, 说明保留情况的字符串，全文保留时为空字符串)
+    """
+    if count_tokens(text, model) <= budget:
+        return text, ""
+
+    sections = detect_sections(text)
+    if len(sections) - 1 < MIN_DETECTED_HEADINGS:
+        return truncate_to_tokens(text, budget, model), "未识别到章节结构，保留开头部分"
+
+    # 无法归类的章节按正文处理，参考文献直接舍弃
+    sizes = {}
+    for index, section in enumerate(sections):
+        if section["name"] in DROPPED_SECTIONS:
+            continue
+        name = section["name"] if section["name"] in SECTION_PRIORITY else "body"
+        segment = text[section["start"] : section["end"]]
+        sizes[index] = (name, count_tokens(segment, model))
+
+    # 扣除省略标记和分隔空格占用的token
+    mark_tokens = count_tokens(f" {OMISSION_MARK} ", model)
+    allocation = _allocate_budget(sizes, max(0, budget - mark_tokens * len(sections)))
+
+    pieces = []
+    kept = []
+    dropped = []
+    gap = False
+    for index, section in enumerate(sections):
+        label = section["title"] or "标题信息"
+        tokens = allocation.get(index, 0)
+        if tokens <= 0:
+            dropped.append(label)
+            gap = True
+            continue
+
+        segment = text[section["start"] : section["end"]].strip()
+        if gap and pieces:
+            pieces.append(OMISSION_MARK)
+        if tokens < sizes[index][1]:
+            segment = truncate_to_tokens(segment, tokens, model).rstrip()
+            kept.append(f"{label}(部分)")
+            gap = True
+        else:
+            kept.append(label)
+            gap = False
+        pieces.append(segment)
+
+    summary = f"按章节选择文本，保留: {', '.join(kept)}"
+    if dropped:
+        summary += f"；省略: {', '.join(dropped)}"
+    return " ".join(pieces), summary
@@ -25,6 +25,22 @@ class ThreadSafeGUI:
                 return True
         return False
 
+    def call(self, func, *args, **kwargs):
+        """在GUI线程中执行函数并等待其返回值，用于在后台线程中弹出确认对话框"""
+        done = threading.Event()
+        result = {}
+
+        def run():
+            try:
+                result["value"] = func(*args, **kwargs)
+            finally:
+                done.set()
+
+        if not self.add_task(run):
+            return None
+        done.wait()
+        return result.get("value")
+
 
 class ThreadSafeText:
     """
@@ -0,0 +1,138 @@
+"""
+提示词token预算
+按模型的上下文窗口计算论文文本可用的token数：扣除系统提示词、表头格式等固定部分
+和为模型输出预留的token后，尽可能多地保留论文内容，避免超出上下文导致400错误。
+安装了tiktoken时精确计数，否则按字符类型估算。
+"""
+
+import re
+
+try:
+    import tiktoken
+except ImportError:  # 可选依赖，未安装时按字符估算
+    tiktoken = None
+
+from configs.analysis_config import load_analysis_settings
+
+# 未知模型按此上下文窗口计算
+DEFAULT_CONTEXT_TOKENS = 16384
+
+# 常见模型的上下文窗口（token），按模型名前缀匹配，靠前的规则优先
+MODEL_CONTEXT_LIMITS = [
+    ("gpt-4o", 128000),
+    ("gpt-4.1", 1047576),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4-1106", 128000),
+    ("gpt-4-0125", 128000),
+    ("gpt-4-32k", 32768),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo-instruct", 4096),
+    ("gpt-3.5", 16385),
+    ("o1", 200000),
+    ("o3", 200000),
+    ("o4", 200000),
+    ("deepseek", 65536),
+    ("claude", 200000),
+    ("gemini", 1048576),
+    ("moonshot-v1-8k", 8192),
+    ("moonshot-v1-32k", 32768),
+    ("moonshot-v1-128k", 131072),
+    ("glm-4", 128000),
+    ("qwen-long", 1000000),
+    ("qwen", 32768),
+]
+
+# 每条消息的角色标记等额外开销
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# 按字符估算时只使用预算的这一比例，抵消估算误差
+ESTIMATE_SAFETY_RATIO = 0.9
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_encodings = {}
+
+
+def get_context_limit(model):
+    """获取模型的上下文窗口，model_context_limits设置中的值优先"""
+    model = (model or "").strip()
+    overrides = load_analysis_settings()["model_context_limits"] or {}
+    if model in overrides:
+        return int(overrides[model])
+
+    # 兼容"openai/gpt-4o"这类带服务商前缀的模型名
+    name = model.lower().rsplit("/", 1)[-1]
+    for prefix, limit in MODEL_CONTEXT_LIMITS:
+        if name.startswith(prefix):
+            return limit
+    return DEFAULT_CONTEXT_TOKENS
+
+
+def _get_encoding(model):
+    if tiktoken is None:
+        return None
+    model_name = (model or "").lower().rsplit("/", 1)[-1]
+    if model_name.startswith(("gpt-4o", "gpt-4.1", "o1", "o3", "o4")):
+        name = "o200k_base"
+    else:
+        name = "cl100k_base"
+    if name not in _encodings:
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            # 首次使用需要下载编码表，离线时退回估算
+            print(f"加载tiktoken编码失败，改为按字符估算: {str(e)}")
+            _encodings[name] = None
+    return _encodings[name]
+
+
+def estimate_text_tokens(text):
+    """按字符估算token数：中文字符每字1个token，其余字符每4个字符1个token"""
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def count_tokens(text, model=None):
+    """计算文本的token数，未安装tiktoken时按字符估算"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_text_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def get_text_token_budget(model, *fixed_texts):
+    """
+    计算论文文本可用的token数
+    :param fixed_texts: 与论文文本一起发送的固定内容，如系统提示词和不含论文的用户提示词
+    :return: 可用token数，固定内容已超出上下文时返回0
+    """
+    settings = load_analysis_settings()
+    budget = get_context_limit(model) - int(settings["response_token_reserve"])
+    max_prompt_tokens = int(settings["max_prompt_tokens"] or 0)
+    if max_prompt_tokens > 0:
+        budget = min(budget, max_prompt_tokens)
+
+    budget -= sum(count_tokens(text, model) for text in fixed_texts)
+    budget -= MESSAGE_OVERHEAD_TOKENS * max(1, len(fixed_texts))
+    if _get_encoding(model) is None:
+        budget = int(budget * ESTIMATE_SAFETY_RATIO)
+    return max(0, budget)
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """截取文本开头不超过max_tokens个token的部分"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    # 二分查找满足预算的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle], model) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]